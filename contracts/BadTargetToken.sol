@@ -0,0 +1,15 @@
+pragma solidity ^0.4.4;
+
+import "./ExampleMigration.sol";
+
+// Target token creating more tokens than the migration agent requests, for
+// testing the invariant checks of the migration agents.
+contract BadTargetToken is GNTTargetToken {
+
+    function BadTargetToken(address _migrationAgent) GNTTargetToken(_migrationAgent) {
+    }
+
+    function createToken(address _target, uint256 _amount) {
+        super.createToken(_target, _amount + 1);
+    }
+}
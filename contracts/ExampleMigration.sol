@@ -28,6 +28,18 @@ contract GNTTargetToken {
         Transfer(migrationAgent, _target, _amount);
     }
 
+    function createTokens(address[] _targets, uint256[] _amounts) {
+        if (msg.sender != migrationAgent) throw;
+
+        uint256 total = 0;
+        for (uint256 i = 0; i < _targets.length; ++i) {
+            balances[_targets[i]] += _amounts[i];
+            total += _amounts[i];
+            Transfer(migrationAgent, _targets[i], _amounts[i]);
+        }
+        totalTokens += total;
+    }
+
     function finalizeMigration() {
         if (msg.sender != migrationAgent) throw;
 
@@ -72,7 +84,7 @@ contract MigrationAgent {
         tokenSupply = Source.GolemNetworkToken(gntSourceToken).totalSupply();
     }
 
-    function safetyInvariantCheck(uint256 _value) private {
+    function safetyInvariantCheck(uint256 _value) internal {
         if (gntTargetToken == 0) throw;
         if (Source.GolemNetworkToken(gntSourceToken).totalSupply() + GNTTargetToken(gntTargetToken).totalSupply() != tokenSupply - _value) throw;
     }
@@ -98,6 +110,24 @@ contract MigrationAgent {
         safetyInvariantCheck(0);
     }
 
+    // Batched migrateFrom, the invariant is checked once for the whole batch.
+    function migrateBatch(address[] _to, uint256[] _values) {
+        if (msg.sender != gntSourceToken) throw;
+        if (gntTargetToken == 0) throw;
+
+        uint256 total = 0;
+        for (uint256 i = 0; i < _values.length; ++i)
+            total += _values[i];
+
+        //Right here gntSourceToken has already been updated, but corresponding GNT have not been created in the gntTargetToken contract yet
+        safetyInvariantCheck(total);
+
+        GNTTargetToken(gntTargetToken).createTokens(_to, _values);
+
+        //Right here totalSupply invariant must hold
+        safetyInvariantCheck(0);
+    }
+
     function finalizeMigration() {
         if (msg.sender != owner) throw;
 
@@ -115,3 +145,48 @@ contract MigrationAgent {
     }
 
 }
+
+// MigrationAgent which does not check the total supply of the source and the
+// target token on every migration. The migrated tokens are counted locally,
+// invariantHolds() compares the counter with both tokens and can be called at
+// any time, finalizeMigration() fails if it does not hold.
+contract CountingMigrationAgent is MigrationAgent {
+
+    uint256 migrated;
+
+    function CountingMigrationAgent(address _gntSourceToken) MigrationAgent(_gntSourceToken) {
+    }
+
+    function invariantHolds() constant returns (bool) {
+        if (gntTargetToken == 0) return false;
+        return Source.GolemNetworkToken(gntSourceToken).totalSupply() + migrated == tokenSupply &&
+               GNTTargetToken(gntTargetToken).totalSupply() == migrated;
+    }
+
+    //Interface implementation
+    function migrateFrom(address _from, uint256 _value) {
+        if (msg.sender != gntSourceToken) throw;
+        if (gntTargetToken == 0) throw;
+
+        migrated += _value;
+        GNTTargetToken(gntTargetToken).createToken(_from, _value);
+    }
+
+    function migrateBatch(address[] _to, uint256[] _values) {
+        if (msg.sender != gntSourceToken) throw;
+        if (gntTargetToken == 0) throw;
+
+        uint256 total = 0;
+        for (uint256 i = 0; i < _values.length; ++i)
+            total += _values[i];
+
+        migrated += total;
+        GNTTargetToken(gntTargetToken).createTokens(_to, _values);
+    }
+
+    function finalizeMigration() {
+        if (!invariantHolds()) throw;
+
+        super.finalizeMigration();
+    }
+}
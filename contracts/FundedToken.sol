@@ -7,8 +7,10 @@ contract FundedToken {
     uint256 public constant tokenCreationCap = 820000 ether * tokenCreationRate;
     uint256 public constant tokenCreationMin = 150000 ether * tokenCreationRate;
 
-    uint256 fundingStartBlock;
-    uint256 fundingEndBlock;
+    // The funding mode flag, the Golem Factory address and the funding
+    // period are packed into a single storage slot (8 + 160 + 32 + 32 bits).
+    // Functions reading more than one of them copy them to local variables
+    // first, so the slot is loaded once.
 
     // The flag indicates if the GNT contract is in "funding" mode.
     bool fundingMode = true;
@@ -16,6 +18,9 @@ contract FundedToken {
     // Receives ETH and its own GNT endowment.
     address public golemFactory;
 
+    uint32 fundingStartBlock;
+    uint32 fundingEndBlock;
+
     // Has control over token migration to next version of token.
     address public migrationMaster;
 
@@ -33,11 +38,15 @@ contract FundedToken {
                                address _migrationMaster,
                                uint256 _fundingStartBlock,
                                uint256 _fundingEndBlock) {
+        // Block numbers have to fit in uint32.
+        if (_fundingStartBlock > 0xffffffff) throw;
+        if (_fundingEndBlock > 0xffffffff) throw;
+
         lockedAllocation = new GNTAllocation(_golemFactory);
         migrationMaster = _migrationMaster;
         golemFactory = _golemFactory;
-        fundingStartBlock = _fundingStartBlock;
-        fundingEndBlock = _fundingEndBlock;
+        fundingStartBlock = uint32(_fundingStartBlock);
+        fundingEndBlock = uint32(_fundingEndBlock);
     }
     
     function totalSupply() external constant returns (uint256) {
@@ -51,20 +60,27 @@ contract FundedToken {
     // Crowdfunding:
 
     function fundingActive() constant external returns (bool) {
+        var mode = fundingMode;
+        var startBlock = fundingStartBlock;
+        var endBlock = fundingEndBlock;
+
         // Copy of inFundingActive.
-        if (!fundingMode) return false;
+        if (!mode) return false;
 
         // b ≥ Start and b ≤ End and t < Max
-        if (block.number < fundingStartBlock ||
-            block.number > fundingEndBlock ||
+        if (block.number < startBlock ||
+            block.number > endBlock ||
             totalTokens >= tokenCreationCap) return false;
         return true;
     }
 
     // Helper function to get number of tokens left during the funding.
     function numberOfTokensLeft() constant external returns (uint256) {
-        if (!fundingMode) return 0;
-        if (block.number > fundingEndBlock) return 0;
+        var mode = fundingMode;
+        var endBlock = fundingEndBlock;
+
+        if (!mode) return 0;
+        if (block.number > endBlock) return 0;
         return tokenCreationCap - totalTokens;
     }
 
@@ -76,12 +92,16 @@ contract FundedToken {
     // Required state: Funding Active
     // State transition: -> Funding Success (only if cap reached)
     function() payable external {
+        var mode = fundingMode;
+        var startBlock = fundingStartBlock;
+        var endBlock = fundingEndBlock;
+
         // Abort if not in Funding Active state.
         // The checks are split (instead of using or operator) because it is
         // cheaper this way.
-        if (!fundingMode) throw;
-        if (block.number < fundingStartBlock) throw;
-        if (block.number > fundingEndBlock) throw;
+        if (!mode) throw;
+        if (block.number < startBlock) throw;
+        if (block.number > endBlock) throw;
         if (totalTokens >= tokenCreationCap) throw;
 
         // Do not allow creating 0 tokens.
@@ -106,9 +126,13 @@ contract FundedToken {
     // Required state: Funding Success
     // State transition: -> Operational Normal
     function finalize() external {
+        var mode = fundingMode;
+        var endBlock = fundingEndBlock;
+        var factory = golemFactory;
+
         // Abort if not in Funding Success state.
-        if (!fundingMode) throw;
-        if ((block.number <= fundingEndBlock ||
+        if (!mode) throw;
+        if ((block.number <= endBlock ||
              totalTokens < tokenCreationMin) &&
             totalTokens < tokenCreationCap) throw;
 
@@ -116,7 +140,7 @@ contract FundedToken {
         fundingMode = false;
 
         // Transfer ETH to the Golem Factory address.
-        if (!golemFactory.send(this.balance)) throw;
+        if (!factory.send(this.balance)) throw;
 
         // Create additional GNT for the Factory (representing the company)
         // and developers as a 18% of total number of tokens.
@@ -134,9 +158,12 @@ contract FundedToken {
     // reached the minimum level.
     // Required state: Funding Failure
     function refund() external {
+        var mode = fundingMode;
+        var endBlock = fundingEndBlock;
+
         // Abort if not in Funding Failure state.
-        if (!fundingMode) throw;
-        if (block.number <= fundingEndBlock) throw;
+        if (!mode) throw;
+        if (block.number <= endBlock) throw;
         if (totalTokens >= tokenCreationMin) throw;
 
         var gntValue = balances[msg.sender];
@@ -66,4 +66,27 @@ contract GNTAllocation {
         // Will fail if allocation (and therefore toTransfer) is 0.
         if (!gnt.transfer(msg.sender, toTransfer)) throw;
     }
+
+    // Allows anyone to unlock allocated tokens of multiple developers and
+    // the Golem Factory in one transaction. Tokens are transferred with a
+    // single GNT batchTransfer call.
+    // Fails if any of the addresses has no (more) allocation.
+    function unlockBatch(address[] _holders) {
+        if (now < unlockedAt) throw;
+
+        var created = tokensCreated;
+        if (created == 0) {
+            created = gnt.balanceOf(this);
+            tokensCreated = created;
+        }
+
+        var toTransfer = new uint256[](_holders.length);
+        for (uint256 i = 0; i < _holders.length; ++i) {
+            toTransfer[i] = created * allocations[_holders[i]] / totalAllocations;
+            allocations[_holders[i]] = 0;
+        }
+
+        // Will fail if any of the allocations is 0.
+        if (!gnt.batchTransfer(_holders, toTransfer)) throw;
+    }
 }
@@ -0,0 +1,63 @@
+pragma solidity ^0.4.4;
+
+import "./Token.sol";
+
+// Alternative to GNTAllocation for a large number of holders. Instead of the
+// `allocations` table, written one storage slot per holder by the
+// constructor, the contract keeps the root of a Merkle tree of
+// (holder, allocations) leaves. A holder proves its allocations when
+// unlocking tokens.
+//
+// A leaf is sha3(holder, allocations), an inner node is sha3 of its two
+// children in ascending order. The tokens to distribute have to be
+// transferred to the contract before the first unlock.
+contract GNTMerkleAllocation {
+    // Root of the tree of holders' allocations.
+    bytes32 allocationsRoot;
+
+    // Sum of the allocations of all holders.
+    uint256 totalAllocations;
+
+    GolemNetworkToken gnt;
+    uint256 unlockedAt;
+
+    uint256 tokensCreated = 0;
+
+    // Holders who have already unlocked their tokens.
+    mapping (address => bool) unlocked;
+
+    function GNTMerkleAllocation(address _gnt, bytes32 _allocationsRoot,
+                                 uint256 _totalAllocations) {
+        gnt = GolemNetworkToken(_gnt);
+        allocationsRoot = _allocationsRoot;
+        totalAllocations = _totalAllocations;
+        unlockedAt = now + 6 * 30 days;
+    }
+
+    // Allows a holder to unlock its allocated tokens by transferring them
+    // back to holder's address. `_proof` lists the siblings of the holder's
+    // leaf from the bottom of the tree up.
+    function unlock(uint256 _allocations, bytes32[] _proof) external {
+        if (now < unlockedAt) throw;
+        if (unlocked[msg.sender]) throw;
+
+        var node = sha3(msg.sender, _allocations);
+        for (uint256 i = 0; i < _proof.length; ++i) {
+            if (node < _proof[i])
+                node = sha3(node, _proof[i]);
+            else
+                node = sha3(_proof[i], node);
+        }
+        if (node != allocationsRoot) throw;
+
+        // During first unlock attempt fetch total number of locked tokens.
+        if (tokensCreated == 0)
+            tokensCreated = gnt.balanceOf(this);
+
+        unlocked[msg.sender] = true;
+        var toTransfer = tokensCreated * _allocations / totalAllocations;
+
+        // Will fail if allocation (and therefore toTransfer) is 0.
+        if (!gnt.transfer(msg.sender, toTransfer)) throw;
+    }
+}
@@ -5,6 +5,7 @@ import "./FundedToken.sol";
 
 contract MigrationAgent {
     function migrateFrom(address _from, uint256 _value);
+    function migrateBatch(address[] _to, uint256[] _values);
 }
 
 contract GolemNetworkToken is FundedToken {
@@ -35,6 +36,33 @@ contract GolemNetworkToken is FundedToken {
         return false;
     }
 
+    // Transfer GNT tokens from sender's account to multiple accounts,
+    // _values[i] tokens to _to[i]. The sender's balance is read and written
+    // once. The whole batch is aborted if any of the transfers is invalid.
+    // This function is disabled during the funding.
+    // Required state: Operational
+    function batchTransfer(address[] _to, uint256[] _values) external returns (bool) {
+        // Abort if not in Operational state.
+        if (fundingMode) throw;
+        if (_to.length != _values.length) throw;
+
+        var senderBalance = balances[msg.sender];
+        for (uint256 i = 0; i < _to.length; ++i) {
+            var value = _values[i];
+            if (value == 0 || value > senderBalance) throw;
+
+            // Tokens sent to self stay in senderBalance, written at the end.
+            var to = _to[i];
+            if (to != msg.sender) {
+                senderBalance -= value;
+                balances[to] += value;
+            }
+            Transfer(msg.sender, to, value);
+        }
+        balances[msg.sender] = senderBalance;
+        return true;
+    }
+
     // Token migration support:
 
     function migrate(uint256 _value) external {
@@ -53,6 +81,31 @@ contract GolemNetworkToken is FundedToken {
         Migrate(msg.sender, migrationAgent, _value);
     }
 
+    // Migrate GNT tokens from sender's account in one call of the migration
+    // agent, _values[i] tokens are created for _to[i] in the target token.
+    // The whole batch is aborted if any of the values is invalid.
+    function migrateBatch(address[] _to, uint256[] _values) {
+        // Abort if not in Operational Migration state.
+        if (fundingMode) throw;
+        if (migrationAgent == 0) throw;
+        if (_to.length != _values.length) throw;
+
+        var senderBalance = balances[msg.sender];
+        var total = senderBalance;
+        for (uint256 i = 0; i < _values.length; ++i) {
+            var value = _values[i];
+            if (value == 0 || value > senderBalance) throw;
+            senderBalance -= value;
+        }
+        total -= senderBalance;
+
+        balances[msg.sender] = senderBalance;
+        totalTokens -= total;
+        totalMigrated += total;
+        MigrationAgent(migrationAgent).migrateBatch(_to, _values);
+        Migrate(msg.sender, migrationAgent, total);
+    }
+
     // Set address of migration target contract and enable migration process.
     // Required state: Operational Normal
     // State transition: -> Operational Migration
@@ -14,11 +14,13 @@ contract multiowned {
 
     // TYPES
 
-    // struct for the status of a pending operation.
+    // struct for the status of a pending operation. the state is valid only while `epoch` is equal to
+    // m_pendingEpoch, i.e. it is discarded by any later clearPending().
     struct PendingState {
-        uint yetNeeded;
+        uint128 yetNeeded;
+        uint96 epoch;
+        // bitmap of owners who confirmed, bit 2**ownerIndex for each owner.
         uint ownersDone;
-        uint index;
     }
 
     // EVENTS
@@ -72,7 +74,7 @@ contract multiowned {
         if (ownerIndex == 0) return;
         uint ownerIndexBit = 2**ownerIndex;
         var pending = m_pending[_operation];
-        if (pending.ownersDone & ownerIndexBit > 0) {
+        if (pending.epoch == m_pendingEpoch && pending.ownersDone & ownerIndexBit > 0) {
             pending.yetNeeded++;
             pending.ownersDone -= ownerIndexBit;
             Revoke(msg.sender, _operation);
@@ -96,8 +98,6 @@ contract multiowned {
         if (isOwner(_owner)) return;
 
         clearPending();
-        if (m_numOwners >= c_maxOwners)
-            reorganizeOwners();
         if (m_numOwners >= c_maxOwners)
             return;
         m_numOwners++;
@@ -111,10 +111,16 @@ contract multiowned {
         if (ownerIndex == 0) return;
         if (m_required > m_numOwners - 1) return;
 
-        m_owners[ownerIndex] = 0;
-        m_ownerIndex[uint(_owner)] = 0;
         clearPending();
-        reorganizeOwners(); //make sure m_numOwner is equal to the number of owners and always points to the optimal free slot
+        // move the last owner to the freed slot to keep the list compact. its confirmation bit changes,
+        // which is safe as all pending operations have just been cleared.
+        if (ownerIndex != m_numOwners) {
+            m_owners[ownerIndex] = m_owners[m_numOwners];
+            m_ownerIndex[m_owners[ownerIndex]] = ownerIndex;
+        }
+        m_owners[m_numOwners] = 0;
+        m_numOwners--;
+        m_ownerIndex[uint(_owner)] = 0;
         OwnerRemoved(_owner);
     }
     
@@ -135,6 +141,8 @@ contract multiowned {
 
         // make sure they're an owner
         if (ownerIndex == 0) return false;
+        // confirmations of cleared operations don't count.
+        if (pending.epoch != m_pendingEpoch) return false;
 
         // determine the bit to set for this owner.
         uint ownerIndexBit = 2**ownerIndex;
@@ -154,14 +162,15 @@ contract multiowned {
         if (ownerIndex == 0) return;
 
         var pending = m_pending[_operation];
-        // if we're not yet working on this operation, switch over and reset the confirmation status.
-        if (pending.yetNeeded == 0) {
+        // if we're not yet working on this operation or it was cleared, switch over and reset the
+        // confirmation status.
+        if (pending.yetNeeded == 0 || pending.epoch != m_pendingEpoch) {
             // reset count of confirmations needed.
-            pending.yetNeeded = m_required;
+            pending.yetNeeded = uint128(m_required);
+            pending.epoch = m_pendingEpoch;
             // reset which owners have confirmed (none) - set our bitmap to 0.
-            pending.ownersDone = 0;
-            pending.index = m_pendingIndex.length++;
-            m_pendingIndex[pending.index] = _operation;
+            if (pending.ownersDone != 0)
+                pending.ownersDone = 0;
         }
         // determine the bit to set for this owner.
         uint ownerIndexBit = 2**ownerIndex;
@@ -171,7 +180,6 @@ contract multiowned {
             // ok - check if count is enough to go ahead.
             if (pending.yetNeeded <= 1) {
                 // enough confirmations: reset and run interior.
-                delete m_pendingIndex[m_pending[_operation].index];
                 delete m_pending[_operation];
                 return true;
             }
@@ -184,34 +192,17 @@ contract multiowned {
         }
     }
 
-    function reorganizeOwners() private returns (bool) {
-        uint free = 1;
-        while (free < m_numOwners)
-        {
-            while (free < m_numOwners && m_owners[free] != 0) free++;
-            while (m_numOwners > 1 && m_owners[m_numOwners] == 0) m_numOwners--;
-            if (free < m_numOwners && m_owners[m_numOwners] != 0 && m_owners[free] == 0)
-            {
-                m_owners[free] = m_owners[m_numOwners];
-                m_ownerIndex[m_owners[free]] = free;
-                m_owners[m_numOwners] = 0;
-            }
-        }
-    }
-    
+    // discards all pending operations at once by starting a new epoch, the states stored for them are
+    // ignored and reset on their next confirmation.
     function clearPending() internal {
-        uint length = m_pendingIndex.length;
-        for (uint i = 0; i < length; ++i)
-            if (m_pendingIndex[i] != 0)
-                delete m_pending[m_pendingIndex[i]];
-        delete m_pendingIndex;
+        m_pendingEpoch++;
     }
         
     // FIELDS
 
     // the number of owners that must confirm the same operation before it is run.
     uint public m_required;
-    // pointer used to find a free slot in m_owners
+    // number of owners, they are stored in m_owners[1] to m_owners[m_numOwners]
     uint public m_numOwners;
     
     // list of owners
@@ -221,7 +212,8 @@ contract multiowned {
     mapping(uint => uint) m_ownerIndex;
     // the ongoing operations.
     mapping(bytes32 => PendingState) m_pending;
-    bytes32[] m_pendingIndex;
+    // incremented by clearPending(), operations started in an earlier epoch are no longer pending.
+    uint96 m_pendingEpoch;
 }
 
 // inheritable "property" contract that enables methods to be protected by placing a linear limit (specifiable)
@@ -294,12 +286,18 @@ contract multisig {
     event MultiTransact(address owner, bytes32 operation, uint value, address to, bytes data);
     // Confirmation still needed for a transaction.
     event ConfirmationNeeded(bytes32 operation, address initiator, uint value, address to, bytes data);
+    // Multi-sig batch of transactions going out of the wallet (record who signed for it last, the operation hash,
+    // the total value and the number of transactions).
+    event MultiTransactBatch(address owner, bytes32 operation, uint value, uint count);
+    // Confirmation still needed for a batch of transactions.
+    event BatchConfirmationNeeded(bytes32 operation, address initiator, uint value, uint count);
     
     // FUNCTIONS
     
     // TODO: document
     function changeOwner(address _from, address _to) external;
     function execute(address _to, uint _value, bytes _data) external returns (bytes32);
+    function executeBatch(address[] _to, uint[] _values, bytes _data, uint[] _dataLengths) returns (bytes32);
     function confirm(bytes32 _h) returns (bool);
 }
 
@@ -315,10 +313,24 @@ contract Wallet is multisig, multiowned, daylimit {
     // Transaction structure to remember details of transaction lest it need be saved for a later call.
     struct Transaction {
         address to;
+        // m_pendingEpoch when the transaction was submitted, it is not executed in later epochs.
+        uint96 epoch;
         uint value;
         bytes data;
     }
 
+    // Batch of transactions, the data of the i-th transaction are the next dataLengths[i] bytes of data.
+    struct Batch {
+        address[] to;
+        uint[] values;
+        bytes data;
+        uint[] dataLengths;
+        // sum of values
+        uint value;
+        // m_pendingEpoch when the batch was submitted, it is not executed in later epochs.
+        uint96 epoch;
+    }
+
     // METHODS
 
     // constructor - just pass on the owner array to the multiowned and
@@ -353,36 +365,84 @@ contract Wallet is multisig, multiowned, daylimit {
         }
         // determine our operation hash.
         _r = sha3(msg.data, block.number);
-        if (!confirm(_r) && m_txs[_r].to == 0) {
+        if (!confirm(_r) && (m_txs[_r].to == 0 || m_txs[_r].epoch != m_pendingEpoch)) {
             m_txs[_r].to = _to;
+            m_txs[_r].epoch = m_pendingEpoch;
             m_txs[_r].value = _value;
             m_txs[_r].data = _data;
             ConfirmationNeeded(_r, msg.sender, _value, _to, _data);
         }
     }
     
+    // Outside-visible batch transact entry point. The daily limit applies to the sum of `_values`: the whole batch
+    // is executed immediately if it is below the limit, otherwise the batch is a single multisig operation and its
+    // hash is returned for the confirmations. Transaction i sends `_values[i]` to `_to[i]` with the next
+    // `_dataLengths[i]` bytes of `_data` (the data of all transactions concatenated) as its data.
+    function executeBatch(address[] _to, uint[] _values, bytes _data, uint[] _dataLengths) onlyowner
+            returns (bytes32 _r) {
+        if (_to.length == 0) throw;
+        if (_to.length != _values.length || _to.length != _dataLengths.length) throw;
+        uint value = 0;
+        uint dataLength = 0;
+        for (uint i = 0; i < _to.length; ++i) {
+            if (value + _values[i] < value) throw;
+            if (dataLength + _dataLengths[i] < dataLength) throw;
+            value += _values[i];
+            dataLength += _dataLengths[i];
+        }
+        if (dataLength != _data.length) throw;
+
+        if (underLimit(value)) {
+            callBatch(_to, _values, _data, _dataLengths);
+            return 0;
+        }
+        _r = sha3(msg.data, block.number);
+        if (!confirm(_r) && (m_batches[_r].to.length == 0 || m_batches[_r].epoch != m_pendingEpoch)) {
+            m_batches[_r].to = _to;
+            m_batches[_r].values = _values;
+            m_batches[_r].data = _data;
+            m_batches[_r].dataLengths = _dataLengths;
+            m_batches[_r].value = value;
+            m_batches[_r].epoch = m_pendingEpoch;
+            BatchConfirmationNeeded(_r, msg.sender, value, _to.length);
+        }
+    }
+
     // confirm a transaction through just the hash. we use the previous transactions map, m_txs, in order
     // to determine the body of the transaction from the hash provided.
     function confirm(bytes32 _h) onlymanyowners(_h) returns (bool) {
-        if (m_txs[_h].to != 0) {
+        if (m_txs[_h].to != 0 && m_txs[_h].epoch == m_pendingEpoch) {
             m_txs[_h].to.call.value(m_txs[_h].value)(m_txs[_h].data);
             MultiTransact(msg.sender, _h, m_txs[_h].value, m_txs[_h].to, m_txs[_h].data);
             delete m_txs[_h];
             return true;
         }
+        if (m_batches[_h].to.length != 0 && m_batches[_h].epoch == m_pendingEpoch) {
+            var batch = m_batches[_h];
+            callBatch(batch.to, batch.values, batch.data, batch.dataLengths);
+            MultiTransactBatch(msg.sender, _h, batch.value, batch.to.length);
+            delete m_batches[_h];
+            return true;
+        }
     }
     
     // INTERNAL METHODS
-    
-    function clearPending() internal {
-        uint length = m_pendingIndex.length;
-        for (uint i = 0; i < length; ++i)
-            delete m_txs[m_pendingIndex[i]];
-        super.clearPending();
-    }
 
+    function callBatch(address[] _to, uint[] _values, bytes _data, uint[] _dataLengths) internal {
+        uint offset = 0;
+        for (uint i = 0; i < _to.length; ++i) {
+            bytes memory data = new bytes(_dataLengths[i]);
+            for (uint j = 0; j < data.length; ++j)
+                data[j] = _data[offset + j];
+            offset += data.length;
+            _to[i].call.value(_values[i])(data);
+        }
+    }
+    
     // FIELDS
 
-    // pending transactions we have at present.
+    // pending transactions we have at present. those submitted before the last clearPending() are stale.
     mapping (bytes32 => Transaction) m_txs;
+    // pending batches of transactions, stale in the same way as m_txs.
+    mapping (bytes32 => Batch) m_batches;
 }
@@ -0,0 +1,43 @@
+"""
+Accounts shared by the tests and the simulations: the Golem Factory of the
+chain scenarios and generated accounts with balances set in the current block.
+"""
+from ethereum.keys import sha3
+from ethereum.utils import privtoaddr, to_string, parse_int_or_hex
+from rlp.utils import decode_hex
+
+# The Golem Factory of the scenarios, also the migration master.
+FACTORY_KEY = sha3('golem factory')
+FACTORY = privtoaddr(FACTORY_KEY)
+
+
+def create_accounts(state, balances, prefix):
+    keys = []
+    accounts = []
+
+    # create accounts and keys in fashion of testers
+    for account_number in range(len(balances)):
+        keys.append(sha3(prefix + to_string(account_number)))
+        accounts.append(privtoaddr(keys[-1]))
+
+    # account balances
+    block = state.block
+
+    for i, wei in enumerate(balances):
+        addr = accounts[i]
+        if len(addr) == 40:
+            addr = decode_hex(addr)
+        assert len(addr) == 20
+        block.set_balance(addr, parse_int_or_hex(wei))
+
+    block.commit_state()
+    block.state.db.commit()
+
+    return keys, accounts
+
+
+def dev_address(addr):
+    """
+    Return the Solidity literal of the address `addr` for allocation tables.
+    """
+    return '0x' + addr.encode('hex')
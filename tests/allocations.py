@@ -0,0 +1,96 @@
+"""
+Generated GNTAllocation tables.
+
+The developer table of GNTAllocation.sol is a template slot replaced by a
+table of any number of holders, totalAllocations follows the sum of the
+shares:
+
+    addresses = ['0x' + a.encode('hex') for a in accounts]
+    gnt, gas = deploy_gnt(state, factory, addresses, shares(len(addresses), 'zipf'), 1, 2)
+"""
+from ethereum import tester
+
+import artifacts
+import templates
+from sources import ALLOC_CONTRACT_PATH, GNT_CONTRACT_PATH, GNT_SLOTS, IMPORT_TOKEN_REGEX, compile_gnt
+
+# Allocations of the Golem Factory and of all developers in GNTAllocation.sol.
+FACTORY_SHARE = 20000
+DEV_SHARES_TOTAL = 10000
+
+# The whole developer table, lines indexing `allocations` with a literal address.
+TABLE_REGEX = "((?:[ \t]*allocations\[[a-zA-Z0-9]+\][^\n]*\n)+)"
+TOTAL_REGEX = "totalAllocations = ([0-9]+);"
+FACTORY_SHARE_REGEX = "allocations\[_golemFactory\] = ([0-9]+);"
+
+TABLE_SLOTS = {
+    'import_token': IMPORT_TOKEN_REGEX,
+    'table': TABLE_REGEX,
+    'total': TOTAL_REGEX,
+    'factory_share': FACTORY_SHARE_REGEX,
+}
+
+
+def _equal(n):
+    return [1.0] * n
+
+
+def _zipf(n):
+    return [1.0 / (i + 1) for i in range(n)]
+
+
+DISTRIBUTIONS = {
+    'equal': _equal,
+    'zipf': _zipf,
+}
+
+
+def shares(n, distribution='equal', total=DEV_SHARES_TOTAL):
+    """
+    Return `n` shares, at least 1 each, summing to `total`. The first
+    (largest) share absorbs the rounding error.
+    """
+    if not 0 < n <= total:
+        raise ValueError("cannot divide {} allocations among {} holders".format(total, n))
+    weights = DISTRIBUTIONS[distribution](n)
+    scale = float(total - n) / sum(weights)
+    result = [1 + int(w * scale) for w in weights]
+    result[0] += total - sum(result)
+    return result
+
+
+def table(addresses, dev_shares):
+    """
+    Return the Solidity lines of the developer allocation table.
+    """
+    if len(addresses) != len(dev_shares):
+        raise ValueError("{} addresses, {} shares".format(len(addresses), len(dev_shares)))
+    return ''.join("        allocations[{}] = {};\n".format(a, s) for a, s in zip(addresses, dev_shares))
+
+
+def gnt_source(addresses, dev_shares, factory_share=FACTORY_SHARE):
+    """
+    Return the source of GNT with GNTAllocation inlined, the developer table
+    replaced by `addresses` and `dev_shares`.
+    """
+    alloc_source = templates.load(ALLOC_CONTRACT_PATH, TABLE_SLOTS).render(
+        import_token='', table=table(addresses, dev_shares), total=str(factory_share + sum(dev_shares)),
+        factory_share=str(factory_share))
+    return templates.load(GNT_CONTRACT_PATH, GNT_SLOTS).render(import_allocation=alloc_source)
+
+
+def deploy_gnt(state, factory, addresses, dev_shares, start, end, sender=tester.k9, listen=False):
+    """
+    Deploy GNT with the generated allocation table, `factory` is the Golem
+    Factory and the migration master. Return (contract, gas used).
+
+    The transaction gas is not limited to tester.gas_limit, a table of
+    hundreds of holders costs more.
+    """
+    init, gnt_abi = compile_gnt(gnt_source(addresses, dev_shares))
+    t = artifacts.translator(gnt_abi)
+
+    gas_before = state.block.gas_used
+    args = t.encode_constructor_arguments((factory, factory, start, end))
+    addr = state.evm(init + args, sender=sender, gas=state.block.gas_limit - gas_before)
+    return tester.ABIContract(state, t, addr, listen=listen), state.block.gas_used - gas_before
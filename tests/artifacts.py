@@ -0,0 +1,178 @@
+"""
+Locations of the contract sources and the registry of the compiled contracts
+produced by `make build`. All paths are absolute, the tests do not depend on
+the working directory and never change it.
+
+Init code and ABI of a contract are read on first use and ABI translators are
+created once per contract, deployments and ABIContract instances share them.
+"""
+import os
+
+from ethereum import abi, tester
+from rlp.utils import decode_hex
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+CONTRACTS_DIR = os.path.join(os.path.dirname(TESTS_DIR), 'contracts')
+
+_translators = {}
+
+
+def contract_path(file_name):
+    return os.path.join(CONTRACTS_DIR, file_name)
+
+
+def load(name):
+    """
+    Return a tuple (init code, ABI) of the compiled contract `name`.
+    """
+    with open(os.path.join(TESTS_DIR, name + '.bin')) as f:
+        init = decode_hex(f.read().rstrip())
+    with open(os.path.join(TESTS_DIR, name + '.abi')) as f:
+        _abi = f.read()
+    return init, _abi
+
+
+def translator(_abi):
+    """
+    Return the abi.ContractTranslator of the ABI `_abi` (JSON), one per ABI.
+    """
+    t = _translators.get(_abi)
+    if t is None:
+        t = _translators[_abi] = abi.ContractTranslator(_abi)
+    return t
+
+
+class Artifact(object):
+    """
+    Compiled contract `name` (tests/<name>.bin, tests/<name>.abi).
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._init = None
+        self._abi = None
+
+    def _load(self):
+        if self._init is None:
+            self._init, self._abi = load(self.name)
+
+    @property
+    def init(self):
+        self._load()
+        return self._init
+
+    @property
+    def abi(self):
+        self._load()
+        return self._abi
+
+    @property
+    def translator(self):
+        return translator(self.abi)
+
+    def deploy(self, state, args=(), sender=tester.k9, endowment=0, gas=None, listen=False):
+        """
+        Create the contract with constructor arguments `args`, return its
+        tester.ABIContract. `gas` overrides the default gas limit of the
+        transaction, see `at` for `listen`.
+        """
+        code = self.init + self.translator.encode_constructor_arguments(args)
+        return self.at(state, state.evm(code, sender=sender, endowment=endowment, gas=gas), listen)
+
+    def at(self, state, address, listen=False):
+        """
+        Return the tester.ABIContract of the contract at `address`. If
+        `listen`, its events are decoded and printed as they are logged,
+        tests check events with events.listening instead.
+        """
+        return tester.ABIContract(state, self.translator, address, listen=listen)
+
+
+GNT = Artifact('GolemNetworkToken')
+GNT_ALLOCATION = Artifact('GNTAllocation')
+GNT_MERKLE_ALLOCATION = Artifact('GNTMerkleAllocation')
+MIGRATION_AGENT = Artifact('MigrationAgent')
+COUNTING_MIGRATION_AGENT = Artifact('CountingMigrationAgent')
+TARGET_TOKEN = Artifact('GNTTargetToken')
+BAD_TARGET_TOKEN = Artifact('BadTargetToken')
+PROXY_ACCOUNT = Artifact('ProxyAccount')
+PROXY_FACTORY_ACCOUNT = Artifact('ProxyFactoryAccount')
+WALLET = Artifact('Wallet')
+BAD_WALLET = Artifact('BadWallet')
+
+ALL = [GNT, GNT_ALLOCATION, GNT_MERKLE_ALLOCATION, MIGRATION_AGENT, COUNTING_MIGRATION_AGENT, TARGET_TOKEN,
+       BAD_TARGET_TOKEN, PROXY_ACCOUNT, PROXY_FACTORY_ACCOUNT, WALLET, BAD_WALLET]
+
+_identified = {}
+
+
+def identify(code, init=False):
+    """
+    Return the artifact of the runtime code `code` or, if `init`, of the init
+    code `code` followed by constructor arguments. Return None if the code is
+    not one of the built contracts.
+
+    Runtime code is a part of the init code of its contract and of the
+    contracts creating it, the artifact with the shortest init code is its
+    own. The init code of a contract includes the init code of the contracts
+    it creates, the longest matching one is its own.
+    """
+    key = (code, init)
+    if key not in _identified:
+        found = None
+        if code:
+            for artifact in ALL:
+                try:
+                    artifact_init = artifact.init
+                except IOError:
+                    continue
+                if init:
+                    if code.startswith(artifact_init) and \
+                            (found is None or len(artifact_init) > len(found.init)):
+                        found = artifact
+                elif code in artifact_init and (found is None or len(artifact_init) < len(found.init)):
+                    found = artifact
+        _identified[key] = found
+    return _identified[key]
+
+
+def deploy_gnt(state, golem_factory, migration_master, funding_start_block, funding_end_block,
+               sender=tester.k9):
+    return GNT.deploy(state, (golem_factory, migration_master, funding_start_block, funding_end_block),
+                      sender)
+
+
+def deploy_merkle_allocation(state, gnt, allocations_root, total_allocations, sender=tester.k9):
+    return GNT_MERKLE_ALLOCATION.deploy(state, (gnt, allocations_root, total_allocations), sender)
+
+
+def deploy_migration_agent(state, gnt_source_token, sender=tester.k9):
+    return MIGRATION_AGENT.deploy(state, (gnt_source_token,), sender)
+
+
+def deploy_counting_migration_agent(state, gnt_source_token, sender=tester.k9):
+    return COUNTING_MIGRATION_AGENT.deploy(state, (gnt_source_token,), sender)
+
+
+def deploy_target_token(state, migration_agent, sender=tester.k9):
+    return TARGET_TOKEN.deploy(state, (migration_agent,), sender)
+
+
+def deploy_bad_target_token(state, migration_agent, sender=tester.k9):
+    return BAD_TARGET_TOKEN.deploy(state, (migration_agent,), sender)
+
+
+def deploy_proxy_account(state, available_after, sender=tester.k0):
+    return PROXY_ACCOUNT.deploy(state, (available_after,), sender)
+
+
+def deploy_proxy_factory_account(state, available_after, sender=tester.k9):
+    return PROXY_FACTORY_ACCOUNT.deploy(state, (available_after,), sender)
+
+
+def deploy_wallet(state, owners, required, day_limit, sender=tester.k0):
+    return WALLET.deploy(state, (owners, required, day_limit), sender)
+
+
+def deploy_bad_wallet(state, sender=tester.k9):
+    return BAD_WALLET.deploy(state, (), sender)
@@ -0,0 +1,8 @@
+"""
+Parameters of the main network during the crowdfunding, shared by the tests
+and the simulations.
+"""
+
+# Gas limit of blocks on the main network during the crowdfunding.
+BLOCK_GAS_LIMIT = 4712388
+BLOCK_TIME = 15  # seconds
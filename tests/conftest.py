@@ -0,0 +1,46 @@
+import os
+import random
+
+import pytest
+
+
+def pytest_addoption(parser):
+    parser.addoption('--gnt-seed', type=int, default=None,
+                     help="seed of the random numbers used by the tests (GNT_TEST_SEED)")
+    parser.addoption('--gnt-profile', metavar='DIR', default=None,
+                     help="write gas profiles of the transactions of every test to DIR (see profiler.py)")
+    parser.addoption('--gnt-profile-no-opcodes', action='store_true',
+                     help="profile call frames only, without the slow tracing of opcodes")
+
+
+def pytest_configure(config):
+    # Choose the seed before test modules are imported, so that pytest-xdist
+    # workers inherit the same one.
+    seed = config.getoption('--gnt-seed')
+    if seed is not None:
+        os.environ['GNT_TEST_SEED'] = str(seed)
+    elif not os.environ.get('GNT_TEST_SEED'):
+        os.environ['GNT_TEST_SEED'] = str(random.SystemRandom().randrange(2 ** 32))
+
+
+def pytest_report_header(config):
+    return "GNT_TEST_SEED={}".format(os.environ['GNT_TEST_SEED'])
+
+
+@pytest.fixture(autouse=True)
+def gnt_profile(request):
+    directory = request.config.getoption('--gnt-profile')
+    if directory is None:
+        yield
+        return
+
+    import profiler
+    p = profiler.Profiler(opcodes=not request.config.getoption('--gnt-profile-no-opcodes'))
+    with p:
+        yield
+    if p.transactions:
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        name = request.node.nodeid.split('/')[-1].replace('.py', '').replace('::', '.')
+        p.save_json(os.path.join(directory, name + '.json'))
+        p.save_folded(os.path.join(directory, name + '.folded'))
@@ -0,0 +1,177 @@
+"""
+Event log store for the tests.
+
+Logs of a tester state are recorded as they are added to the block and
+decoded with the contract's ABI only when they are queried. Every recorded log
+is indexed by the event type, by the values of its indexed arguments
+(e.g. `_from` and `_to` of Transfer) and by the block number, so queries do
+not scan or decode unrelated logs.
+
+Logs of any contract are recorded if the ABI knows their event type, e.g. a
+Transfer of GNTTargetToken is recorded by a store listening with the GNT ABI.
+"""
+import bisect
+import binascii
+import numbers
+from contextlib import contextmanager
+
+
+def topic(value):
+    """
+    Return the topic (int) of an indexed argument value given as an int, as
+    a 20 byte address or as a hex string.
+    """
+    if isinstance(value, numbers.Integral):
+        return value
+    if len(value) == 20:
+        return int(binascii.hexlify(value), 16)
+    if value.startswith('0x'):
+        value = value[2:]
+    return int(value, 16)
+
+
+def _contains(positions, pos):
+    i = bisect.bisect_left(positions, pos)
+    return i < len(positions) and positions[i] == pos
+
+
+def _matches(event, params):
+    return all(event.get(n) == v for n, v in params.items())
+
+
+class EventStore(object):
+
+    def __init__(self, translator):
+        self.translator = translator
+        self._state = None
+        self._logs = []
+        self._blocks = []  # block numbers of the logs, ascending
+        self._decoded = {}
+        self._by_type = {}  # event type -> positions of logs
+        self._by_arg = {}  # (event type, argument name, topic) -> positions
+        self._by_topic = {}  # topic of any indexed argument -> positions
+        self._cursor = 0  # next event returned by event()
+
+        # event id (topics[0]) -> (event type, names of indexed arguments)
+        self._events = {}
+        self._indexed = {}
+        for event_id, event in translator.event_data.items():
+            indexed = [n for n, i in zip(event['names'], event['indexed']) if i]
+            self._events[event_id] = (event['name'], indexed)
+            self._indexed[event['name']] = indexed
+
+    def hook(self, state):
+        # Listeners are shared by the blocks mined after the hook.
+        self._state = state
+        state.block.log_listeners.append(self._listen)
+
+    def unhook(self):
+        listeners = self._state.block.log_listeners
+        if self._listen in listeners:
+            listeners.remove(self._listen)
+
+    def __len__(self):
+        return len(self._logs)
+
+    def _listen(self, log):
+        if not log.topics or log.topics[0] not in self._events:
+            return
+        event_type, indexed = self._events[log.topics[0]]
+        pos = len(self._logs)
+        self._logs.append(log)
+        self._blocks.append(self._state.block.number)
+        self._by_type.setdefault(event_type, []).append(pos)
+        for name, t in zip(indexed, log.topics[1:]):
+            self._by_arg.setdefault((event_type, name, t), []).append(pos)
+            positions = self._by_topic.setdefault(t, [])
+            if not positions or positions[-1] != pos:
+                positions.append(pos)
+
+    def decode(self, pos):
+        """
+        Return the decoded event of the log at position `pos`.
+        """
+        event = self._decoded.get(pos)
+        if event is None:
+            event = self._decoded[pos] = self.translator.listen(self._logs[pos])
+        return event
+
+    def _select(self, event_type, involving, from_block, to_block, params):
+        """
+        Return positions of the logs matching the indexes and the parameters
+        which have to be compared after decoding.
+        """
+        params = dict(params)
+        candidates = []
+        if event_type is not None:
+            candidates.append(self._by_type.get(event_type, []))
+            for name in self._indexed.get(event_type, []):
+                if name in params:
+                    key = (event_type, name, topic(params.pop(name)))
+                    candidates.append(self._by_arg.get(key, []))
+        if involving is not None:
+            candidates.append(self._by_topic.get(topic(involving), []))
+
+        if candidates:
+            candidates.sort(key=len)
+            positions, others = candidates[0], candidates[1:]
+        else:
+            positions, others = range(len(self._logs)), []
+
+        lo, hi = 0, len(positions)
+        if from_block is not None:
+            start = bisect.bisect_left(self._blocks, from_block)
+            lo = bisect.bisect_left(positions, start)
+        if to_block is not None:
+            end = bisect.bisect_right(self._blocks, to_block)
+            hi = bisect.bisect_left(positions, end)
+
+        selected = [p for p in positions[lo:hi] if all(_contains(o, p) for o in others)]
+        return selected, params
+
+    def find(self, event_type=None, involving=None, from_block=None, to_block=None, **params):
+        """
+        Return the decoded events, in the order they were logged, of the type
+        `event_type`, with an indexed argument equal to the address `involving`,
+        logged in the blocks `from_block` to `to_block` (inclusive) and with
+        arguments equal to `params`.
+        """
+        positions, params = self._select(event_type, involving, from_block, to_block, params)
+        events = (self.decode(p) for p in positions)
+        return [e for e in events if _matches(e, params)]
+
+    def count(self, event_type=None, involving=None, from_block=None, to_block=None, **params):
+        positions, params = self._select(event_type, involving, from_block, to_block, params)
+        if not params:
+            return len(positions)
+        return sum(1 for p in positions if _matches(self.decode(p), params))
+
+    def event(self, event_type, **params):
+        """
+        Consume the next event in the order they were logged. Return True if
+        it is of `event_type` and has arguments equal to `params`.
+        """
+        if self._cursor < len(self._logs):
+            event = self.decode(self._cursor)
+            self._cursor += 1
+            return event['_event_type'] == event_type and _matches(event, params)
+
+    def pending(self):
+        """
+        Return the number of events not consumed by event().
+        """
+        return len(self._logs) - self._cursor
+
+
+@contextmanager
+def listening(contract, state):
+    """
+    Record events of `contract` (tester.ABIContract) in `state` while in the
+    context.
+    """
+    store = EventStore(contract.translator)
+    store.hook(state)
+    try:
+        yield store
+    finally:
+        store.unhook()
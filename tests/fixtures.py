@@ -0,0 +1,125 @@
+"""
+Chain fixtures: named test scenarios built once per test session.
+
+A scenario is a function which brings a tester.state to some well known point
+(e.g. GNT deployed, funding in progress, GNT finalized) and records the
+addresses and values the tests need in a dictionary. The scenario is built the
+first time it is loaded and the resulting state is snapshotted. Following
+loads revert the state to the snapshot instead of building it again.
+
+Scenarios can extend another one: the parent is loaded first and the child
+continues from the parent's state. All scenarios of a chain share one
+tester.state object (snapshots are only valid within the database they were
+taken in), so a test should load a single scenario.
+
+    @scenario('gnt')
+    def gnt_scenario(state, env):
+        env['gnt'] = deploy(state, ...)
+
+    @scenario('gnt_finalized', parent='gnt')
+    def gnt_finalized_scenario(state, env):
+        ...
+
+    state, env = load('gnt_finalized')
+
+The shared GNT scenarios are defined in scenarios.py, which is imported on the
+first load of a scenario that is not registered.
+
+Scenarios registered with `persist=True` are also stored on disk (see
+genesis.py) in `tests/.state_cache`, or in the directory GNT_STATE_CACHE. Next
+test sessions start such a scenario from the stored accounts instead of
+replaying its chain. A stored scenario is keyed by the compiled contracts, the
+contract sources, the storage format and the builders of its chain, changing
+any of them builds it again. If a contract is not built, the scenario is neither
+loaded nor stored.
+"""
+import glob
+import hashlib
+import inspect
+import os
+
+from ethereum import tester
+
+import artifacts
+import genesis
+
+CACHE_DIR = os.environ.get('GNT_STATE_CACHE') or os.path.join(artifacts.TESTS_DIR, '.state_cache')
+
+_scenarios = {}
+_snapshots = {}
+
+
+def scenario(name, parent=None, persist=False):
+    def register(builder):
+        if name in _scenarios:
+            raise ValueError("scenario {} already registered".format(name))
+        _scenarios[name] = (builder, parent, persist)
+        return builder
+    return register
+
+
+def load(name):
+    """
+    Return a tuple (state, env) of the scenario `name` in the state it was
+    right after it had been built.
+    """
+    if name not in _snapshots:
+        _snapshots[name] = _build(name)
+
+    state, snapshot, env = _snapshots[name]
+    state.revert(snapshot)
+    return state, dict(env)
+
+
+def cache_key(name):
+    """
+    Return the key of the stored scenario `name`, None if a contract is not
+    built.
+    """
+    h = hashlib.sha256(genesis.FORMAT)
+    for artifact in artifacts.ALL:
+        try:
+            h.update(artifact.name + artifact.init)
+        except IOError:
+            return None
+    for path in sorted(glob.glob(artifacts.contract_path('*.sol'))):
+        with open(path) as f:
+            h.update(f.read())
+    while name is not None:
+        builder, name, _ = _registered(name)
+        h.update(inspect.getsource(builder))
+    return h.hexdigest()
+
+
+def _registered(name):
+    if name not in _scenarios:
+        import scenarios  # noqa, registers the shared scenarios
+    return _scenarios[name]
+
+
+def cache_path(name):
+    """
+    Return the path of the stored scenario `name`, None if it can't be stored.
+    """
+    key = cache_key(name)
+    if key is None:
+        return None
+    return os.path.join(CACHE_DIR, '{}-{}.json.gz'.format(name, key))
+
+
+def _build(name):
+    builder, parent, persist = _registered(name)
+    path = cache_path(name) if persist else None
+    if path is not None and os.path.exists(path):
+        state, env = genesis.load(path)
+        return state, state.snapshot(), env
+
+    if parent is None:
+        state, env = tester.state(), {}
+    else:
+        state, env = load(parent)
+
+    builder(state, env)
+    if path is not None:
+        genesis.save(path, state, env)
+    return state, state.snapshot(), env
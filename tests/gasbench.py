@@ -0,0 +1,169 @@
+"""
+Gas benchmarks with stored baselines.
+
+Measurements are compared with the baseline file, tests/gas_baseline.json by
+default. A measurement is a regression if it exceeds its baseline by more
+than the tolerance percentage. A missing baseline file or a measurement
+missing from the baseline fails the benchmarks unless the baseline is being
+updated, so new benchmarks are stored and committed with the baseline. Test
+classes (BenchmarkMixin) without their baseline file are skipped, a plain
+test run works before the first baseline is stored.
+
+The baseline and the results files are merged with the measurements under a
+lock, benchmarks of test classes run by parallel workers (pytest-xdist) may
+share them.
+
+    class TokenGasTest(BenchmarkMixin, unittest.TestCase):
+
+        def test_finalize(self):
+            gnt = GNT.deploy(self.state, ...)
+            ...
+            self.gas('GolemNetworkToken.finalize', gnt.finalize)
+            self.assert_no_regressions()
+
+Environment:
+    GNT_GAS_BASELINE         path of the baseline file
+    GNT_WALLET_GAS_BASELINE  path of the baseline file of the Wallet benchmarks
+                             in test_wallet.py
+    GNT_GAS_TOLERANCE        allowed increase over the baseline in percent (default 0)
+    GNT_GAS_UPDATE           if set to 1, store the measurements as the new baseline
+    GNT_GAS_RESULTS          if set, path of a file the measurements are merged into
+"""
+import fcntl
+import json
+import os
+import tempfile
+import unittest
+
+from ethereum import tester
+
+from artifacts import TESTS_DIR
+
+BASELINE_PATH = os.environ.get('GNT_GAS_BASELINE', os.path.join(TESTS_DIR, 'gas_baseline.json'))
+WALLET_BASELINE_PATH = os.environ.get('GNT_WALLET_GAS_BASELINE',
+                                      os.path.join(TESTS_DIR, 'wallet_gas_baseline.json'))
+TOLERANCE = float(os.environ.get('GNT_GAS_TOLERANCE', 0))
+UPDATE = os.environ.get('GNT_GAS_UPDATE') == '1'
+RESULTS_PATH = os.environ.get('GNT_GAS_RESULTS')
+
+
+class MissingBaseline(Exception):
+    pass
+
+
+class GasBenchmark(object):
+
+    def __init__(self, baseline_path=BASELINE_PATH, tolerance=TOLERANCE, unit='gas', update=UPDATE,
+                 results_path=RESULTS_PATH):
+        self.baseline_path = baseline_path
+        self.tolerance = tolerance
+        self.unit = unit
+        self.update = update
+        self.results_path = results_path
+        if os.path.exists(baseline_path):
+            self.baseline = load(baseline_path)
+        elif update:
+            self.baseline = {}
+        else:
+            raise MissingBaseline("no baseline {}".format(baseline_path))
+        self.results = {}
+
+    def record(self, name, gas):
+        """
+        Record gas used (or other `unit`) by the benchmark `name`. Return a
+        description of the regression or None.
+        """
+        self.results[name] = gas
+        expected = self.baseline.get(name)
+        if expected is None:
+            return None if self.update else "{}: {} {}, no baseline".format(name, gas, self.unit)
+        if gas > expected * (1 + self.tolerance / 100.0):
+            return "{}: {} {}, baseline {} (+{:.2f}%)".format(
+                name, gas, self.unit, expected, 100.0 * (gas - expected) / expected if expected else float('inf'))
+
+    def save(self):
+        if self.update:
+            merge(self.baseline_path, self.results)
+        if self.results_path:
+            merge(self.results_path, self.results)
+
+
+class BenchmarkMixin(object):
+    """
+    Benchmark of a unittest.TestCase shared by its tests and saved after the
+    last one. A test records measurements, `gas` and `measure` run a
+    function in self.state, and ends with assert_no_regressions.
+    """
+    regressions_title = 'gas regressions'
+    # Stores the missing baseline of a skipped class.
+    baseline_target = 'make gas-baseline'
+
+    @classmethod
+    def benchmark(cls):
+        return GasBenchmark()
+
+    @classmethod
+    def setUpClass(cls):
+        try:
+            cls.bench = cls.benchmark()
+        except MissingBaseline as e:
+            raise unittest.SkipTest("{}, store it with `{}`".format(e, cls.baseline_target))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.bench.save()
+
+    def setUp(self):
+        self.state = tester.state()
+        self.regressions = []
+
+    def record(self, name, value):
+        regression = self.bench.record(name, value)
+        if regression:
+            self.regressions.append(regression)
+
+    def measure(self, f, *args, **kwargs):
+        """
+        Return the result of `f` and the gas it used.
+        """
+        gas_before = self.state.block.gas_used
+        result = f(*args, **kwargs)
+        return result, self.state.block.gas_used - gas_before
+
+    def gas(self, name, f, *args, **kwargs):
+        """
+        Record the gas used by `f` as the benchmark `name`, return the result
+        of `f`.
+        """
+        result, gas = self.measure(f, *args, **kwargs)
+        self.record(name, gas)
+        return result
+
+    def assert_no_regressions(self):
+        assert not self.regressions, self.regressions_title + ":\n" + "\n".join(self.regressions)
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def merge(path, results):
+    """
+    Update the entries of the file `path` with `results`. The file is read
+    and written under a lock, other processes may update it at the same time.
+    """
+    with open(path + '.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        stored = load(path) if os.path.exists(path) else {}
+        stored.update(results)
+        store(path, stored)
+
+
+def store(path, results):
+    # Entries are sorted so the baseline file diffs nicely between commits.
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True, separators=(',', ': '))
+        f.write('\n')
+    os.rename(tmp_path, path)
@@ -0,0 +1,114 @@
+"""
+Serialized tester states.
+
+dump() captures a tester.state: every account with its balance, nonce, code
+and storage, and the fields of the current block. restore() creates a new
+tester.state with these accounts in its genesis block and the block fields
+set back, so transactions continue as on the original state. The history of
+the chain (previous blocks, transactions and logs) is not kept.
+
+save() and load() store a state with the environment of a scenario (see
+fixtures.py) in a gzipped JSON file.
+"""
+import gzip
+import json
+import os
+import tempfile
+
+from ethereum import blocks, tester
+from ethereum.utils import decode_hex, encode_hex
+
+# Version of the file format, part of the cache keys of stored scenarios.
+FORMAT = '1'
+
+BLOCK_FIELDS = ('number', 'timestamp', 'difficulty', 'gas_limit', 'gas_used')
+
+
+def dump(state):
+    """
+    Return the accounts and the current block fields of `state`.
+    """
+    block = state.block
+    block.commit_state()
+    accounts = {}
+    for address in block.state.to_dict():
+        account = block.account_to_dict(address)
+        accounts[encode_hex(address)] = dict((field, account[field])
+                                             for field in ('balance', 'nonce', 'code', 'storage'))
+    fields = dict((field, getattr(block, field)) for field in BLOCK_FIELDS)
+    fields['coinbase'] = encode_hex(block.coinbase)
+    return {'accounts': accounts, 'block': fields}
+
+
+def restore(data):
+    """
+    Return a new tester.state with the accounts and block fields `data`
+    returned by dump().
+    """
+    state = tester.state()
+    block = blocks.genesis(state.env, start_alloc=data['accounts'])
+    for field in BLOCK_FIELDS:
+        setattr(block, field, data['block'][field])
+    block.coinbase = decode_hex(data['block']['coinbase'])
+    state.block = block
+    state.blocks = [block]
+    return state
+
+
+def save(path, state, env):
+    """
+    Store `state` and the scenario environment `env` in the file `path`.
+    """
+    dir_name = os.path.dirname(path)
+    if not os.path.isdir(dir_name):
+        try:
+            os.makedirs(dir_name)
+        except OSError:
+            if not os.path.isdir(dir_name):
+                raise
+
+    # Write to a temporary file first so concurrent readers never see
+    # a partially written state.
+    fd, tmp_path = tempfile.mkstemp(dir=dir_name, suffix='.tmp')
+    os.close(fd)
+    f = gzip.open(tmp_path, 'wb')
+    try:
+        json.dump({'state': dump(state), 'env': _encode(env)}, f, sort_keys=True)
+    finally:
+        f.close()
+    os.rename(tmp_path, path)
+
+
+def load(path):
+    """
+    Return a tuple (state, env) stored by save().
+    """
+    f = gzip.open(path, 'rb')
+    try:
+        data = json.load(f)
+    finally:
+        f.close()
+    return restore(_decode(data['state'])), _decode(data['env'])
+
+
+def _encode(value):
+    # Byte strings (addresses, keys) are stored as {"hex": ...}.
+    if isinstance(value, bytes):
+        return {'hex': encode_hex(value)}
+    if isinstance(value, (list, tuple)):
+        return [_encode(v) for v in value]
+    if isinstance(value, dict):
+        return dict((k, _encode(v)) for k, v in value.items())
+    return value
+
+
+def _decode(value):
+    if isinstance(value, dict):
+        if set(value) == {'hex'}:
+            return decode_hex(value['hex'])
+        return dict((str(k), _decode(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    if isinstance(value, type(u'')):
+        return str(value)
+    return value
@@ -0,0 +1,71 @@
+"""
+Merkle trees of allocations for GNTMerkleAllocation.sol.
+
+A leaf is sha3(holder, allocations) of the tightly packed 20 byte address and
+32 byte number, as computed by Solidity. An inner node is sha3 of its two
+children in ascending order, a proof is the list of siblings from the leaf up.
+A node without a sibling is moved to the next level unchanged.
+
+    tree = AllocationTree([(factory, 20000), (dev, 2500), ...])
+    allocation = deploy_merkle_allocation(state, gnt, tree.root, tree.total)
+    allocation.unlock(2500, tree.proof(dev), sender=dev_key)
+"""
+from ethereum.utils import int_to_big_endian, normalize_address, sha3, zpad
+
+
+def leaf(holder, allocations):
+    return sha3(normalize_address(holder) + zpad(int_to_big_endian(allocations), 32))
+
+
+def node(a, b):
+    return sha3(a + b) if a < b else sha3(b + a)
+
+
+def verify(root, holder, allocations, proof):
+    h = leaf(holder, allocations)
+    for sibling in proof:
+        h = node(h, sibling)
+    return h == root
+
+
+class AllocationTree(object):
+
+    def __init__(self, allocations):
+        """
+        Build the tree of `allocations`, a list of (holder, allocations).
+        """
+        if not allocations:
+            raise ValueError("no allocations")
+        self.allocations = [(normalize_address(h), a) for h, a in allocations]
+        self.total = sum(a for _, a in self.allocations)
+        self._index = dict((h, i) for i, (h, _) in enumerate(self.allocations))
+        if len(self._index) != len(self.allocations):
+            raise ValueError("duplicate holder")
+
+        self.levels = [[leaf(h, a) for h, a in self.allocations]]
+        while len(self.levels[-1]) > 1:
+            below = self.levels[-1]
+            level = [node(below[i], below[i + 1]) for i in range(0, len(below) - 1, 2)]
+            if len(below) % 2:
+                level.append(below[-1])
+            self.levels.append(level)
+
+    @property
+    def root(self):
+        return self.levels[-1][0]
+
+    def allocation(self, holder):
+        return self.allocations[self._index[normalize_address(holder)]][1]
+
+    def proof(self, holder):
+        """
+        Return the siblings of the leaf of `holder` from the bottom up.
+        """
+        i = self._index[normalize_address(holder)]
+        proof = []
+        for level in self.levels[:-1]:
+            sibling = i ^ 1
+            if sibling < len(level):
+                proof.append(level[sibling])
+            i //= 2
+        return proof
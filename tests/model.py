@@ -0,0 +1,184 @@
+"""
+Pure-Python reference model of GolemNetworkToken (FundedToken and the
+token operations of Token.sol).
+
+The model follows the contracts statement by statement, but without the
+EVM: a sequence of thousands of operations runs in milliseconds. It is used
+as an oracle by the property-based tests (test_model.py). Operations that
+throw in the contract raise Throw and leave the model unchanged.
+"""
+from ethereum.utils import denoms
+
+TOKEN_CREATION_RATE = 1000
+TOKEN_CREATION_CAP = 820000 * denoms.ether * TOKEN_CREATION_RATE
+TOKEN_CREATION_MIN = 150000 * denoms.ether * TOKEN_CREATION_RATE
+
+# Additional tokens created by finalize(), percent of the total.
+PERCENT_OF_TOTAL = 18
+
+
+class Throw(Exception):
+    pass
+
+
+def check(condition):
+    if not condition:
+        raise Throw()
+
+
+class GNTModel(object):
+
+    def __init__(self, golem_factory, migration_master, funding_start_block, funding_end_block,
+                 locked_allocation='allocation'):
+        self.golem_factory = golem_factory
+        self.migration_master = migration_master
+        self.funding_start_block = funding_start_block
+        self.funding_end_block = funding_end_block
+        self.locked_allocation = locked_allocation
+        self.funding_mode = True
+        self.total_tokens = 0
+        self.balances = {}
+        self.eth = 0  # ether balance of the contract
+        self.migration_agent = None
+        self.total_migrated = 0
+        self.migrated = {}  # tokens created in the target token
+
+    # Constant functions:
+
+    def total_supply(self):
+        return self.total_tokens
+
+    def balance_of(self, owner):
+        return self.balances.get(owner, 0)
+
+    def finalized(self):
+        return not self.funding_mode
+
+    def funding_active(self, block_number):
+        return (self.funding_mode and
+                self.funding_start_block <= block_number <= self.funding_end_block and
+                self.total_tokens < TOKEN_CREATION_CAP)
+
+    def number_of_tokens_left(self, block_number):
+        if not self.funding_mode or block_number > self.funding_end_block:
+            return 0
+        return TOKEN_CREATION_CAP - self.total_tokens
+
+    # Crowdfunding:
+
+    def create(self, sender, value, block_number):
+        """
+        The payable fallback function.
+        """
+        check(self.funding_mode)
+        check(block_number >= self.funding_start_block)
+        check(block_number <= self.funding_end_block)
+        check(self.total_tokens < TOKEN_CREATION_CAP)
+        check(value > 0)
+
+        num_tokens = value * TOKEN_CREATION_RATE
+        check(self.total_tokens + num_tokens <= TOKEN_CREATION_CAP)
+
+        self.total_tokens += num_tokens
+        self.balances[sender] = self.balance_of(sender) + num_tokens
+        self.eth += value
+
+    def finalize(self, block_number):
+        """
+        Return the ether sent to the Golem Factory.
+        """
+        check(self.funding_mode)
+        check((block_number > self.funding_end_block and self.total_tokens >= TOKEN_CREATION_MIN) or
+              self.total_tokens >= TOKEN_CREATION_CAP)
+
+        self.funding_mode = False
+        sent, self.eth = self.eth, 0
+
+        additional = self.total_tokens * PERCENT_OF_TOTAL // (100 - PERCENT_OF_TOTAL)
+        self.total_tokens += additional
+        self.balances[self.locked_allocation] = self.balance_of(self.locked_allocation) + additional
+        return sent
+
+    def refund(self, sender, block_number):
+        """
+        Return the ether refunded to `sender`.
+        """
+        check(self.funding_mode)
+        check(block_number > self.funding_end_block)
+        check(self.total_tokens < TOKEN_CREATION_MIN)
+
+        gnt_value = self.balance_of(sender)
+        check(gnt_value > 0)
+
+        eth_value = gnt_value // TOKEN_CREATION_RATE
+        self.balances[sender] = 0
+        self.total_tokens -= gnt_value
+        self.eth -= eth_value
+        return eth_value
+
+    # Token operations:
+
+    def transfer(self, sender, to, value):
+        check(not self.funding_mode)
+
+        sender_balance = self.balance_of(sender)
+        if sender_balance >= value > 0:
+            self.balances[sender] = sender_balance - value
+            self.balances[to] = self.balance_of(to) + value
+            return True
+        return False
+
+    def batch_transfer(self, sender, recipients, values):
+        check(not self.funding_mode)
+        check(len(recipients) == len(values))
+
+        # Tokens sent to self stay in the sender's balance.
+        sender_balance = self.balance_of(sender)
+        credits = []
+        for to, value in zip(recipients, values):
+            check(0 < value <= sender_balance)
+            if to != sender:
+                sender_balance -= value
+                credits.append((to, value))
+
+        for to, value in credits:
+            self.balances[to] = self.balance_of(to) + value
+        self.balances[sender] = sender_balance
+        return True
+
+    def set_migration_agent(self, sender, agent):
+        check(not self.funding_mode)
+        check(self.migration_agent is None)
+        check(sender == self.migration_master)
+        self.migration_agent = agent
+
+    def set_migration_master(self, sender, master):
+        check(sender == self.migration_master)
+        self.migration_master = master
+
+    def migrate(self, sender, value):
+        check(not self.funding_mode)
+        check(self.migration_agent is not None)
+        check(0 < value <= self.balance_of(sender))
+
+        self.balances[sender] -= value
+        self.total_tokens -= value
+        self.total_migrated += value
+        self.migrated[sender] = self.migrated.get(sender, 0) + value
+
+    def migrate_batch(self, sender, recipients, values):
+        check(not self.funding_mode)
+        check(self.migration_agent is not None)
+        check(len(recipients) == len(values))
+
+        sender_balance = self.balance_of(sender)
+        for value in values:
+            check(0 < value <= sender_balance)
+            sender_balance -= value
+        total = self.balance_of(sender) - sender_balance
+
+        self.balances[sender] = sender_balance
+        self.total_tokens -= total
+        self.total_migrated += total
+        for to, value in zip(recipients, values):
+            self.migrated[to] = self.migrated.get(to, 0) + value
@@ -0,0 +1,423 @@
+"""
+Gas and wall time profiles of the transactions executed by the tester.
+
+While a Profiler is active, every transaction applied to a tester block is
+recorded with the gas it used and the tree of its call frames, e.g.
+GolemNetworkToken.migrate -> MigrationAgent.migrateFrom ->
+GNTTargetToken.createToken, with the gas and the wall time spent in every
+frame. With `opcodes` the gas of every frame is also split into opcode
+classes (see opcode_class()). The EVM then runs in its tracing mode, which
+inflates the wall times several times.
+
+    with Profiler() as profiler:
+        gnt.migrate(tokens, sender=tester.k0)
+    profiler.save_json('migrate.json')
+    profiler.save_folded('migrate.folded')  # flamegraph.pl migrate.folded > migrate.svg
+
+Frames are named <contract>.<function>. Contracts are identified by their
+code (see artifacts.identify()), other ones can be named with
+Profiler.name(), the rest are shown by address.
+
+The gas of an opcode is the gas its frame had before it minus the gas the
+frame had before the next opcode. Memory expansion is counted with the
+opcode causing it, CALL and CREATE don't include the gas used by the called
+frame. The gas of a frame includes the frames it called and the gas stipend
+of a call with value, which the caller doesn't pay. The gas of a
+transaction is the gas used in the block, including the intrinsic gas and
+the refunds not counted in frames.
+
+With `opcodes` the storage accesses of every transaction are recorded too,
+see Transaction.storage_report(). Slots of mapping entries are shown as
+<slot>[<key>] when their key is found among the SHA3 inputs.
+
+Run the tests with `--gnt-profile DIR` to profile every test (see conftest.py).
+"""
+import json
+import time
+
+from ethereum import opcodes, processblock, vm
+from ethereum.utils import big_endian_to_int, decode_hex, encode_hex, encode_int, normalize_address, zpad
+
+import artifacts
+
+CALL_OPCODES = ('CALL', 'CALLCODE', 'DELEGATECALL', 'CREATE', 'SUICIDE')
+MEMORY_OPCODES = ('MLOAD', 'MSTORE', 'MSTORE8', 'MSIZE', 'CALLDATACOPY', 'CODECOPY', 'EXTCODECOPY')
+
+# Kinds of SSTOREs by the value of the slot before and after.
+WRITES = ('zero_to_nonzero', 'nonzero_to_nonzero', 'nonzero_to_zero', 'unchanged')
+
+_selectors = {}
+
+
+def opcode_class(op):
+    """
+    Return the class of the opcode `op`: SSTORE, SLOAD, SHA3, CALL (calls,
+    creations and self-destruction), LOG, memory or other.
+    """
+    if op in ('SSTORE', 'SLOAD', 'SHA3'):
+        return op
+    if op in CALL_OPCODES:
+        return 'CALL'
+    if op.startswith('LOG'):
+        return 'LOG'
+    if op in MEMORY_OPCODES:
+        return 'memory'
+    return 'other'
+
+
+def function_name(artifact, data):
+    """
+    Return the name of the function of `artifact` called with `data`.
+    """
+    if not data:
+        return 'fallback'
+    if artifact.name not in _selectors:
+        _selectors[artifact.name] = dict(
+            (zpad(encode_int(f['prefix']), 4), name)
+            for name, f in artifact.translator.function_data.items())
+    return _selectors[artifact.name].get(data[:4], 'fallback')
+
+
+def slot_label(slot, preimages):
+    """
+    Return the name of the storage `slot`, `preimages` maps the SHA3 hashes
+    of mapping entries to their (key, slot).
+    """
+    if slot in preimages:
+        key, base = preimages[slot]
+        return '{}[0x{:x}]'.format(slot_label(base, preimages), key)
+    if slot < 2 ** 64:
+        return str(slot)
+    return '0x{:x}'.format(slot)
+
+
+class SlotAccess(object):
+    """
+    Accesses of a storage slot in a transaction.
+    """
+
+    def __init__(self, value):
+        # the value before the first access
+        self.initial = value
+        self.reads = 0
+        self.writes = dict((kind, 0) for kind in WRITES)
+
+    @property
+    def cold(self):
+        return self.initial == 0
+
+    def write(self, value, new_value):
+        if value == new_value:
+            kind = 'unchanged'
+        elif value == 0:
+            kind = 'zero_to_nonzero'
+        elif new_value == 0:
+            kind = 'nonzero_to_zero'
+        else:
+            kind = 'nonzero_to_nonzero'
+        self.writes[kind] += 1
+
+
+class Frame(object):
+    """
+    Execution of contract code in a message call or a contract creation.
+    """
+
+    def __init__(self, label, gas, address=None):
+        self.label = label
+        self.address = address
+        self.start_gas = gas
+        self.gas = 0
+        self.time = 0.0
+        self.calls = []
+        self.opcodes = {}
+        self._calls_gas = 0
+        self._stipends = 0
+        self._op = None
+        self._op_gas = 0
+        self._sha3 = None
+
+    def step(self, op, gas):
+        """
+        Start the opcode `op` with `gas` left in the frame.
+        """
+        self._end_op(gas)
+        self._op = op
+        self._op_gas = gas
+
+    def _end_op(self, gas):
+        if self._op is not None:
+            counts = self.opcodes.setdefault(opcode_class(self._op), {'count': 0, 'gas': 0})
+            counts['count'] += 1
+            counts['gas'] += self._op_gas - gas - self._calls_gas
+            self._calls_gas = 0
+
+    def call(self, frame, stipend=0):
+        """
+        Add the finished `frame` called from the current opcode.
+        """
+        self.calls.append(frame)
+        self._calls_gas += frame.gas - stipend
+        self._stipends += stipend
+
+    def exit(self, gas, elapsed):
+        self._end_op(gas)
+        self.gas = self.start_gas - gas
+        self.time = elapsed
+
+    @property
+    def self_gas(self):
+        return self.gas - sum(c.gas for c in self.calls) + self._stipends
+
+    @property
+    def self_time(self):
+        return self.time - sum(c.time for c in self.calls)
+
+    def to_dict(self):
+        return {
+            'label': self.label,
+            'gas': self.gas,
+            'self_gas': self.self_gas,
+            'time': self.time,
+            'self_time': self.self_time,
+            'opcodes': self.opcodes,
+            'calls': [c.to_dict() for c in self.calls],
+        }
+
+    def folded(self, stack=()):
+        """
+        Yield (stack, gas) of this frame and of the frames it called. With
+        opcode classes recorded they are the leaves of the stack.
+        """
+        stack = stack + (self.label,)
+        if self.opcodes:
+            for name in sorted(self.opcodes):
+                yield stack + (name,), self.opcodes[name]['gas']
+        else:
+            yield stack, self.self_gas
+        for c in self.calls:
+            for s in c.folded(stack):
+                yield s
+
+
+class Transaction(object):
+
+    def __init__(self, tx, gas, elapsed, success, frames, storage=None, preimages=None, contracts=None):
+        self.to = encode_hex(tx.to) if tx.to else None
+        self.gas = gas
+        self.time = elapsed
+        self.success = success
+        self.frames = frames
+        # {address: {slot: SlotAccess}}
+        self.storage = storage or {}
+        self.preimages = preimages or {}
+        self.contracts = contracts or {}
+
+    @property
+    def label(self):
+        return self.frames[0].label if self.frames else self.to
+
+    @property
+    def opcodes(self):
+        totals = {}
+        stack = list(self.frames)
+        while stack:
+            frame = stack.pop()
+            stack.extend(frame.calls)
+            for name, counts in frame.opcodes.items():
+                total = totals.setdefault(name, {'count': 0, 'gas': 0})
+                total['count'] += counts['count']
+                total['gas'] += counts['gas']
+        return totals
+
+    def storage_report(self):
+        """
+        Return the numbers of SLOADs (`reads`), SSTOREs (`writes`) and of
+        SSTOREs of each kind in WRITES, the numbers of slots accessed which
+        were zero (`cold_slots`) or set (`set_slots`) before the transaction
+        and the accesses of every slot by contract and slot name.
+        """
+        report = dict((kind, 0) for kind in WRITES)
+        report.update({'reads': 0, 'writes': 0, 'cold_slots': 0, 'set_slots': 0, 'slots': {}})
+        for address, slots in self.storage.items():
+            contract = report['slots'].setdefault(self.contracts.get(address, '0x' + encode_hex(address)), {})
+            for slot, access in slots.items():
+                writes = sum(access.writes.values())
+                report['reads'] += access.reads
+                report['writes'] += writes
+                report['cold_slots' if access.cold else 'set_slots'] += 1
+                for kind in WRITES:
+                    report[kind] += access.writes[kind]
+                contract[slot_label(slot, self.preimages)] = dict(access.writes, reads=access.reads,
+                                                                  writes=writes, cold=access.cold)
+        return report
+
+    def to_dict(self):
+        return {
+            'label': self.label,
+            'to': self.to,
+            'gas': self.gas,
+            'evm_gas': sum(f.gas for f in self.frames),
+            'time': self.time,
+            'evm_time': sum(f.time for f in self.frames),
+            'success': self.success,
+            'opcodes': self.opcodes,
+            'frames': [f.to_dict() for f in self.frames],
+            'storage': self.storage_report(),
+        }
+
+
+class _OpTracer(object):
+    """
+    Replaces the logger of EVM operations, passes the operations to the
+    profiler instead of logging them.
+    """
+
+    def __init__(self, profiler):
+        self.profiler = profiler
+
+    def is_active(self, level_name='trace'):
+        return True
+
+    def trace(self, event, **data):
+        self.profiler._step(data)
+
+
+class Profiler(object):
+
+    def __init__(self, opcodes=True):
+        self.opcodes = opcodes
+        self.transactions = []
+        self._names = {}
+        self._stack = []
+        self._frames = []
+        self._ext = None
+        self._storage = {}
+        self._preimages = {}
+        self._contracts = {}
+        self._saved = None
+
+    def name(self, address, name):
+        """
+        Name the contract at `address` in frame labels.
+        """
+        self._names[normalize_address(address)] = name
+
+    def start(self):
+        if self._saved is not None:
+            raise RuntimeError("profiler already started")
+        self._saved = processblock.apply_transaction, vm.vm_execute, vm.log_vm_op
+        processblock.apply_transaction = self._apply_transaction
+        vm.vm_execute = self._vm_execute
+        if self.opcodes:
+            vm.log_vm_op = _OpTracer(self)
+        return self
+
+    def stop(self):
+        processblock.apply_transaction, vm.vm_execute, vm.log_vm_op = self._saved
+        self._saved = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def label(self, msg, code):
+        artifact = artifacts.identify(code, init=msg.is_create)
+        if artifact is not None:
+            contract = artifact.name
+        else:
+            contract = self._names.get(msg.code_address or msg.to, '0x' + encode_hex(msg.code_address or msg.to))
+        self._contracts.setdefault(msg.to, contract)
+        if msg.is_create:
+            return contract + '.constructor'
+        if artifact is None:
+            return contract
+        return contract + '.' + function_name(artifact, msg.data.extract_all())
+
+    def _apply_transaction(self, block, tx):
+        gas_before = block.gas_used
+        self._frames = []
+        self._storage = {}
+        self._preimages = {}
+        self._contracts = {}
+        start = time.time()
+        success, output = self._saved[0](block, tx)
+        self.transactions.append(Transaction(tx, block.gas_used - gas_before, time.time() - start,
+                                             bool(success), self._frames, self._storage, self._preimages,
+                                             self._contracts))
+        return success, output
+
+    def _vm_execute(self, ext, msg, code):
+        if self.opcodes:
+            # tracing logs the whole storage of the contract otherwise
+            ext.log_storage = lambda address: None
+            self._ext = ext
+        frame = Frame(self.label(msg, code), msg.gas, msg.to)
+        self._stack.append(frame)
+        start = time.time()
+        try:
+            result = self._saved[1](ext, msg, code)
+        finally:
+            self._stack.pop()
+        frame.exit(result[1], time.time() - start)
+
+        if self._stack:
+            stipend = msg.transfers_value and msg.value > 0 and not msg.is_create
+            self._stack[-1].call(frame, opcodes.GSTIPEND if stipend else 0)
+        else:
+            self._frames.append(frame)
+        return result
+
+    def _step(self, data):
+        frame = self._stack[-1]
+        op = data['op']
+        stack = data['stack']
+        frame.step(op, int(data['gas']))
+
+        # the hash computed by SHA3 is on the stack of the next opcode
+        if frame._sha3 is not None:
+            offset, size = frame._sha3
+            frame._sha3 = None
+            if size == 64 and 'memory' in data:
+                preimage = decode_hex(data['memory'])[offset:offset + size]
+                self._preimages[int(stack[-1])] = big_endian_to_int(preimage[:32]), big_endian_to_int(preimage[32:])
+
+        if op == 'SHA3':
+            frame._sha3 = int(stack[-1]), int(stack[-2])
+        elif op in ('SLOAD', 'SSTORE'):
+            slot = int(stack[-1])
+            value = self._ext.get_storage_data(frame.address, slot)
+            slots = self._storage.setdefault(frame.address, {})
+            if slot not in slots:
+                slots[slot] = SlotAccess(value)
+            if op == 'SLOAD':
+                slots[slot].reads += 1
+            else:
+                slots[slot].write(value, int(stack[-2]))
+
+    def to_dict(self):
+        return {'transactions': [t.to_dict() for t in self.transactions]}
+
+    def save_json(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=1, sort_keys=True)
+
+    def folded(self):
+        """
+        Return the lines of the folded stacks of gas of all transactions, the
+        input of flamegraph.pl. The same stacks are summed.
+        """
+        totals = {}
+        for t in self.transactions:
+            for frame in t.frames:
+                for stack, gas in frame.folded():
+                    key = ';'.join(stack)
+                    totals[key] = totals.get(key, 0) + gas
+        return ['{} {}'.format(stack, gas) for stack, gas in sorted(totals.items()) if gas > 0]
+
+    def save_folded(self, path):
+        with open(path, 'w') as f:
+            for line in self.folded():
+                f.write(line + '\n')
@@ -0,0 +1,122 @@
+"""
+Shared chain scenarios of GNT (see fixtures.py) and the helpers building
+them. Test modules load the scenarios by name after importing this module.
+"""
+from ethereum import tester
+from ethereum.utils import denoms
+
+import artifacts
+import fixtures
+from accounts import FACTORY, FACTORY_KEY, create_accounts, dev_address
+from sources import compile_gnt, gnt_source
+
+# Daily limit of the Wallet contracts of the tests.
+WALLET_DAY_LIMIT = 1000 * denoms.ether
+
+# Developers' shares of the GNTAllocation contract.
+DEV_SHARES = [2500, 730, 730, 730, 730, 730, 630, 630, 630, 630, 310,
+              153, 150, 100, 100, 100, 70, 70, 70, 70, 70, 42, 25]
+
+
+def deploy_gnt(state, factory, dev_addresses, start, end, creator_idx=9, packed=True):
+    init, gnt_abi = compile_gnt(gnt_source(dev_addresses, packed=packed))
+
+    gas_before = state.block.gas_used
+
+    t = artifacts.translator(gnt_abi)
+    args = t.encode_constructor_arguments((factory, factory, start, end))
+    addr = state.evm(init + args, sender=tester.keys[creator_idx])
+    contract = tester.ABIContract(state, t, addr, listen=False)
+
+    return contract, addr, state.block.gas_used - gas_before
+
+
+def deploy_contract(state, artifact, creator_idx, *args):
+    gas_before = state.block.gas_used
+
+    contract = artifact.deploy(state, args, sender=tester.keys[creator_idx])
+
+    return contract, contract.address, state.block.gas_used - gas_before
+
+
+def create_dev_accounts(state, n_devs):
+    return create_accounts(state, [10 ** 24] * n_devs, 'dev')
+
+
+@fixtures.scenario('gnt')
+def gnt_scenario(state, env):
+    # funding period: blocks 0 - 1
+    env['gnt'] = artifacts.deploy_gnt(state, FACTORY, FACTORY, 0, 1).address
+
+
+@fixtures.scenario('gnt_funding', parent='gnt')
+def gnt_funding_scenario(state, env):
+    # every tester creates at least 15M GNT, the minimum is reached
+    for i, k in enumerate(tester.keys):
+        state.send(k, env['gnt'], (15000 + i * 5000) * denoms.ether)
+
+
+@fixtures.scenario('gnt_finalized', parent='gnt_funding', persist=True)
+def gnt_finalized_scenario(state, env):
+    state.mine(2)
+    artifacts.GNT.at(state, env['gnt']).finalize()
+    state.mine()
+
+
+@fixtures.scenario('gnt_migration', parent='gnt_finalized')
+def gnt_migration_scenario(state, env):
+    migration = artifacts.deploy_migration_agent(state, env['gnt'])
+    env['migration'] = migration.address
+    env['target'] = artifacts.deploy_target_token(state, env['migration']).address
+
+    gnt = artifacts.GNT.at(state, env['gnt'])
+    gnt.setMigrationAgent(env['migration'], sender=FACTORY_KEY)
+    migration.setTargetToken(env['target'], sender=tester.k9)
+    state.mine()
+
+
+@fixtures.scenario('gnt_devs')
+def gnt_devs_scenario(state, env):
+    # GNT compiled with developer accounts in GNTAllocation, funding period: block 2
+    env['dev_keys'], env['dev_accounts'] = create_dev_accounts(state, len(DEV_SHARES))
+    dev_addresses = [dev_address(a) for a in env['dev_accounts']]
+    _, env['gnt'], _ = deploy_gnt(state, tester.accounts[9], dev_addresses, 2, 2)
+
+
+@fixtures.scenario('gnt_unlocked', parent='gnt_devs', persist=True)
+def gnt_unlocked_scenario(state, env):
+    state.mine(2)
+    for i in range(len(tester.accounts) - 1):
+        state.send(tester.keys[i], env['gnt'], (i + 1) * 10000 * denoms.ether)
+    state.mine(1)
+
+    gnt = artifacts.GNT.at(state, env['gnt'])
+    gnt.finalize()
+    env['allocation'] = gnt.lockedAllocation()
+
+    # past the GNTAllocation lock period
+    state.mine(1)
+    state.block.timestamp += 1 * 10 ** 8
+
+
+@fixtures.scenario('proxied_gnt')
+def proxied_gnt_scenario(state, env):
+    # developers' and the Golem Factory's proxy accounts, GNT with the proxies as developers
+    available_after = state.block.timestamp + 1000
+
+    _, env['pd0'], _ = deploy_contract(state, artifacts.PROXY_ACCOUNT, 0, available_after)
+    _, env['pd1'], _ = deploy_contract(state, artifacts.PROXY_ACCOUNT, 1, available_after)
+    _, env['pd2'], _ = deploy_contract(state, artifacts.PROXY_ACCOUNT, 2, available_after)
+
+    _, env['pf'], _ = deploy_contract(state, artifacts.PROXY_FACTORY_ACCOUNT, 9, available_after)
+
+    dev_addresses = [dev_address(a) for a in [
+        env['pd0'],
+        env['pd1'],
+        env['pd2']
+    ]]
+
+    contract, env['gnt'], _ = deploy_gnt(state, env['pf'], dev_addresses, 2, 2)
+
+    env['creation_min'] = contract.tokenCreationMin()
+    env['creation_rate'] = contract.tokenCreationRate()
@@ -0,0 +1,61 @@
+"""
+Seeded random numbers for the tests.
+
+The seed is read from the GNT_TEST_SEED environment variable, which can also
+be set with the --gnt-seed pytest option (see conftest.py). Without it a seed
+is chosen at random and reported in the pytest header, so a run can be
+repeated. Every test gets its own generator, derived from the seed and the
+test id: the numbers a test draws do not depend on the tests that ran before
+it or on the worker it runs in.
+
+Gas used by a transaction depends on its data: every zero byte costs 4 gas,
+every non-zero byte 68 gas. The best_case_* and worst_case_* generators give
+inputs with the fewest and the most non-zero bytes.
+"""
+import hashlib
+import os
+import random
+
+SEED = int(os.environ.get('GNT_TEST_SEED') or random.SystemRandom().randrange(2 ** 32))
+
+
+def rng(test_id):
+    """
+    Return a random.Random for the test `test_id` seeded with SEED.
+    """
+    seed = hashlib.sha256('{}:{}'.format(SEED, test_id).encode('utf-8')).hexdigest()
+    return random.Random(int(seed, 16))
+
+
+def random_bytes(_rng, n):
+    return ''.join(chr(_rng.randrange(256)) for _ in range(n))
+
+
+def best_case_address():
+    return '\x00' * 19 + '\x01'
+
+
+def worst_case_address():
+    return '\xff' * 20
+
+
+def best_case_value(minimum=1):
+    """
+    Return the lowest value not lower than `minimum` with a single non-zero byte.
+    """
+    shift = 8 * ((minimum.bit_length() - 1) // 8) if minimum > 1 else 0
+    top = -(-minimum // (1 << shift))  # ceil
+    if top > 0xff:
+        return 1 << (shift + 8)
+    return top << shift
+
+
+def worst_case_value(limit):
+    """
+    Return a value lower than `limit` with as many non-zero bytes as possible.
+    """
+    n = ((limit - 1).bit_length() + 7) // 8
+    value = int('01' * n, 16)
+    if value < limit:
+        return value
+    return int('ff' * (n - 1), 16)
@@ -0,0 +1,459 @@
+"""
+Load simulations on top of the tester harness.
+
+crowdfunding
+    Synthetic accounts contribute to GNT during the funding period, following
+    a configurable distribution of contributions, up to tokenCreationCap.
+    The funding is then finalized. Reports throughput of the EVM and the
+    harness (transactions per second), gas percentiles of contributions,
+    total gas per block and the number of Transfer events logged.
+
+migration
+    After a crowdfunding the holders migrate their tokens to GNTTargetToken,
+    a fraction of them in two parts. Migrations are packed into blocks of
+    the given gas limit. Reports gas percentiles of migrations, migrations and
+    gas per block, the number of blocks until a part of the tokens is migrated
+    and the projected time of the whole migration.
+
+packing
+    Blocks are filled with contributions (all accounts contribute at the
+    start of the funding), refunds (the minimum is not reached) and unlocks
+    of a generated GNTAllocation. Reports for every operation the number of
+    transactions per block and the blocks needed to include all of them.
+
+usage: python tests/simulation.py [--seed S] [--json] crowdfunding [--accounts N] [--distribution D]
+                                                                   [--blocks B] [--fill F]
+       python tests/simulation.py [--seed S] [--json] migration [--accounts N] [--distribution D]
+                                                                [--partial P] [--agent A]
+                                                                [--block-gas-limit G] [--tx-gas-limit L]
+                                                                [--block-time T]
+       python tests/simulation.py [--seed S] [--json] packing [--accounts N] [--distribution D]
+                                                              [--operations O [O ...]]
+                                                              [--block-gas-limit G] [--tx-gas-limit L]
+                                                              [--block-time T]
+"""
+import argparse
+import json
+import random
+import time
+
+from ethereum import tester
+from ethereum.exceptions import BlockGasLimitReached
+from ethereum.tester import TransactionFailed
+from ethereum.utils import denoms
+from rlp.utils import decode_hex
+
+import allocations
+import artifacts
+import events
+from accounts import FACTORY, FACTORY_KEY, create_accounts, dev_address
+from chain import BLOCK_GAS_LIMIT, BLOCK_TIME
+from model import TOKEN_CREATION_CAP, TOKEN_CREATION_MIN, TOKEN_CREATION_RATE
+
+tester.serpent = True  # tester tries to load serpent module, prevent that.
+
+# Gas limit of the simulated transactions packed into blocks (see pack()).
+TX_GAS_LIMIT = 150000
+
+# Operations of the packing analysis.
+OPERATIONS = ('contribution', 'refund', 'unlock')
+
+MIGRATION_AGENTS = {
+    'checked': artifacts.MIGRATION_AGENT,
+    'counting': artifacts.COUNTING_MIGRATION_AGENT,
+}
+
+# Relative sizes of contributions.
+DISTRIBUTIONS = {
+    'uniform': lambda rng: rng.uniform(1, 100),
+    # 20% of contributors provide 80% of the funds
+    'pareto': lambda rng: rng.paretovariate(1.16),
+    # 1% of contributors provide ~50% of the funds
+    'whales': lambda rng: 1000 if rng.random() < 0.01 else rng.uniform(1, 19),
+}
+
+
+def percentile(values, p):
+    """
+    Nearest-rank percentile of `values`.
+    """
+    values = sorted(values)
+    if not values:
+        return 0
+    rank = max(int(round(p / 100.0 * len(values))), 1)
+    return values[min(rank, len(values)) - 1]
+
+
+def gas_summary(values):
+    return {
+        'count': len(values),
+        'total': sum(values),
+        'mean': sum(values) / len(values) if values else 0,
+        'p50': percentile(values, 50),
+        'p90': percentile(values, 90),
+        'p99': percentile(values, 99),
+        'max': max(values) if values else 0,
+    }
+
+
+def contribution_amounts(rng, n, distribution, total):
+    """
+    Split `total` wei into `n` contributions drawn from `distribution`.
+    """
+    weights = [DISTRIBUTIONS[distribution](rng) for _ in range(n)]
+    weights_sum = sum(weights)
+    amounts = [max(int(total * w / weights_sum), 1) for w in weights]
+    # the largest contribution absorbs the rounding error
+    amounts[amounts.index(max(amounts))] += total - sum(amounts)
+    return amounts
+
+
+def send(state, key, to, value, blocks_gas):
+    """
+    Send a transaction and return gas it used, start a new block if the
+    current one is full. Raises TransactionFailed.
+    """
+    try:
+        gas_before = state.block.gas_used
+        state.send(key, to, value)
+    except BlockGasLimitReached:
+        blocks_gas.append(state.block.gas_used)
+        state.mine(1)
+        gas_before = state.block.gas_used
+        state.send(key, to, value)
+    return state.block.gas_used - gas_before
+
+
+def pack(state, txs, block_gas_limit, tx_gas_limit=TX_GAS_LIMIT):
+    """
+    Apply `txs`, functions sending a transaction, starting in a new block.
+    Like a miner, a block of `block_gas_limit` includes a transaction only if
+    `tx_gas_limit` does not exceed the gas left in the block, otherwise the
+    next block is mined. Return gas used by blocks and (index of the block,
+    gas used or None if it failed) of every transaction.
+    """
+    if tx_gas_limit > block_gas_limit:
+        raise ValueError("transactions do not fit in a block")
+    state.mine(1)
+    blocks_gas, applied = [], []
+    for tx in txs:
+        if state.block.gas_used + tx_gas_limit > block_gas_limit:
+            blocks_gas.append(state.block.gas_used)
+            state.mine(1)
+        gas_before = state.block.gas_used
+        try:
+            tx()
+        except TransactionFailed:
+            applied.append((len(blocks_gas), None))
+            continue
+        applied.append((len(blocks_gas), state.block.gas_used - gas_before))
+    blocks_gas.append(state.block.gas_used)
+    return blocks_gas, applied
+
+
+def block_counts(blocks_gas, applied):
+    """
+    Return the number of successful transactions in every block.
+    """
+    counts = [0] * len(blocks_gas)
+    for block, gas in applied:
+        if gas is not None:
+            counts[block] += 1
+    return counts
+
+
+def contribute(state, addr, keys, amounts, funding_blocks):
+    """
+    Send the contributions `amounts` evenly over the funding blocks, starting
+    in the current block. Return gas used by contributions, gas used by blocks
+    and the number of failed contributions.
+    """
+    per_block = -(-len(keys) // funding_blocks)
+    tx_gas, blocks_gas, failed = [], [], 0
+
+    for i, (key, value) in enumerate(zip(keys, amounts)):
+        if i and i % per_block == 0 and state.block.number < funding_blocks:
+            blocks_gas.append(state.block.gas_used)
+            state.mine(1)
+        try:
+            tx_gas.append(send(state, key, addr, value, blocks_gas))
+        except TransactionFailed:
+            failed += 1
+    blocks_gas.append(state.block.gas_used)
+    return tx_gas, blocks_gas, failed
+
+
+def simulate_crowdfunding(n_accounts=1000, distribution='pareto', funding_blocks=10, fill=1.0, seed=0):
+    rng = random.Random(seed)
+    state = tester.state()
+
+    amounts = contribution_amounts(rng, n_accounts, distribution,
+                                   int(fill * TOKEN_CREATION_CAP) // TOKEN_CREATION_RATE)
+    # contribution and a reserve for gas
+    keys, _ = create_accounts(state, [a + denoms.ether for a in amounts], 'sim')
+
+    gnt = artifacts.deploy_gnt(state, FACTORY, FACTORY, 1, funding_blocks)
+    store = events.EventStore(gnt.translator)
+    store.hook(state)
+
+    # ---------------
+    #     FUNDING
+    # ---------------
+    state.mine(1)
+
+    started = time.time()
+    tx_gas, blocks_gas, failed = contribute(state, gnt.address, keys, amounts, funding_blocks)
+    elapsed = time.time() - started
+
+    # ---------------
+    #  POST FUNDING
+    # ---------------
+    state.mine(funding_blocks - state.block.number + 1)
+
+    total_supply = gnt.totalSupply()
+    finalize_gas = None
+    if total_supply >= TOKEN_CREATION_MIN:
+        gas_before = state.block.gas_used
+        gnt.finalize()
+        finalize_gas = state.block.gas_used - gas_before
+    store.unhook()
+
+    return {
+        'accounts': n_accounts,
+        'distribution': distribution,
+        'contributions': len(tx_gas),
+        'failed': failed,
+        'elapsed': elapsed,
+        'tx_per_s': (len(tx_gas) + failed) / elapsed if elapsed else 0,
+        'tx_gas': gas_summary(tx_gas),
+        'block_gas': gas_summary(blocks_gas),
+        'blocks': len(blocks_gas),
+        'total_supply': total_supply,
+        'cap_reached': total_supply >= TOKEN_CREATION_CAP,
+        'finalized': finalize_gas is not None,
+        'finalize_gas': finalize_gas,
+        'transfer_events': store.count('Transfer'),
+    }
+
+
+def migration_transactions(rng, keys, tokens, partial):
+    """
+    Return (key, value) of migrate transactions of holders with `tokens`.
+    Every holder migrates all tokens, `partial` of the holders half of them
+    first and the rest after all other holders.
+    """
+    halves = set(rng.sample(range(len(keys)), int(partial * len(keys))))
+    first = [(k, t // 2 if i in halves else t) for i, (k, t) in enumerate(zip(keys, tokens))]
+    rng.shuffle(first)
+    rest = [(keys[i], tokens[i] - tokens[i] // 2) for i in sorted(halves)]
+    rng.shuffle(rest)
+    return first + rest
+
+
+def blocks_until(progress, total, fraction):
+    """
+    Return the number of blocks until `fraction` of `total` is migrated.
+    """
+    for i, migrated in enumerate(progress):
+        if migrated >= fraction * total:
+            return i + 1
+
+
+def simulate_migration(n_accounts=1000, distribution='pareto', partial=0.5, agent='checked',
+                       block_gas_limit=BLOCK_GAS_LIMIT, tx_gas_limit=TX_GAS_LIMIT, block_time=BLOCK_TIME, seed=0):
+    rng = random.Random(seed)
+    state = tester.state()
+
+    amounts = contribution_amounts(rng, n_accounts, distribution, TOKEN_CREATION_CAP // TOKEN_CREATION_RATE)
+    keys, _ = create_accounts(state, [a + denoms.ether for a in amounts], 'sim')
+
+    # ---------------
+    #     FUNDING
+    # ---------------
+    gnt = artifacts.deploy_gnt(state, FACTORY, FACTORY, 1, 1)
+    state.mine(1)
+    contribute(state, gnt.address, keys, amounts, 1)
+    state.mine(1)
+    gnt.finalize()
+
+    migration = MIGRATION_AGENTS[agent].deploy(state, (gnt.address,))
+    target = artifacts.TARGET_TOKEN.deploy(state, (migration.address,))
+    gnt.setMigrationAgent(migration.address, sender=FACTORY_KEY)
+    migration.setTargetToken(target.address, sender=tester.k9)
+    supply = gnt.totalSupply()
+
+    # ---------------
+    #    MIGRATION
+    # ---------------
+    tokens = [a * TOKEN_CREATION_RATE for a in amounts]
+    txs = migration_transactions(rng, keys, tokens, partial)
+
+    started = time.time()
+    blocks_gas, applied = pack(state, [lambda k=k, v=v: gnt.migrate(v, sender=k) for k, v in txs],
+                               block_gas_limit, tx_gas_limit)
+    elapsed = time.time() - started
+    total_migrated = gnt.totalMigrated()
+
+    tx_gas = [gas for _, gas in applied if gas is not None]
+    progress = [0] * len(blocks_gas)
+    for (block, gas), (_, value) in zip(applied, txs):
+        if gas is not None:
+            progress[block] += value
+    for i in range(1, len(progress)):
+        progress[i] += progress[i - 1]
+
+    return {
+        'accounts': n_accounts,
+        'distribution': distribution,
+        'agent': agent,
+        'block_gas_limit': block_gas_limit,
+        'migrations': len(tx_gas),
+        'partial': len(txs) - n_accounts,
+        'failed': len(txs) - len(tx_gas),
+        'elapsed': elapsed,
+        'tx_per_s': len(txs) / elapsed if elapsed else 0,
+        'tx_gas': gas_summary(tx_gas),
+        'block_gas': gas_summary(blocks_gas),
+        'migrations_per_block': gas_summary(block_counts(blocks_gas, applied)),
+        'blocks': len(blocks_gas),
+        'blocks_until': dict(('{}%'.format(p), blocks_until(progress, sum(tokens), p / 100.0))
+                             for p in [50, 90, 99, 100]),
+        'completion_time': len(blocks_gas) * block_time,
+        'total_migrated': total_migrated,
+        'migrated_of_supply': float(total_migrated) / supply,
+        'target_supply': target.totalSupply(),
+    }
+
+
+def packing_report(blocks_gas, applied, block_gas_limit, block_time):
+    tx_gas = [gas for _, gas in applied if gas is not None]
+    return {
+        'transactions': len(tx_gas),
+        'failed': len(applied) - len(tx_gas),
+        'tx_gas': gas_summary(tx_gas),
+        'block_gas': gas_summary(blocks_gas),
+        'per_block': gas_summary(block_counts(blocks_gas, applied)),
+        # if every transaction had its gas limit set to the gas it uses
+        'per_block_bound': block_gas_limit // min(tx_gas) if tx_gas else 0,
+        'blocks': len(blocks_gas),
+        'clear_time': len(blocks_gas) * block_time,
+    }
+
+
+def pack_funding(rng, n_accounts, distribution, block_gas_limit, tx_gas_limit):
+    """
+    All accounts contribute in the first funding block, the minimum is not
+    reached and all accounts refund. Return the packing of contributions
+    and of refunds.
+    """
+    state = tester.state()
+    amounts = contribution_amounts(rng, n_accounts, distribution, TOKEN_CREATION_MIN // TOKEN_CREATION_RATE // 2)
+    keys, _ = create_accounts(state, [a + denoms.ether for a in amounts], 'sim')
+
+    # every block includes at least block_gas_limit // tx_gas_limit transactions
+    funding_end_block = 1 + -(-n_accounts // (block_gas_limit // tx_gas_limit))
+    gnt = artifacts.deploy_gnt(state, FACTORY, FACTORY, 1, funding_end_block)
+
+    contributions = pack(state, [lambda k=k, v=v: state.send(k, gnt.address, v) for k, v in zip(keys, amounts)],
+                         block_gas_limit, tx_gas_limit)
+    state.mine(funding_end_block - state.block.number)
+    refunds = pack(state, [lambda k=k: gnt.refund(sender=k) for k in keys], block_gas_limit, tx_gas_limit)
+    return contributions, refunds
+
+
+def pack_unlocks(n_holders, block_gas_limit, tx_gas_limit):
+    """
+    The Golem Factory and `n_holders` developers with equal shares in a
+    generated GNTAllocation unlock their tokens. Return the packing of
+    unlocks.
+    """
+    state = tester.state()
+    keys, accounts = create_accounts(state, [denoms.ether] * n_holders, 'holder')
+    gnt, _ = allocations.deploy_gnt(state, FACTORY, [dev_address(a) for a in accounts],
+                                    allocations.shares(n_holders), 1, 1)
+    state.mine(1)
+    state.send(tester.k0, gnt.address, TOKEN_CREATION_MIN // TOKEN_CREATION_RATE)
+    state.mine(1)
+    gnt.finalize()
+
+    allocation = artifacts.GNT_ALLOCATION.at(state, decode_hex(gnt.lockedAllocation()))
+    state.block.timestamp += 10 ** 8
+    return pack(state, [lambda k=k: allocation.unlock(sender=k) for k in [FACTORY_KEY] + keys],
+                block_gas_limit, tx_gas_limit)
+
+
+def simulate_packing(n_accounts=1000, distribution='pareto', operations=OPERATIONS,
+                     block_gas_limit=BLOCK_GAS_LIMIT, tx_gas_limit=TX_GAS_LIMIT, block_time=BLOCK_TIME, seed=0):
+    rng = random.Random(seed)
+    packed = {}
+    if 'contribution' in operations or 'refund' in operations:
+        packed['contribution'], packed['refund'] = pack_funding(rng, n_accounts, distribution, block_gas_limit,
+                                                                tx_gas_limit)
+    if 'unlock' in operations:
+        packed['unlock'] = pack_unlocks(min(n_accounts, allocations.DEV_SHARES_TOTAL), block_gas_limit,
+                                        tx_gas_limit)
+
+    return dict((op, packing_report(blocks_gas, applied, block_gas_limit, block_time))
+                for op, (blocks_gas, applied) in packed.items() if op in operations)
+
+
+def print_report(title, report):
+    print(title)
+    for key in sorted(report):
+        value = report[key]
+        if isinstance(value, dict):
+            value = ', '.join('{}: {}'.format(k, value[k]) for k in sorted(value))
+        elif isinstance(value, float):
+            value = '{:.2f}'.format(value)
+        print('  {:<16} {}'.format(key, value))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help="print the report as JSON")
+    commands = parser.add_subparsers(dest='command')
+
+    crowdfunding = commands.add_parser('crowdfunding')
+    crowdfunding.add_argument('--accounts', type=int, default=1000)
+    crowdfunding.add_argument('--distribution', choices=sorted(DISTRIBUTIONS), default='pareto')
+    crowdfunding.add_argument('--blocks', type=int, default=10, help="number of funding blocks")
+    crowdfunding.add_argument('--fill', type=float, default=1.0, help="contributions as a fraction of the cap")
+
+    migration = commands.add_parser('migration')
+    migration.add_argument('--accounts', type=int, default=1000)
+    migration.add_argument('--distribution', choices=sorted(DISTRIBUTIONS), default='pareto')
+    migration.add_argument('--partial', type=float, default=0.5,
+                           help="fraction of holders migrating in two transactions")
+    migration.add_argument('--agent', choices=sorted(MIGRATION_AGENTS), default='checked')
+    packing = commands.add_parser('packing')
+    packing.add_argument('--accounts', type=int, default=1000)
+    packing.add_argument('--distribution', choices=sorted(DISTRIBUTIONS), default='pareto')
+    packing.add_argument('--operations', nargs='+', choices=OPERATIONS, default=OPERATIONS)
+
+    for command in [migration, packing]:
+        command.add_argument('--block-gas-limit', type=int, default=BLOCK_GAS_LIMIT)
+        command.add_argument('--tx-gas-limit', type=int, default=TX_GAS_LIMIT, help="gas limit of transactions")
+        command.add_argument('--block-time', type=float, default=BLOCK_TIME, help="seconds")
+
+    args = parser.parse_args()
+    if args.command == 'crowdfunding':
+        report = simulate_crowdfunding(args.accounts, args.distribution, args.blocks, args.fill, args.seed)
+    elif args.command == 'migration':
+        report = simulate_migration(args.accounts, args.distribution, args.partial, args.agent,
+                                    args.block_gas_limit, args.tx_gas_limit, args.block_time, args.seed)
+    elif args.command == 'packing':
+        report = simulate_packing(args.accounts, args.distribution, args.operations, args.block_gas_limit,
+                                  args.tx_gas_limit, args.block_time, args.seed)
+
+    if args.json:
+        print(json.dumps(report, indent=2, sort_keys=True))
+    elif args.command == 'packing':
+        for op in sorted(report):
+            print_report(op, report[op])
+    else:
+        print_report(args.command, report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+Content-addressed cache of Solidity compilation results.
+
+Contracts deployed from templated source (see deploy_gnt() in scenarios.py)
+would otherwise be compiled by solc on every deployment. The cache stores
+bytecode and ABI on disk under a key derived from the source (including the
+files it imports), the solc version and the compiler flags, so compiling the
+same source again is a file read.
+
+The cache directory defaults to tests/.solc_cache and can be changed with the
+GNT_SOLC_CACHE environment variable. The compiler is the SOLC variable of the
+Makefile (`make SOLC=...`), exported to the tests.
+"""
+import hashlib
+import json
+import os
+import re
+import subprocess
+import tempfile
+
+from rlp.utils import decode_hex
+
+CACHE_DIR = os.environ.get('GNT_SOLC_CACHE',
+                           os.path.join(os.path.dirname(os.path.abspath(__file__)), '.solc_cache'))
+
+SOLC = os.environ.get('SOLC', 'solc')
+SOLC_FLAGS = ['--optimize', '--combined-json', 'bin,abi']
+
+IMPORT_REGEX = re.compile(r'^\s*import\s+(?:\*\s+as\s+\w+\s+from\s+)?"([^"]+)";', re.MULTILINE)
+
+# Output of `solc --version` per solc binary, run once per process.
+_solc_versions = {}
+
+
+class CompileError(Exception):
+    pass
+
+
+def solc_version():
+    version = _solc_versions.get(SOLC)
+    if version is None:
+        version = _solc_versions[SOLC] = subprocess.check_output([SOLC, '--version']).strip()
+    return version
+
+
+def cache_key(source, contract_name, import_dir):
+    h = hashlib.sha256()
+    for part in [solc_version(), ' '.join(SOLC_FLAGS), contract_name, source]:
+        h.update(_to_bytes(part))
+        h.update(b'\0')
+    for path in sorted(_imported_files(source, import_dir)):
+        with open(path, 'rb') as f:
+            h.update(f.read())
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def compile_contract(source, contract_name, import_dir, cache_dir=None):
+    """
+    Compile the contract `contract_name` from Solidity `source` and return
+    a tuple (bytecode, abi). Imports are resolved relative to `import_dir`.
+    """
+    cache_dir = cache_dir or CACHE_DIR
+    path = os.path.join(cache_dir, cache_key(source, contract_name, import_dir) + '.json')
+
+    if os.path.exists(path):
+        with open(path) as f:
+            entry = json.load(f)
+    else:
+        entry = _compile(source, contract_name, import_dir)
+        _store(path, entry)
+
+    abi = entry['abi']
+    if not isinstance(abi, (bytes, type(u''))):  # solc >= 0.8 emits the ABI unquoted
+        abi = json.dumps(abi, separators=(',', ':'))
+    return decode_hex(str(entry['bin'])), str(abi)
+
+
+def _compile(source, contract_name, import_dir):
+    process = subprocess.Popen([SOLC] + SOLC_FLAGS, cwd=import_dir,
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    out, err = process.communicate(_to_bytes(source))
+    if process.returncode != 0:
+        raise CompileError(err)
+
+    # Newer solc versions prefix contract names with the source name.
+    for name, data in json.loads(out.decode('utf-8'))['contracts'].items():
+        if name.split(':')[-1] == contract_name:
+            return {'bin': data['bin'], 'abi': data['abi']}
+    raise CompileError("contract {} not found in the compiler output".format(contract_name))
+
+
+def _store(path, entry):
+    dir_name = os.path.dirname(path)
+    if not os.path.isdir(dir_name):
+        try:
+            os.makedirs(dir_name)
+        except OSError:
+            if not os.path.isdir(dir_name):
+                raise
+
+    # Write to a temporary file first so concurrent readers never see
+    # a partially written entry.
+    fd, tmp_path = tempfile.mkstemp(dir=dir_name, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(entry, f)
+    os.rename(tmp_path, path)
+
+
+def _imported_files(source, import_dir, found=None):
+    found = set() if found is None else found
+    for name in IMPORT_REGEX.findall(source):
+        path = os.path.normpath(os.path.join(import_dir, name))
+        if path in found or not os.path.exists(path):
+            continue
+        found.add(path)
+        with open(path) as f:
+            _imported_files(f.read(), os.path.dirname(path), found)
+    return found
+
+
+def _to_bytes(value):
+    if isinstance(value, bytes):
+        return value
+    return value.encode('utf-8')
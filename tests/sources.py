@@ -0,0 +1,64 @@
+"""
+Templated GNT sources: GNT with GNTAllocation inlined and its developer
+addresses and shares replaced (see templates.py), compiled through the solc
+cache.
+"""
+import artifacts
+import templates
+from solc_cache import compile_contract
+
+GNT_CONTRACT_PATH = artifacts.contract_path('Token.sol')
+ALLOC_CONTRACT_PATH = artifacts.contract_path('GNTAllocation.sol')
+FUNDED_CONTRACT_PATH = artifacts.contract_path('FundedToken.sol')
+
+IMPORT_TOKEN_REGEX = '(import "\.\/Token\.sol";).*'
+IMPORT_ALLOC_REGEX = '(import "\.\/GNTAllocation\.sol";).*'
+IMPORT_FUNDED_REGEX = '(import "\.\/FundedToken\.sol";).*'
+# uint32 packs the funding period into the storage slot of the funding mode
+# and the Golem Factory, uint256 stores it in two slots of its own.
+FUNDING_BLOCK_TYPE_REGEX = '(uint32) funding(?:Start|End)Block;'
+DEV_ADDR_REGEX = "\s*allocations\[([a-zA-Z0-9]+)\].*"
+DEV_SHARE_REGEX = "allocations\[[a-zA-Z0-9]+\]\s*=\s*([0-9]+);"
+
+# Named slots of the GNTAllocation.sol, Token.sol and FundedToken.sol templates.
+ALLOC_SLOTS = {
+    'import_token': IMPORT_TOKEN_REGEX,
+    'dev_address': DEV_ADDR_REGEX,
+    'dev_share': DEV_SHARE_REGEX,
+}
+GNT_SLOTS = {
+    'import_allocation': IMPORT_ALLOC_REGEX,
+    'import_funded': IMPORT_FUNDED_REGEX,
+}
+FUNDED_SLOTS = {
+    'funding_block_type': FUNDING_BLOCK_TYPE_REGEX,
+}
+
+_compiled = {}
+
+
+def gnt_source(dev_addresses, dev_shares=None, packed=True):
+    """
+    Return the source of GNT with GNTAllocation inlined, the first developer
+    addresses and shares replaced by `dev_addresses` and `dev_shares`. If not
+    `packed`, FundedToken is inlined with the funding period in separate
+    storage slots, the layout before the funding parameters were packed.
+    """
+    alloc_source = templates.load(ALLOC_CONTRACT_PATH, ALLOC_SLOTS).render(
+        import_token='', dev_address=dev_addresses, dev_share=dev_shares)
+    funded_source = None
+    if not packed:
+        funded_source = templates.load(FUNDED_CONTRACT_PATH, FUNDED_SLOTS).render(funding_block_type='uint256')
+    return templates.load(GNT_CONTRACT_PATH, GNT_SLOTS).render(import_allocation=alloc_source,
+                                                               import_funded=funded_source)
+
+
+def compile_gnt(source):
+    """
+    Return (init code, ABI) of GNT compiled from `source`, once per process
+    and distinct source, other processes read the compile cache.
+    """
+    key = templates.digest(source)
+    if key not in _compiled:
+        _compiled[key] = compile_contract(source, 'GolemNetworkToken', artifacts.CONTRACTS_DIR)
+    return _compiled[key]
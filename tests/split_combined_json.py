@@ -0,0 +1,50 @@
+"""
+Split the output of `solc --combined-json bin,abi` into <name>.bin and
+<name>.abi files, the format the tests load.
+
+usage: split_combined_json.py COMBINED_JSON OUT_DIR CONTRACT[:ARTIFACT]...
+
+COMBINED_JSON is expected to be named after the compiled source file
+(e.g. Token.json for Token.sol). ARTIFACT is the output file name, it
+defaults to the contract name.
+"""
+import json
+import os
+import sys
+
+
+def find_contract(contracts, source_name, contract_name):
+    # Newer solc versions prefix contract names with the source file name.
+    # Prefer the contract defined in the compiled file itself, imported
+    # files may define contracts with the same name.
+    for key in [source_name + ':' + contract_name, contract_name]:
+        if key in contracts:
+            return contracts[key]
+    for key, data in contracts.items():
+        if key.split(':')[-1] == contract_name:
+            return data
+    raise KeyError("contract {} not found".format(contract_name))
+
+
+def split(combined_path, out_dir, specs):
+    with open(combined_path) as f:
+        contracts = json.load(f)['contracts']
+    source_name = os.path.splitext(os.path.basename(combined_path))[0] + '.sol'
+
+    for spec in specs:
+        contract_name, _, artifact = spec.partition(':')
+        data = find_contract(contracts, source_name, contract_name)
+        base = os.path.join(out_dir, artifact or contract_name)
+        abi = data['abi']
+        if isinstance(abi, list):  # solc >= 0.8 emits the ABI unquoted
+            abi = json.dumps(abi, separators=(',', ':'))
+        with open(base + '.bin', 'w') as f:
+            f.write(data['bin'] + '\n')
+        with open(base + '.abi', 'w') as f:
+            f.write(abi + '\n')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 4:
+        sys.exit(__doc__.strip())
+    split(sys.argv[1], sys.argv[2], sys.argv[3:])
@@ -0,0 +1,82 @@
+"""
+Contract source templates.
+
+A template is a contract source parsed once into literal text and named
+slots. A slot is defined by a regular expression, group 1 of every match is
+an occurrence of the slot. Rendering joins the text with the slot values in
+a single pass, no regular expression runs at render time.
+
+    template = load(path, {'dev_address': r'allocations\[([a-zA-Z0-9]+)\]'})
+    source = template.render(dev_address=['0xad00', '0xad01'])
+    key = digest(source)
+
+Templates loaded with load() are parsed once per process.
+"""
+import hashlib
+import re
+
+_templates = {}
+
+
+class SourceTemplate(object):
+
+    def __init__(self, source, slots):
+        """
+        Parse `source`, `slots` maps slot names to regular expressions.
+        """
+        spans = []
+        for name, regex in slots.items():
+            for m in re.compile(regex).finditer(source):
+                spans.append((m.start(1), m.end(1), name))
+        spans.sort()
+
+        self.defaults = dict((name, []) for name in slots)  # original text of slot occurrences
+        self._chunks = []  # literal text before every occurrence and after the last one
+        self._slots = []  # (slot name, index of the occurrence)
+        pos = 0
+        for start, end, name in spans:
+            if start < pos:
+                raise ValueError("slot {} overlaps another slot at {}".format(name, start))
+            self._chunks.append(source[pos:start])
+            self._slots.append((name, len(self.defaults[name])))
+            self.defaults[name].append(source[start:end])
+            pos = end
+        self._chunks.append(source[pos:])
+
+    def render(self, **values):
+        """
+        Return the source with slots replaced by `values`. A list replaces the
+        first occurrences of the slot in order, a string replaces all of them.
+        Other occurrences keep the original text.
+        """
+        parts = []
+        for chunk, (name, i) in zip(self._chunks, self._slots):
+            parts.append(chunk)
+            value = values.get(name)
+            if isinstance(value, (list, tuple)):
+                value = value[i] if i < len(value) else None
+            parts.append(self.defaults[name][i] if value is None else value)
+        parts.append(self._chunks[-1])
+        return ''.join(parts)
+
+
+def load(path, slots):
+    """
+    Return the SourceTemplate of the file `path` with `slots`.
+    """
+    key = (path, tuple(sorted(slots.items())))
+    template = _templates.get(key)
+    if template is None:
+        with open(path) as f:
+            source = f.read().rstrip()
+        template = _templates[key] = SourceTemplate(source, slots)
+    return template
+
+
+def digest(source):
+    """
+    Return the hash of a rendered source.
+    """
+    if not isinstance(source, bytes):
+        source = source.encode('utf-8')
+    return hashlib.sha256(source).hexdigest()
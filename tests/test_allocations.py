@@ -0,0 +1,92 @@
+import unittest
+
+from ethereum import tester
+from ethereum.tester import TransactionFailed
+from ethereum.utils import denoms
+from rlp.utils import decode_hex
+
+import allocations
+import artifacts
+from accounts import create_accounts, dev_address
+from scenarios import DEV_SHARES
+from sources import gnt_source
+
+tester.serpent = True  # tester tries to load serpent module, prevent that.
+
+
+class AllocationTableTest(unittest.TestCase):
+
+    def test_shares(self):
+        for n in [1, 2, 23, 300, 10000]:
+            for distribution in allocations.DISTRIBUTIONS:
+                s = allocations.shares(n, distribution)
+                assert len(s) == n
+                assert sum(s) == allocations.DEV_SHARES_TOTAL
+                assert min(s) >= 1
+        assert allocations.shares(3) == [3334, 3333, 3333]
+        zipf = allocations.shares(100, 'zipf')
+        assert zipf == sorted(zipf, reverse=True)
+
+        with self.assertRaises(ValueError):
+            allocations.shares(0)
+        with self.assertRaises(ValueError):
+            allocations.shares(10001)
+
+    def test_table(self):
+        assert allocations.table(['0xad00', '0xad01'], [70, 25]) == \
+            "        allocations[0xad00] = 70;\n        allocations[0xad01] = 25;\n"
+        with self.assertRaises(ValueError):
+            allocations.table(['0xad00'], [70, 25])
+
+    def test_source(self):
+        source = allocations.gnt_source(['0xad00', '0xad01'], [6000, 4000])
+        assert 'allocations[0xad00] = 6000;' in source
+        assert 'allocations[0xad01] = 4000;' in source
+        assert 'allocations[0xde00]' not in source
+        assert 'totalAllocations = 30000;' in source
+        assert 'allocations[_golemFactory] = 20000;' in source
+        assert 'import "./Token.sol";' not in source
+
+        source = allocations.gnt_source(['0xad00'], [500], factory_share=1000)
+        assert 'totalAllocations = 1500;' in source
+        assert 'allocations[_golemFactory] = 1000;' in source
+
+    def test_same_as_original(self):
+        addresses = ['0xde{:02d}'.format(i) for i in range(len(DEV_SHARES))]
+        generated = allocations.gnt_source(addresses, DEV_SHARES)
+        original = gnt_source([])
+
+        def strip(source):
+            return [l.split('//')[0].replace(' ', '') for l in source.splitlines()]
+
+        assert strip(generated) == strip(original)
+
+
+class AllocationDeployTest(unittest.TestCase):
+
+    def test_unlock(self):
+        state = tester.state()
+        dev_shares = allocations.shares(40, 'zipf')
+        keys, accounts = create_accounts(state, [10 ** 24] * len(dev_shares), 'holder')
+        addresses = [dev_address(a) for a in accounts]
+        gnt, gas = allocations.deploy_gnt(state, tester.a9, addresses, dev_shares, 1, 1)
+        assert gas > 40 * 20000
+        allocation = artifacts.GNT_ALLOCATION.at(state, decode_hex(gnt.lockedAllocation()))
+
+        state.mine(1)
+        for k in tester.keys[:8]:
+            state.send(k, gnt.address, 25000 * denoms.ether)
+        state.mine(1)
+        gnt.finalize()
+        locked = gnt.balanceOf(allocation.address)
+
+        state.block.timestamp += 10 ** 8
+        allocation.unlock(sender=tester.k9)
+        assert gnt.balanceOf(tester.a9) == locked * allocations.FACTORY_SHARE / 30000
+        for k, a, share in zip(keys, accounts, dev_shares):
+            allocation.unlock(sender=k)
+            assert gnt.balanceOf(a) == locked * share / 30000
+        with self.assertRaises(TransactionFailed):
+            allocation.unlock(sender=keys[0])
+        # rounding leaves at most one token unit per holder
+        assert gnt.balanceOf(allocation.address) <= len(dev_shares) + 1
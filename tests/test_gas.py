@@ -0,0 +1,335 @@
+import unittest
+
+from ethereum import tester
+from ethereum.utils import denoms
+from rlp.utils import decode_hex
+
+import allocations
+import fixtures
+import merkle
+import seeding
+from accounts import FACTORY, FACTORY_KEY, create_accounts, dev_address
+from artifacts import GNT, GNT_ALLOCATION, GNT_MERKLE_ALLOCATION, MIGRATION_AGENT, COUNTING_MIGRATION_AGENT, \
+    TARGET_TOKEN, PROXY_ACCOUNT, PROXY_FACTORY_ACCOUNT, WALLET
+from gasbench import BenchmarkMixin
+from scenarios import DEV_SHARES, WALLET_DAY_LIMIT, deploy_contract, deploy_gnt
+
+tester.serpent = True  # tester tries to load serpent module, prevent that.
+
+# Fixed inputs, gas used depends on the number of zero bytes in the transaction data.
+CONTRIBUTION = 20000 * denoms.ether
+TOKENS = 1000 * denoms.ether
+NEW_HOLDER = '\x42' * 20
+
+# Sizes of the generated allocation tables (see allocations.py).
+ALLOCATION_HOLDERS = [1, 10, 100, 300]
+
+
+class GasBenchmarkTest(BenchmarkMixin, unittest.TestCase):
+    """
+    Gas used by the state changing entry points of the contracts, compared
+    with the stored baseline (see gasbench.py).
+    """
+
+    def deploy(self, name, artifact, args, sender=tester.k9):
+        contract = self.gas(name, artifact.deploy, self.state, args, sender=sender)
+        return contract, contract.address
+
+    def test_gnt(self):
+        gnt, addr = self.deploy('GolemNetworkToken.deploy', GNT, (FACTORY, FACTORY, 1, 2))
+
+        # ---------------
+        #     FUNDING
+        # ---------------
+        self.state.mine(1)
+
+        self.gas('GolemNetworkToken.create.first', self.state.send, tester.k0, addr, CONTRIBUTION)
+        self.gas('GolemNetworkToken.create.new_holder', self.state.send, tester.k1, addr, CONTRIBUTION)
+        self.gas('GolemNetworkToken.create.same_holder', self.state.send, tester.k1, addr, CONTRIBUTION)
+        for k in tester.keys[2:]:
+            self.state.send(k, addr, CONTRIBUTION)
+
+        # ---------------
+        #  POST FUNDING
+        # ---------------
+        self.state.mine(2)
+
+        self.gas('GolemNetworkToken.finalize', gnt.finalize, sender=tester.k0)
+
+        self.gas('GolemNetworkToken.transfer.new_holder', gnt.transfer, NEW_HOLDER, TOKENS, sender=tester.k0)
+        self.gas('GolemNetworkToken.transfer.existing_holder', gnt.transfer, tester.a2, TOKENS, sender=tester.k1)
+        self.gas('GolemNetworkToken.transfer.all', gnt.transfer, tester.a2, gnt.balanceOf(tester.a3),
+                 sender=tester.k3)
+        self.gas('GolemNetworkToken.transfer.best_case_data', gnt.transfer, seeding.best_case_address(),
+                 seeding.best_case_value(), sender=tester.k6)
+        self.gas('GolemNetworkToken.transfer.worst_case_data', gnt.transfer, seeding.worst_case_address(),
+                 seeding.worst_case_value(TOKENS), sender=tester.k7)
+        self.gas('GolemNetworkToken.batchTransfer.10', gnt.batchTransfer, [chr(i) * 20 for i in range(1, 11)],
+                 [TOKENS] * 10, sender=tester.k8)
+
+        # ---------------
+        #    MIGRATION
+        # ---------------
+        migration, m_addr = self.deploy('MigrationAgent.deploy', MIGRATION_AGENT, [addr])
+        target, t_addr = self.deploy('GNTTargetToken.deploy', TARGET_TOKEN, [m_addr])
+
+        self.gas('GolemNetworkToken.setMigrationAgent', gnt.setMigrationAgent, m_addr, sender=FACTORY_KEY)
+        self.gas('MigrationAgent.setTargetToken', migration.setTargetToken, t_addr, sender=tester.k9)
+
+        self.gas('GolemNetworkToken.migrate.part', gnt.migrate, TOKENS, sender=tester.k4)
+        self.gas('GolemNetworkToken.migrate.all', gnt.migrate, gnt.balanceOf(tester.a5), sender=tester.k5)
+        self.gas('GolemNetworkToken.migrate.best_case_data', gnt.migrate, seeding.best_case_value(),
+                 sender=tester.k7)
+        self.gas('GolemNetworkToken.migrate.worst_case_data', gnt.migrate, seeding.worst_case_value(TOKENS),
+                 sender=tester.k8)
+        self.gas('GolemNetworkToken.migrateBatch.10', gnt.migrateBatch, [tester.a6] * 10, [TOKENS] * 10,
+                 sender=tester.k6)
+        self.gas('GolemNetworkToken.setMigrationMaster', gnt.setMigrationMaster, tester.a9, sender=FACTORY_KEY)
+
+        self.gas('MigrationAgent.finalizeMigration', migration.finalizeMigration, sender=tester.k9)
+
+        self.assert_no_regressions()
+
+    def test_funding_packing(self):
+        # GNT with the funding parameters packed into one storage slot and in
+        # separate slots (the layout before the packing)
+        for variant, packed in [('packed', True), ('unpacked', False)]:
+            name = 'GolemNetworkToken.{}.'.format(variant)
+            self.state = tester.state()
+            gnt, addr, _ = deploy_gnt(self.state, FACTORY, [], 1, 2, packed=packed)
+            self.state.mine(1)
+            self.gas(name + 'create.first', self.state.send, tester.k0, addr, CONTRIBUTION)
+            self.gas(name + 'create.new_holder', self.state.send, tester.k1, addr, CONTRIBUTION)
+            self.gas(name + 'create.same_holder', self.state.send, tester.k1, addr, CONTRIBUTION)
+            for k in tester.keys[2:]:
+                self.state.send(k, addr, CONTRIBUTION)
+            self.state.mine(2)
+            self.gas(name + 'finalize', gnt.finalize, sender=tester.k0)
+
+            # minimum not reached
+            self.state = tester.state()
+            gnt, addr, _ = deploy_gnt(self.state, FACTORY, [], 0, 0, packed=packed)
+            self.state.send(tester.k0, addr, CONTRIBUTION)
+            self.state.send(tester.k1, addr, CONTRIBUTION)
+            self.state.mine(1)
+            self.gas(name + 'refund', gnt.refund, sender=tester.k0)
+
+        results = self.bench.results
+        for entry in ['create.first', 'create.new_holder', 'create.same_holder', 'finalize', 'refund']:
+            packed = results['GolemNetworkToken.packed.' + entry]
+            unpacked = results['GolemNetworkToken.unpacked.' + entry]
+            assert packed < unpacked
+
+        self.assert_no_regressions()
+
+    def test_counting_migration(self):
+        self.state, env = fixtures.load('gnt_finalized')
+        gnt = GNT.at(self.state, env['gnt'])
+        migration, m_addr = self.deploy('CountingMigrationAgent.deploy', COUNTING_MIGRATION_AGENT, [env['gnt']])
+        target = TARGET_TOKEN.deploy(self.state, [m_addr])
+        gnt.setMigrationAgent(m_addr, sender=FACTORY_KEY)
+        migration.setTargetToken(target.address, sender=tester.k9)
+
+        # the first migration stores the counter
+        self.gas('GolemNetworkToken.migrate.counting.first', gnt.migrate, TOKENS, sender=tester.k4)
+        self.gas('GolemNetworkToken.migrate.counting', gnt.migrate, TOKENS, sender=tester.k5)
+        self.gas('CountingMigrationAgent.finalizeMigration', migration.finalizeMigration, sender=tester.k9)
+
+        self.assert_no_regressions()
+
+    def test_gnt_refund(self):
+        gnt, addr = self.deploy('GolemNetworkToken.deploy', GNT, (FACTORY, FACTORY, 0, 0))
+
+        # minimum not reached
+        self.state.send(tester.k0, addr, CONTRIBUTION)
+        self.state.send(tester.k1, addr, CONTRIBUTION)
+        self.state.mine(1)
+
+        self.gas('GolemNetworkToken.refund', gnt.refund, sender=tester.k0)
+        self.gas('GolemNetworkToken.refund.last', gnt.refund, sender=tester.k1)
+
+        self.assert_no_regressions()
+
+    def test_allocation(self):
+        self.state, env = fixtures.load('gnt_unlocked')
+        allocation = GNT_ALLOCATION.at(self.state, env['allocation'])
+
+        # the first unlock fetches the number of allocated tokens
+        self.gas('GNTAllocation.unlock.first', allocation.unlock, sender=tester.k9)
+        self.gas('GNTAllocation.unlock', allocation.unlock, sender=env['dev_keys'][0])
+
+        # all 24 allocations in one transaction
+        self.state, env = fixtures.load('gnt_unlocked')
+        allocation = GNT_ALLOCATION.at(self.state, env['allocation'])
+        self.gas('GNTAllocation.unlockBatch.all', allocation.unlockBatch, [tester.a9] + env['dev_accounts'],
+                 sender=tester.k0)
+
+        self.assert_no_regressions()
+
+    def test_allocation_scaling(self):
+        deploy_gas = []
+        unlock_gas = []
+        for n in ALLOCATION_HOLDERS:
+            self.state = tester.state()
+            keys, accounts = create_accounts(self.state, [10 ** 24] * n, 'holder')
+            dev_shares = allocations.shares(n, 'zipf')
+            gnt, gas = allocations.deploy_gnt(self.state, tester.a9, [dev_address(a) for a in accounts],
+                                              dev_shares, 1, 1)
+            self.record('GolemNetworkToken.deploy.holders_{}'.format(n), gas)
+            deploy_gas.append(gas)
+
+            self.state.mine(1)
+            for k in tester.keys[:8]:
+                self.state.send(k, gnt.address, CONTRIBUTION)
+            self.state.mine(1)
+            gnt.finalize()
+            self.state.block.timestamp += 10 ** 8
+
+            allocation = GNT_ALLOCATION.at(self.state, decode_hex(gnt.lockedAllocation()))
+            allocation.unlock(sender=tester.k9)
+            # the holder with the smallest share, last in the table
+            gas_before = self.state.block.gas_used
+            allocation.unlock(sender=keys[-1])
+            gas = self.state.block.gas_used - gas_before
+            self.record('GNTAllocation.unlock.holders_{}'.format(n), gas)
+            unlock_gas.append(gas)
+
+        # a storage write per holder in the constructor, the unlock does not
+        # depend on the size of the table
+        for i in range(1, len(ALLOCATION_HOLDERS)):
+            added = ALLOCATION_HOLDERS[i] - ALLOCATION_HOLDERS[i - 1]
+            assert deploy_gas[i] - deploy_gas[i - 1] >= added * 20000
+        assert max(unlock_gas) - min(unlock_gas) < 1000
+
+        self.assert_no_regressions()
+
+    def test_merkle_allocation(self):
+        self.state, env = fixtures.load('gnt_unlocked')
+        gnt = GNT.at(self.state, env['gnt'])
+        allocation = GNT_ALLOCATION.at(self.state, decode_hex(gnt.lockedAllocation()))
+
+        # the allocations of the table in GNTAllocation
+        dev_addresses = [dev_address(a) for a in env['dev_accounts']]
+        _, gas_table = allocations.deploy_gnt(self.state, FACTORY, dev_addresses, DEV_SHARES, 2, 2)
+        _, gas_no_table = allocations.deploy_gnt(self.state, FACTORY, [], [], 2, 2)
+        tree = merkle.AllocationTree(zip([tester.a9] + env['dev_accounts'], [allocations.FACTORY_SHARE] + DEV_SHARES))
+
+        merkle_allocation, addr = self.deploy('GNTMerkleAllocation.deploy', GNT_MERKLE_ALLOCATION,
+                                              (env['gnt'], tree.root, tree.total))
+        gnt.transfer(addr, gnt.balanceOf(tester.a8), sender=tester.k8)
+        self.state.block.timestamp += 10 ** 8
+
+        self.gas('GNTMerkleAllocation.unlock.first', merkle_allocation.unlock, tree.allocation(tester.a9),
+                 tree.proof(tester.a9), sender=tester.k9)
+        dev, key = env['dev_accounts'][0], env['dev_keys'][0]
+        self.gas('GNTMerkleAllocation.unlock', merkle_allocation.unlock, tree.allocation(dev), tree.proof(dev),
+                 sender=key)
+
+        allocation.unlock(sender=tester.k9)
+        gas_before = self.state.block.gas_used
+        allocation.unlock(sender=key)
+        gas_unlock = self.state.block.gas_used - gas_before
+
+        # The root replaces a storage write per holder. An unlock writes a new
+        # storage slot where GNTAllocation clears one (refunded), a proof
+        # costs its calldata and a hash per level.
+        assert self.bench.results['GNTMerkleAllocation.deploy'] < gas_table - gas_no_table
+        assert self.bench.results['GNTMerkleAllocation.unlock'] - gas_unlock < 35000 + len(tree.proof(dev)) * 3000
+
+        self.assert_no_regressions()
+
+    def test_proxy(self):
+        self.state, env = fixtures.load('proxied_gnt')
+
+        _, _, g = deploy_contract(self.state, PROXY_ACCOUNT, 0, 0)
+        self.record('TimeLockedGNTProxyAccount.deploy', g)
+        _, _, g = deploy_contract(self.state, PROXY_FACTORY_ACCOUNT, 9, 0)
+        self.record('TimeLockedGolemFactoryProxyAccount.deploy', g)
+
+        pd0 = PROXY_ACCOUNT.at(self.state, env['pd0'])
+        pf = PROXY_FACTORY_ACCOUNT.at(self.state, env['pf'])
+        gnt = GNT.at(self.state, env['gnt'])
+
+        # ---------------
+        #     FUNDING
+        # ---------------
+        self.state.mine(2)
+
+        eth_part = env['creation_min'] / (3 * env['creation_rate']) + 1 * denoms.ether
+        for k in [tester.k3, tester.k4, tester.k5]:
+            self.state.send(k, env['gnt'], eth_part)
+
+        # ---------------
+        #  POST FUNDING
+        # ---------------
+        self.state.mine(1)
+
+        self.gas('TimeLockedGNTProxyAccount.setGNTContract', pd0.setGNTContract, env['gnt'], sender=tester.k0)
+        self.gas('TimeLockedGolemFactoryProxyAccount.setGNTContract', pf.setGNTContract, env['gnt'],
+                 sender=tester.k9)
+
+        gnt.finalize()
+        self.gas('TimeLockedGolemFactoryProxyAccount.withdraw', pf.withdraw, sender=tester.k9)
+
+        # ---------------
+        #    UNLOCKED
+        # ---------------
+        gnt.transfer(env['pd0'], TOKENS, sender=tester.k3)
+        self.state.block.timestamp += 1000
+
+        self.gas('TimeLockedGNTProxyAccount.transfer', pd0.transfer, tester.a8, TOKENS / 2, sender=tester.k0)
+
+        # ---------------
+        #    MIGRATION
+        # ---------------
+        migration, m_addr, _ = deploy_contract(self.state, MIGRATION_AGENT, 9, env['gnt'])
+        _, t_addr, _ = deploy_contract(self.state, TARGET_TOKEN, 9, m_addr)
+
+        self.gas('TimeLockedGolemFactoryProxyAccount.setMigrationAgent', pf.setMigrationAgent, m_addr,
+                 sender=tester.k9)
+        migration.setTargetToken(t_addr, sender=tester.k9)
+
+        self.gas('TimeLockedGNTProxyAccount.migrate', pd0.migrate, TOKENS / 2, sender=tester.k0)
+        self.gas('TimeLockedGolemFactoryProxyAccount.setMigrationMaster', pf.setMigrationMaster, tester.a7,
+                 sender=tester.k9)
+
+        self.assert_no_regressions()
+
+    def test_wallet(self):
+        wallet, addr = self.deploy('Wallet.deploy', WALLET,
+                                   ([tester.a1, tester.a2], 2, WALLET_DAY_LIMIT), sender=tester.k0)
+
+        self.gas('Wallet.deposit', self.state.send, tester.k8, addr, 10 * WALLET_DAY_LIMIT)
+        self.gas('Wallet.execute.under_limit', wallet.execute, tester.a8, denoms.ether, '', sender=tester.k0)
+
+        # over the daily limit: 2 of 3 owners have to confirm
+        op = self.gas('Wallet.execute.over_limit', wallet.execute, tester.a8, 2 * WALLET_DAY_LIMIT, '',
+                      sender=tester.k0)
+        self.gas('Wallet.revoke', wallet.revoke, op, sender=tester.k0)
+        self.gas('Wallet.confirm', wallet.confirm, op, sender=tester.k1)
+        self.gas('Wallet.confirm.execute', wallet.confirm, op, sender=tester.k2)
+
+        # owner management and the daily limit, confirmed by 2 of 3 owners
+        keys = [tester.k0, tester.k1]
+        self.multisig('Wallet.addOwner', keys, wallet.addOwner, tester.a3)
+        assert wallet.isOwner(tester.a3)
+        self.multisig('Wallet.changeOwner', keys, wallet.changeOwner, tester.a3, tester.a4)
+        assert wallet.isOwner(tester.a4)
+        self.multisig('Wallet.removeOwner', keys, wallet.removeOwner, tester.a4)
+        assert not wallet.isOwner(tester.a4)
+        self.multisig('Wallet.setDailyLimit', keys, wallet.setDailyLimit, 2 * WALLET_DAY_LIMIT)
+        assert wallet.m_dailyLimit() == 2 * WALLET_DAY_LIMIT
+        self.multisig('Wallet.resetSpentToday', keys, wallet.resetSpentToday)
+        assert wallet.m_spentToday() == 0
+        self.multisig('Wallet.changeRequirement', keys, wallet.changeRequirement, 3)
+        assert wallet.m_required() == 3
+        self.multisig('Wallet.kill', [tester.k0, tester.k1, tester.k2], wallet.kill, tester.a8)
+        assert self.state.block.get_code(addr) == ''
+
+        self.assert_no_regressions()
+
+    def multisig(self, name, keys, f, *args):
+        # every owner but the last confirms, the last one executes
+        for i, k in enumerate(keys[:-1]):
+            self.gas('{}.confirm_{}'.format(name, i + 1), f, *args, sender=k)
+        self.gas(name + '.execute', f, *args, sender=keys[-1])
@@ -0,0 +1,124 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from ethereum import tester
+from ethereum.utils import denoms
+
+import artifacts
+import fixtures
+import genesis
+from artifacts import GNT
+
+tester.serpent = True  # tester tries to load serpent module, prevent that.
+
+
+@fixtures.scenario('genesis_test', parent='gnt_funding', persist=True)
+def genesis_test_scenario(state, env):
+    state.mine(2)
+    GNT.at(state, env['gnt']).finalize()
+    env['holders'] = tester.accounts[:3]
+    env['value'] = 1000 * denoms.ether
+
+
+class GenesisTest(unittest.TestCase):
+
+    def setUp(self):
+        self.state, self.env = fixtures.load('gnt_finalized')
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def transfer(self, state):
+        gnt = GNT.at(state, self.env['gnt'])
+        gas_before = state.block.gas_used
+        gnt.transfer(tester.a9, 1000 * denoms.ether, sender=tester.k1)
+        return state.block.gas_used - gas_before, gnt.balanceOf(tester.a1), gnt.balanceOf(tester.a9)
+
+    def test_restore(self):
+        data = genesis.dump(self.state)
+        restored = genesis.restore(data)
+        assert restored is not self.state
+        assert genesis.dump(restored) == data
+        assert restored.block.state_root == self.state.block.state_root
+        assert restored.block.number == self.state.block.number
+        assert restored.block.timestamp == self.state.block.timestamp
+
+        assert self.transfer(restored) == self.transfer(self.state)
+        assert restored.block.state_root == self.state.block.state_root
+
+    def test_mine(self):
+        restored = genesis.restore(genesis.dump(self.state))
+        number = restored.block.number
+        restored.mine(2)
+        assert restored.block.number == number + 2
+
+        snapshot = restored.snapshot()
+        transferred = self.transfer(restored)
+        restored.revert(snapshot)
+        assert self.transfer(restored) == transferred
+
+    def test_save_load(self):
+        path = os.path.join(self.dir, 'state', 'gnt.json.gz')
+        env = dict(self.env, keys=tester.keys[:2], count=3, nested={'a': [tester.a0]})
+        genesis.save(path, self.state, env)
+        state, loaded = genesis.load(path)
+        assert loaded == env
+        assert state.block.state_root == self.state.block.state_root
+        assert os.listdir(os.path.dirname(path)) == ['gnt.json.gz']
+
+
+class PersistedScenarioTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = fixtures.CACHE_DIR
+        fixtures.CACHE_DIR = tempfile.mkdtemp()
+        fixtures._snapshots.pop('genesis_test', None)
+
+    def tearDown(self):
+        shutil.rmtree(fixtures.CACHE_DIR)
+        fixtures.CACHE_DIR = self.cache_dir
+        fixtures._snapshots.pop('genesis_test', None)
+
+    def test_cache_key(self):
+        key = fixtures.cache_key('genesis_test')
+        assert key == fixtures.cache_key('genesis_test')
+        assert key != fixtures.cache_key('gnt_finalized')
+        assert key != fixtures.cache_key('gnt_funding')
+        assert os.path.dirname(fixtures.cache_path('genesis_test')) == fixtures.CACHE_DIR
+        assert key in fixtures.cache_path('genesis_test')
+
+    def test_missing_artifact(self):
+        artifacts.ALL.append(artifacts.Artifact('NotBuilt'))
+        try:
+            assert fixtures.cache_key('genesis_test') is None
+            assert fixtures.cache_path('genesis_test') is None
+            state, env = fixtures.load('genesis_test')
+            assert GNT.at(state, env['gnt']).finalized()
+            assert os.listdir(fixtures.CACHE_DIR) == []
+        finally:
+            artifacts.ALL.pop()
+
+    def test_warm_start(self):
+        built, env = fixtures.load('genesis_test')
+        path = fixtures.cache_path('genesis_test')
+        assert os.path.exists(path)
+        root = built.block.state_root
+
+        fixtures._snapshots.pop('genesis_test')
+        state, loaded = fixtures.load('genesis_test')
+        assert state is not built
+        assert loaded == env
+        assert state.block.state_root == root
+
+        gnt = GNT.at(state, env['gnt'])
+        assert gnt.finalized()
+        balance = gnt.balanceOf(env['holders'][0])
+        gnt.transfer(env['holders'][1], env['value'], sender=tester.k0)
+        assert gnt.balanceOf(env['holders'][0]) == balance - env['value']
+
+        # the stored state is loaded again after a revert
+        state, _ = fixtures.load('genesis_test')
+        assert gnt.balanceOf(env['holders'][0]) == balance
@@ -1,60 +1,46 @@
+import json
 import math
 import os
-import random
+import shutil
+import tempfile
 import unittest
-from collections import deque
-from contextlib import contextmanager
-from random import randint
-from os import urandom
 
 import re
-from ethereum import abi, tester
-from ethereum.keys import sha3
+from ethereum import tester
 from ethereum.tester import TransactionFailed, ContractCreationFailed
-from ethereum.utils import denoms, privtoaddr, to_string, parse_int_or_hex
+from ethereum.utils import denoms
 from rlp.utils import decode_hex
 
+import artifacts
+import events
+import fixtures
+import seeding
+import solc_cache
+import templates
+from accounts import FACTORY_KEY, dev_address
+from chain import BLOCK_GAS_LIMIT
+from scenarios import DEV_SHARES, create_dev_accounts, deploy_gnt
+from solc_cache import compile_contract
+from sources import ALLOC_CONTRACT_PATH, ALLOC_SLOTS, DEV_ADDR_REGEX, GNT_CONTRACT_PATH, IMPORT_ALLOC_REGEX, \
+    IMPORT_TOKEN_REGEX, gnt_source
+
 tester.serpent = True  # tester tries to load serpent module, prevent that.
 
-# GNT contract bytecode (used to create the contract) and ABI.
+# GNT contract bytecode (used to create the contract) and ABI are loaded from
+# the artifacts registry (artifacts.GNT, ...) on first use.
 # This is procudes by solidity compiler from Token.sol file.
 # You can use Solidity Browser
 # https://ethereum.github.io/browser-solidity/#version=soljson-v0.4.2+commit.af6afb04.js&optimize=true
 # to work on and update the Token.
 
-GNT_INIT = decode_hex(open('tests/GolemNetworkToken.bin', 'r').read().rstrip())
-GNT_ABI = open('tests/GolemNetworkToken.abi', 'r').read()
-
-MIGRATION_INIT = decode_hex(open('tests/MigrationAgent.bin', 'r').read().rstrip())
-MIGRATION_ABI = open('tests/MigrationAgent.abi', 'r').read()
-
-TARGET_INIT = decode_hex(open('tests/GNTTargetToken.bin', 'r').read().rstrip())
-TARGET_ABI = open('tests/GNTTargetToken.abi', 'r').read()
-
-ALLOC_INIT = decode_hex(open('tests/GNTAllocation.bin', 'r').read().rstrip())
-ALLOC_ABI = open('tests/GNTAllocation.abi', 'r').read()
-
-WALLET_INIT = decode_hex(open('tests/BadWallet.bin', 'r').read().rstrip())
-WALLET_ABI = open('tests/BadWallet.abi', 'r').read()
-
-GNT_CONTRACT_PATH = os.path.join('contracts', 'Token.sol')
-ALLOC_CONTRACT_PATH = os.path.join('contracts', 'GNTAllocation.sol')
-
-IMPORT_TOKEN_REGEX = '(import "\.\/Token\.sol";).*'
-IMPORT_ALLOC_REGEX = '(import "\.\/GNTAllocation\.sol";).*'
-DEV_ADDR_REGEX = "\s*allocations\[([a-zA-Z0-9]+)\].*"
-
-
-@contextmanager
-def work_dir_context(file_path):
-    cwd = os.getcwd()
-    file_name = os.path.basename(file_path)
-    rel_dir = os.path.dirname(file_path) or '.'
-    dir_name = os.path.abspath(rel_dir)
-
-    os.chdir(dir_name)
-    yield file_name
-    os.chdir(cwd)
+# The gas pins below were measured before batchTransfer and migrateBatch were
+# added to GNT. The dispatcher of solc 0.4 compares the selector of a call with
+# the selectors of the contract in ascending order, every comparison costs 22
+# gas. batchTransfer (0x88d695b2) and migrateBatch (0x50116ade) are compared
+# before transfer (0xa9059cbb) and the fallback function. A migration pays for
+# the selectors of migrateBatch in MigrationAgent (compared before migrateFrom)
+# and of createTokens in GNTTargetToken (compared before createToken).
+SELECTOR_GAS = 22
 
 
 class ContractHelper(object):
@@ -66,11 +52,11 @@ class ContractHelper(object):
         if not regex:
             regex = DEV_ADDR_REGEX
 
-        self.regex = re.compile(regex)
+        self.regex = _compile_regex(regex)
         self.contract_path = contract_path
 
-        with work_dir_context(contract_path) as file_name:
-            self.source = open(file_name).read().rstrip()
+        with open(contract_path) as f:
+            self.source = f.read().rstrip()
 
     def findall(self, regex=None):
         return self._re(regex).findall(self.source)
@@ -88,34 +74,20 @@ class ContractHelper(object):
 
     def _re(self, regex):
         if regex:
-            return re.compile(regex)
+            return _compile_regex(regex)
         return self.regex
 
-    @staticmethod
-    def dev_address(addr):
-        return '0x' + addr.encode('hex')
-
-
-def deploy_gnt(state, factory, dev_addresses, start, end, creator_idx=9):
-    alloc_helper = ContractHelper(ALLOC_CONTRACT_PATH)
-    # remove import
-    alloc_helper.sub([''], regex=IMPORT_TOKEN_REGEX)
-    # replace dev addresses
-    alloc_helper.sub(dev_addresses)
+    dev_address = staticmethod(dev_address)
 
-    # replace import with contract source
-    gnt_helper = ContractHelper(GNT_CONTRACT_PATH, regex=IMPORT_ALLOC_REGEX)
-    gnt_helper.sub([alloc_helper.source])
 
-    gas_before = state.block.gas_used
+_regexes = {}
 
-    with work_dir_context(gnt_helper.contract_path):
-        contract = state.abi_contract(gnt_helper.source,
-                                      language='solidity',
-                                      sender=tester.keys[creator_idx],
-                                      constructor_parameters=(factory, factory, start, end))
 
-    return contract, contract.address, state.block.gas_used - gas_before
+def _compile_regex(regex):
+    compiled = _regexes.get(regex)
+    if compiled is None:
+        compiled = _regexes[regex] = re.compile(regex)
+    return compiled
 
 
 class GNTCrowdfundingTest(unittest.TestCase):
@@ -142,115 +114,76 @@ class GNTCrowdfundingTest(unittest.TestCase):
     def monitor(self, addr, value=0):
         return self.Monitor(self.state, addr, value)
 
-    class EventListener:
-        def __init__(self, contract, state):
-            self.contract = contract
-            self.state = state
-            self.events = deque()
-
-        def hook(self):
-            self.state.block.log_listeners.append(self._listen)
-
-        def unhook(self):
-            listeners = self.state.block.log_listeners
-            if self._listen in listeners:
-                listeners.remove(self._listen)
-
-        def event(self, event_type, **params):
-            if self.events:
-                event = self.events.popleft()  # FIFO
-                type_matches = event["_event_type"] == event_type
-                return type_matches and all([event.get(n) == v for n, v in params.items()])
-
-        def _listen(self, event):
-            self.events.append(self.contract.translator.listen(event))
-
-    @contextmanager
     def event_listener(self, abi_contract, state):
-        listener = self.EventListener(abi_contract, state)
-        listener.hook()
-        yield listener
-        listener.unhook()
+        return events.listening(abi_contract, state)
 
     def setUp(self):
         self.state = tester.state()
+        self.rng = seeding.rng(self.id())
+
+    def random_bytes(self, n):
+        return seeding.random_bytes(self.rng, n)
 
     def deploy_contract(self, founder, start, end,
                         creator_idx=9, migration_master=None):
         if migration_master is None:
             migration_master = founder
         owner = self.monitor(creator_idx)
-        t = abi.ContractTranslator(GNT_ABI)
-        args = t.encode_constructor_arguments((founder, migration_master, start, end))
-        addr = self.state.evm(GNT_INIT + args,
-                              sender=owner.key)
-        self.c = tester.ABIContract(self.state, GNT_ABI, addr)
-        return addr, owner.gas()
+        self.c = artifacts.deploy_gnt(self.state, founder, migration_master, start, end,
+                                      sender=owner.key)
+        return self.c.address, owner.gas()
 
     def deploy_wallet(self, _founder, creator_idx=9):
         assert not hasattr(self, 'c')
         owner = self.monitor(creator_idx)
-        t = abi.ContractTranslator(WALLET_ABI)
-        args = t.encode_constructor_arguments([])
-        addr = self.state.evm(WALLET_INIT + args,
-                              sender=owner.key)
-        self.wallet = tester.ABIContract(self.state, WALLET_ABI, addr)
+        self.wallet = artifacts.deploy_bad_wallet(self.state, sender=owner.key)
 
-        return addr, owner.gas()
+        return self.wallet.address, owner.gas()
 
     def deploy_contract_on_wallet(self, wallet_addr, start, end):
         c_addr = self.wallet.deploy_contract(wallet_addr, start, end)
-        self.c = tester.ABIContract(self.state, GNT_ABI, c_addr)
+        self.c = artifacts.GNT.at(self.state, c_addr)
         return c_addr
 
     def deploy_migration_contract(self, source_contract, creator_idx=9):
         owner = self.monitor(creator_idx)
-        t = abi.ContractTranslator(MIGRATION_ABI)
-        args = t.encode_constructor_arguments([source_contract])
-        addr = self.state.evm(MIGRATION_INIT + args,
-                              sender=owner.key)
-        self.m = tester.ABIContract(self.state, MIGRATION_ABI, addr)
-        return addr, owner.gas()
+        self.m = artifacts.deploy_migration_agent(self.state, source_contract, sender=owner.key)
+        return self.m.address, owner.gas()
 
     def deploy_target_contract(self, migration_contract, creator_idx=9):
         owner = self.monitor(creator_idx)
-        t = abi.ContractTranslator(TARGET_ABI)
-        args = t.encode_constructor_arguments([migration_contract])
-        addr = self.state.evm(TARGET_INIT + args,
-                              sender=owner.key)
-        self.t = tester.ABIContract(self.state, TARGET_ABI, addr)
-        return addr, owner.gas()
-
-    def deploy_contract_and_accounts(self, n_devs):
-        dev_keys = []
-        dev_accounts = []
-
-        # create developer accounts and keys in fashion of testers
-        for account_number in range(n_devs):
-            dev_keys.append(sha3('dev' + to_string(account_number)))
-            dev_accounts.append(privtoaddr(dev_keys[-1]))
+        self.t = artifacts.deploy_target_token(self.state, migration_contract, sender=owner.key)
+        return self.t.address, owner.gas()
 
-        # developer balances
-        block = self.state.block
+    def deploy_packed_and_unpacked(self, start, end):
+        # GNT with the funding parameters packed into one storage slot and in
+        # separate slots, each with a new Golem Factory
+        return [deploy_gnt(self.state, self.random_bytes(20), [], start, end, packed=packed)[0]
+                for packed in (True, False)]
 
-        for i in range(n_devs):
-            addr, data = dev_accounts[i], {'wei': 10 ** 24}
-            if len(addr) == 40:
-                addr = decode_hex(addr)
-            assert len(addr) == 20
-            block.set_balance(addr, parse_int_or_hex(data['wei']))
-
-        block.commit_state()
-        block.state.db.commit()
-
-        dev_addresses = [ContractHelper.dev_address(a) for a in dev_accounts]
+    def deploy_contract_and_accounts(self, n_devs):
+        dev_keys, dev_accounts = create_dev_accounts(self.state, n_devs)
+        dev_addresses = [dev_address(a) for a in dev_accounts]
 
         # deploy the gnt contract with updated developer accounts
         contract, _, _ = deploy_gnt(self.state, tester.accounts[9], dev_addresses, 2, 2)
-        allocation = tester.ABIContract(self.state, ALLOC_ABI, contract.lockedAllocation())
+        allocation = artifacts.GNT_ALLOCATION.at(self.state, contract.lockedAllocation())
 
         return contract, allocation, dev_keys, dev_accounts
 
+    def start_migration(self, env, deploy_agent=artifacts.deploy_migration_agent,
+                        deploy_target=artifacts.deploy_target_token):
+        migration = deploy_agent(self.state, env['gnt'])
+        target = deploy_target(self.state, migration.address)
+        self.c.setMigrationAgent(migration.address, sender=FACTORY_KEY)
+        migration.setTargetToken(target.address, sender=tester.k9)
+        return migration, target
+
+    def load_scenario(self, name):
+        self.state, env = fixtures.load(name)
+        self.c = artifacts.GNT.at(self.state, env['gnt'])
+        return env
+
     def contract_balance(self):
         return self.state.block.get_balance(self.c.address)
 
@@ -269,57 +202,84 @@ class GNTCrowdfundingTest(unittest.TestCase):
         founder = tester.accounts[2]
         c, g = self.deploy_contract(founder, 5, 105)
         assert len(c) == 20
-        assert g <= 1549227
+        # fits in a block, test_gas.py pins the gas in the baseline
+        assert g <= BLOCK_GAS_LIMIT
         assert self.contract_balance() == 0
         assert decode_hex(self.c.golemFactory()) == founder
         assert not self.c.fundingActive()
 
+    def test_packed_funding_parameters(self):
+        founder = self.random_bytes(20)
+        addr, _ = self.deploy_contract(founder, 5, 0xffffffff)
+
+        # fundingMode, golemFactory, fundingStartBlock, fundingEndBlock
+        word = self.state.block.get_storage_data(addr, 0)
+        assert word & 0xff == 1
+        assert (word >> 8) & (2 ** 160 - 1) == int(founder.encode('hex'), 16)
+        assert (word >> 168) & 0xffffffff == 5
+        assert (word >> 200) & 0xffffffff == 0xffffffff
+
+        # block numbers must fit in 32 bits
+        with self.assertRaises(ContractCreationFailed):
+            self.deploy_contract(founder, 5, 2 ** 32)
+        with self.assertRaises(ContractCreationFailed):
+            self.deploy_contract(founder, 2 ** 32, 2 ** 32)
+
     def test_gas_for_create(self):
-        self.state.block.coinbase = urandom(20)
-        addr, _ = self.deploy_contract(urandom(20), 0, 100)
+        self.state.block.coinbase = self.random_bytes(20)
+        contracts = self.deploy_packed_and_unpacked(0, 100)
         costs = []
+        savings = set()
         for i, k in enumerate(tester.keys):
-            v = random.randrange(1 * denoms.ether, 82000 * denoms.ether)
-            m = self.monitor(i, v)
-            self.state.send(k, addr, v)
-            costs.append(m.gas())
+            v = self.rng.randrange(1 * denoms.ether, 82000 * denoms.ether)
+            gas = []
+            for c in contracts:
+                m = self.monitor(i, v)
+                self.state.send(k, c.address, v)
+                gas.append(m.gas())
+            costs.append(gas[0])
+            savings.add(gas[1] - gas[0])
         print(costs)
-        assert max(costs) == 63486
-        assert min(costs) == 63486 - 15000
+        assert max(costs) <= 63486 + 2 * SELECTOR_GAS
+        assert min(costs) == max(costs) - 15000
+        # every create loads the funding parameters once instead of per slot
+        assert len(savings) == 1
+        assert savings.pop() > 0
 
     def test_gas_for_transfer(self):
-        addr, _ = self.deploy_contract(urandom(20), 0, 1)
-        for i, k in enumerate(tester.keys):
-            v = random.randrange(15000 * denoms.ether, 82000 * denoms.ether)
-            self.state.send(k, addr, v)
-        self.state.mine(2)
-        self.c.finalize()
-        self.state.mine()
-        self.state.block.coinbase = urandom(20)
+        self.load_scenario('gnt_finalized')
+        self.state.block.coinbase = self.random_bytes(20)
         costs = []
         for i, k in enumerate(tester.keys):
-            v = random.randrange(1, 15000000 * denoms.ether)
+            v = self.rng.randrange(1, 15000000 * denoms.ether)
             m = self.monitor(i)
-            self.c.transfer(urandom(20), v, sender=k)
+            self.c.transfer(self.random_bytes(20), v, sender=k)
             costs.append(m.gas())
         print(costs)
-        assert max(costs) <= 51503
-        assert min(costs) >= 51342
+        assert max(costs) <= 51503 + 2 * SELECTOR_GAS
+        assert min(costs) >= 51342 + 2 * SELECTOR_GAS
+
+    def test_gas_for_batch_transfer(self):
+        self.load_scenario('gnt_finalized')
+        self.state.block.coinbase = self.random_bytes(20)
+        n = 10
+        values = [self.rng.randrange(1, 1000 * denoms.ether) for _ in range(n)]
+
+        singles = []
+        for v in values:
+            m = self.monitor(0)
+            self.c.transfer(self.random_bytes(20), v, sender=tester.k0)
+            singles.append(m.gas())
+
+        m = self.monitor(1)
+        assert self.c.batchTransfer([self.random_bytes(20) for _ in range(n)], values, sender=tester.k1)
+        batch = m.gas()
+        # at least the base cost of every transaction but one is saved
+        assert batch < sum(singles) - (n - 1) * 21000
 
     def test_gas_for_migrate_all(self):
-        factory_key = urandom(32)
-        addr, _ = self.deploy_contract(privtoaddr(factory_key), 0, 1)
-        for i, k in enumerate(tester.keys):
-            v = random.randrange(15000 * denoms.ether, 82000 * denoms.ether)
-            self.state.send(k, addr, v)
-        self.state.mine(2)
-        self.c.finalize()
-        m_addr, _ = self.deploy_migration_contract(addr)
-        t_addr, _ = self.deploy_target_contract(m_addr)
-        self.c.setMigrationAgent(m_addr, sender=factory_key)
-        self.m.setTargetToken(t_addr, sender=tester.k9)
-        self.state.mine()
-        self.state.block.coinbase = urandom(20)
+        self.load_scenario('gnt_migration')
+        self.state.block.coinbase = self.random_bytes(20)
         costs = []
         for i, k in enumerate(tester.keys):
             b = self.c.balanceOf(tester.accounts[i])
@@ -327,23 +287,12 @@ class GNTCrowdfundingTest(unittest.TestCase):
             self.c.migrate(b, sender=k)
             costs.append(m.gas())
         print(costs)
-        assert max(costs) <= 86313
-        assert min(costs) >= 56037
+        assert max(costs) <= 86313 + 2 * SELECTOR_GAS
+        assert min(costs) >= 56037 + 2 * SELECTOR_GAS
 
     def test_gas_for_migrate_half(self):
-        factory_key = urandom(32)
-        addr, _ = self.deploy_contract(privtoaddr(factory_key), 0, 1)
-        for i, k in enumerate(tester.keys):
-            v = random.randrange(15000 * denoms.ether, 82000 * denoms.ether)
-            self.state.send(k, addr, v)
-        self.state.mine(2)
-        self.c.finalize()
-        m_addr, _ = self.deploy_migration_contract(addr)
-        t_addr, _ = self.deploy_target_contract(m_addr)
-        self.c.setMigrationAgent(m_addr, sender=factory_key)
-        self.m.setTargetToken(t_addr, sender=tester.k9)
-        self.state.mine()
-        self.state.block.coinbase = urandom(20)
+        self.load_scenario('gnt_migration')
+        self.state.block.coinbase = self.random_bytes(20)
         costs = []
         for i, k in enumerate(tester.keys):
             b = self.c.balanceOf(tester.accounts[i])
@@ -351,37 +300,92 @@ class GNTCrowdfundingTest(unittest.TestCase):
             self.c.migrate(b / 2, sender=k)
             costs.append(m.gas())
         print(costs)
-        assert max(costs) <= 101313
-        assert min(costs) >= 71037
+        assert max(costs) <= 101313 + 2 * SELECTOR_GAS
+        assert min(costs) >= 71037 + 2 * SELECTOR_GAS
+
+    def test_gas_for_migrate_batch(self):
+        # a holder migrating in 10 parts as in test_multiple_migrations
+        env = self.load_scenario('gnt_migration')
+        target = artifacts.TARGET_TOKEN.at(self.state, env['target'])
+        self.state.block.coinbase = self.random_bytes(20)
+        n = 10
+        values = [self.c.balanceOf(tester.a0) / (2 * n)] * n
+
+        singles = []
+        for v in values:
+            m = self.monitor(0)
+            self.c.migrate(v, sender=tester.k0)
+            singles.append(m.gas())
+
+        m = self.monitor(1)
+        self.c.migrateBatch([tester.a1] * n, values, sender=tester.k1)
+        batch = m.gas()
+        assert target.balanceOf(tester.a0) == target.balanceOf(tester.a1) == sum(values)
+
+        # at least the base cost of every transaction but one is saved
+        assert batch < sum(singles) - (n - 1) * 21000
+
+    def test_gas_for_counting_migration(self):
+        env = self.load_scenario('gnt_finalized')
+        self.state.block.coinbase = self.random_bytes(20)
+        snapshot = self.state.snapshot()
+        costs = {}
+        for name, deploy_agent in [('checked', artifacts.deploy_migration_agent),
+                                   ('counting', artifacts.deploy_counting_migration_agent)]:
+            self.state.revert(snapshot)
+            self.start_migration(env, deploy_agent)
+            costs[name] = []
+            for i, k in enumerate(tester.keys):
+                m = self.monitor(i)
+                self.c.migrate(self.c.balanceOf(tester.accounts[i]) / 2, sender=k)
+                costs[name].append(m.gas())
+
+        # the first migration writes the counter to a new storage slot
+        for checked, counting in zip(costs['checked'][1:], costs['counting'][1:]):
+            assert counting < checked
 
     def test_gas_for_refund(self):
-        addr, _ = self.deploy_contract(urandom(20), 0, 1)
+        contracts = self.deploy_packed_and_unpacked(0, 1)
         for i, k in enumerate(tester.keys):
-            v = random.randrange(1 * denoms.ether, 15000 * denoms.ether)
-            self.state.send(k, addr, v)
+            v = self.rng.randrange(1 * denoms.ether, 15000 * denoms.ether)
+            for c in contracts:
+                self.state.send(k, c.address, v)
         self.state.mine(2)
-        self.state.block.coinbase = urandom(20)
-        costs = []
+        self.state.block.coinbase = self.random_bytes(20)
+        costs = {c.address: [] for c in contracts}
         for i, k in enumerate(tester.keys):
-            b = self.c.balanceOf(tester.accounts[i])
-            m = self.monitor(i, -(b // 1000))
-            self.c.refund(sender=k)
-            costs.append(m.gas())
-        print(costs)
-        assert max(costs) == 25512
-        assert min(costs) == 20256
+            for c in contracts:
+                b = c.balanceOf(tester.accounts[i])
+                m = self.monitor(i, -(b // 1000))
+                c.refund(sender=k)
+                costs[c.address].append(m.gas())
+        packed, unpacked = [costs[c.address] for c in contracts]
+        # only migrateBatch is compared before refund (0x590e1ae3)
+        assert max(packed) <= 25512 + SELECTOR_GAS
+        assert min(packed) <= 20256 + SELECTOR_GAS
+        # the last refund clears the total supply
+        assert max(packed) - min(packed) == max(unpacked) - min(unpacked)
+        savings = set(u - p for p, u in zip(packed, unpacked))
+        assert len(savings) == 1
+        assert savings.pop() > 0
 
     def test_gas_for_finalize(self):
-        addr, _ = self.deploy_contract(urandom(20), 0, 1)
+        contracts = self.deploy_packed_and_unpacked(0, 1)
+        # every tester creates at least 15M GNT, the minimum is reached
         for i, k in enumerate(tester.keys):
-            v = random.randrange(15000 * denoms.ether, 82000 * denoms.ether)
-            self.state.send(k, addr, v)
+            for c in contracts:
+                self.state.send(k, c.address, (15000 + i * 5000) * denoms.ether)
         self.state.mine(2)
-        self.state.block.coinbase = urandom(20)
-        m = self.monitor(0)
-        self.c.finalize(sender=tester.k0)
-        g = m.gas()
-        assert g == 86032
+        self.state.block.coinbase = self.random_bytes(20)
+        costs = []
+        for c in contracts:
+            m = self.monitor(0)
+            c.finalize(sender=tester.k0)
+            costs.append(m.gas())
+        packed, unpacked = costs
+        # no new selector is compared before finalize (0x4bb278f3)
+        assert packed <= 86032
+        assert packed < unpacked
 
     def test_transfer_enabled_after_end_block(self):
         founder = tester.accounts[4]
@@ -540,7 +544,7 @@ class GNTCrowdfundingTest(unittest.TestCase):
                                   _value=tokens,
                                   _to=tester.a1.encode('hex'),
                                   _from='0' * 40)
-            assert not listener.events  # no more events
+            assert not listener.pending()  # no more events
 
         assert self.balance_of(1) == tokens
 
@@ -550,7 +554,7 @@ class GNTCrowdfundingTest(unittest.TestCase):
         with self.event_listener(self.c, self.state) as listener:
             with self.assertRaises(TransactionFailed):
                 self.transfer(tester.k1, tester.a2, tokens)
-            assert not listener.events
+            assert not listener.pending()
 
         # Funding has ended.
         self.state.mine(1)
@@ -566,11 +570,93 @@ class GNTCrowdfundingTest(unittest.TestCase):
                                   _value=tokens,
                                   _to=tester.a2.encode('hex'),
                                   _from=tester.a1.encode('hex'))
-            assert not listener.events  # no more events
+            assert not listener.pending()  # no more events
 
         assert self.balance_of(1) == 0
         assert self.balance_of(2) == tokens
 
+    def test_event_store(self):
+        self.load_scenario('gnt_finalized')
+        first_block = self.state.block.number
+
+        with self.event_listener(self.c, self.state) as store:
+            self.transfer(tester.k0, tester.a1, 1)
+            self.transfer(tester.k1, tester.a2, 2)
+            self.state.mine(1)
+            self.transfer(tester.k2, tester.a1, 3)
+            self.transfer(tester.k1, tester.a1, 4)
+
+        self.transfer(tester.k0, tester.a1, 5)  # not recorded
+
+        assert len(store) == 4
+        assert store.count('Transfer') == 4
+        assert store.count('Refund') == 0
+        assert [e['_value'] for e in store.find('Transfer', _to=tester.a1)] == [1, 3, 4]
+        assert [e['_value'] for e in store.find('Transfer', _to=tester.a1.encode('hex'))] == [1, 3, 4]
+        assert [e['_value'] for e in store.find('Transfer', _from=tester.a1, _to=tester.a1)] == [4]
+        assert [e['_value'] for e in store.find(involving=tester.a2)] == [2]
+        assert [e['_value'] for e in store.find(involving=tester.a1)] == [1, 2, 3, 4]
+        assert [e['_value'] for e in store.find(to_block=first_block)] == [1, 2]
+        assert [e['_value'] for e in store.find('Transfer', from_block=first_block + 1)] == [3, 4]
+        assert store.count('Transfer', involving=tester.a1, from_block=first_block + 1, _value=3) == 1
+        assert store.count(from_block=first_block + 2) == 0
+
+        # events are consumed in order
+        assert store.event('Transfer', _value=1, _to=tester.a1.encode('hex'))
+        assert store.pending() == 3
+
+    def test_batch_transfer(self):
+        self.load_scenario('gnt_finalized')
+        b0, b1, b2 = [self.balance_of(i) for i in range(3)]
+
+        with self.event_listener(self.c, self.state) as listener:
+            assert self.c.batchTransfer([tester.a1, tester.a2, tester.a0, tester.a2], [1, 2, 3, 4],
+                                        sender=tester.k0)
+            for to, value in [(tester.a1, 1), (tester.a2, 2), (tester.a0, 3), (tester.a2, 4)]:
+                assert listener.event('Transfer',
+                                      _value=value,
+                                      _to=to.encode('hex'),
+                                      _from=tester.a0.encode('hex'))
+            assert not listener.pending()  # no more events
+
+        # tokens sent to self are not lost
+        assert self.balance_of(0) == b0 - 7
+        assert self.balance_of(1) == b1 + 1
+        assert self.balance_of(2) == b2 + 6
+
+    def test_batch_transfer_invalid(self):
+        self.load_scenario('gnt_finalized')
+        b0, b1 = self.balance_of(0), self.balance_of(1)
+
+        invalid = [
+            ([tester.a1, tester.a2], [1]),          # lengths differ
+            ([tester.a1, tester.a2], [1, 0]),       # zero value
+            ([tester.a1, tester.a2], [b0, 1]),      # sum exceeds the balance
+            ([tester.a1], [b0 + 1]),
+        ]
+        for recipients, values in invalid:
+            with self.event_listener(self.c, self.state) as listener:
+                with self.assertRaises(TransactionFailed):
+                    self.c.batchTransfer(recipients, values, sender=tester.k0)
+                assert not listener.pending()
+
+        assert self.balance_of(0) == b0
+        assert self.balance_of(1) == b1
+
+        # an empty batch transfers nothing
+        assert self.c.batchTransfer([], [], sender=tester.k0)
+        assert self.balance_of(0) == b0
+
+    def test_batch_transfer_locked(self):
+        self.load_scenario('gnt_funding')
+        b0 = self.balance_of(0)
+        assert b0 > 0
+        assert not self.c.finalized()
+
+        with self.assertRaises(TransactionFailed):
+            self.c.batchTransfer([tester.a1], [1], sender=tester.k0)
+        assert self.balance_of(0) == b0
+
     def test_migration(self):
         s_addr, _ = self.deploy_contract(tester.a9, 2, 2)
         source = self.c
@@ -624,7 +710,7 @@ class GNTCrowdfundingTest(unittest.TestCase):
         with self.event_listener(self.c, self.state) as listener:
             with self.assertRaises(TransactionFailed):
                 source.migrate(tokens, sender=tester.k2)
-            assert not listener.events
+            assert not listener.pending()
 
         # migrate tokens
         with self.event_listener(self.c, self.state) as listener:
@@ -637,7 +723,7 @@ class GNTCrowdfundingTest(unittest.TestCase):
                                   _value=tokens,
                                   _from=tester.a1.encode('hex'),
                                   _to=m_addr.encode('hex'))
-            assert not listener.events  # no more events
+            assert not listener.pending()  # no more events
 
         with self.assertRaises(TransactionFailed):
             source.migrate(tokens, sender=tester.k1)
@@ -714,7 +800,7 @@ class GNTCrowdfundingTest(unittest.TestCase):
 
         # testers purchase tokens
         for i in range(0, n_accounts):
-            value = random.randrange(150000 / 9, 150000 / 9 + 81) * denoms.ether
+            value = self.rng.randrange(150000 / 9, 150000 / 9 + 81) * denoms.ether
             self.state.send(tester.keys[i], s_addr, value)
             values[i] += value
 
@@ -756,6 +842,90 @@ class GNTCrowdfundingTest(unittest.TestCase):
         assert source.totalSupply() == supply_after_finalization - total * creation_rate
         assert target.totalSupply() == total * creation_rate
 
+    def test_migrate_batch(self):
+        env = self.load_scenario('gnt_finalized')
+        source = self.c
+        recipients = [tester.a1, tester.a2, tester.a1]
+        values = [1000, 2000, 3000]
+
+        # no migration agent
+        with self.assertRaises(TransactionFailed):
+            source.migrateBatch(recipients, values, sender=tester.k0)
+
+        migration, target = self.start_migration(env)
+
+        supply = source.totalSupply()
+        balance = source.balanceOf(tester.a0)
+
+        with self.assertRaises(TransactionFailed):
+            source.migrateBatch(recipients, values[:2], sender=tester.k0)
+        with self.assertRaises(TransactionFailed):
+            source.migrateBatch(recipients, [1000, 0, 3000], sender=tester.k0)
+        with self.assertRaises(TransactionFailed):
+            source.migrateBatch(recipients, [1000, balance, 3000], sender=tester.k0)
+        with self.assertRaises(TransactionFailed):
+            # the migration agent accepts batches from GNT only
+            migration.migrateBatch(recipients, values, sender=tester.k0)
+
+        with self.event_listener(source, self.state) as listener:
+            source.migrateBatch(recipients, values, sender=tester.k0)
+            assert listener.count('Transfer', _from=migration.address) == len(values)
+            assert listener.find('Migrate', _from=tester.a0)[0]['_value'] == sum(values)
+
+        assert source.balanceOf(tester.a0) == balance - sum(values)
+        assert source.totalSupply() == supply - sum(values)
+        assert source.totalMigrated() == sum(values)
+        assert target.balanceOf(tester.a0) == 0
+        assert target.balanceOf(tester.a1) == 4000
+        assert target.balanceOf(tester.a2) == 2000
+        assert target.totalSupply() == sum(values)
+
+        # the whole balance
+        source.migrateBatch([tester.a0], [source.balanceOf(tester.a0)], sender=tester.k0)
+        assert source.balanceOf(tester.a0) == 0
+        assert target.balanceOf(tester.a0) == balance - sum(values)
+
+        migration.finalizeMigration(sender=tester.k9)
+        assert target.totalSupply() + source.totalSupply() == supply
+
+    def test_counting_migration(self):
+        env = self.load_scenario('gnt_finalized')
+        supply = self.c.totalSupply()
+        migration, target = self.start_migration(env, artifacts.deploy_counting_migration_agent)
+        assert migration.invariantHolds()
+
+        for i, k in enumerate(tester.keys):
+            self.c.migrate(self.c.balanceOf(tester.accounts[i]) / 2, sender=k)
+        self.c.migrateBatch([tester.a1, tester.a2], [1000, 2000], sender=tester.k0)
+        assert migration.invariantHolds()
+        assert target.totalSupply() == self.c.totalMigrated()
+
+        with self.assertRaises(TransactionFailed):
+            migration.finalizeMigration(sender=tester.k0)
+        migration.finalizeMigration(sender=tester.k9)
+        assert target.totalSupply() + self.c.totalSupply() == supply
+
+    def test_tampered_target_token(self):
+        env = self.load_scenario('gnt_finalized')
+        snapshot = self.state.snapshot()
+
+        # MigrationAgent rejects the first migration
+        migration, target = self.start_migration(env, deploy_target=artifacts.deploy_bad_target_token)
+        with self.assertRaises(TransactionFailed):
+            self.c.migrate(1000, sender=tester.k0)
+        assert target.totalSupply() == 0
+
+        # CountingMigrationAgent accepts migrations, the invariant does not
+        # hold and the migration cannot be finalized
+        self.state.revert(snapshot)
+        migration, target = self.start_migration(env, artifacts.deploy_counting_migration_agent,
+                                                 artifacts.deploy_bad_target_token)
+        self.c.migrate(1000, sender=tester.k0)
+        assert target.balanceOf(tester.a0) == 1001
+        assert not migration.invariantHolds()
+        with self.assertRaises(TransactionFailed):
+            migration.finalizeMigration(sender=tester.k9)
+
     def test_number_of_tokens_left(self):
         addr, _ = self.deploy_contract(tester.a0, 13, 42)
         rate = self.c.tokenCreationRate()
@@ -769,7 +939,7 @@ class GNTCrowdfundingTest(unittest.TestCase):
         assert self.c.numberOfTokensLeft() == 0
 
     def test_send_raw_data_no_value(self):
-        random_data = urandom(4)
+        random_data = self.random_bytes(4)
         print("RANDOM DATA: {}".format(random_data.encode('hex')))
         addr, _ = self.deploy_contract(tester.a9, 7, 9)
 
@@ -796,12 +966,12 @@ class GNTCrowdfundingTest(unittest.TestCase):
         assert self.contract_balance() == 0
 
     def test_send_raw_data_and_value(self):
-        random_data = urandom(4)
+        random_data = self.random_bytes(4)
         print("RANDOM DATA: {}".format(random_data.encode('hex')))
         addr, _ = self.deploy_contract(tester.a9, 7, 9)
 
         max_value = self.c.tokenCreationCap() / self.c.tokenCreationRate()
-        random_value = randint(0, max_value)
+        random_value = self.rng.randint(0, max_value)
         print("RANDOM VALUE: {}".format(random_value))
 
         assert self.c.totalSupply() == 0
@@ -839,7 +1009,7 @@ class GNTCrowdfundingTest(unittest.TestCase):
     def test_finalize_funding(self):
         self.deploy_contract(tester.accounts[9], 2, 2)
         contract = self.c
-        allocation = tester.ABIContract(self.state, ALLOC_ABI, contract.lockedAllocation())
+        allocation = artifacts.GNT_ALLOCATION.at(self.state, contract.lockedAllocation())
 
         # ---------------
         #   PRE FUNDING
@@ -886,11 +1056,12 @@ class GNTCrowdfundingTest(unittest.TestCase):
 
     def test_finalize_and_unlock(self):
 
-        dev_shares = [2500, 730, 730, 730, 730, 730, 630, 630, 630, 630, 310,
-                      153, 150, 100, 100, 100, 70, 70, 70, 70, 70, 42, 25]
+        dev_shares = DEV_SHARES
 
         n_devs = len(dev_shares)
-        contract, allocation, dev_keys, dev_accounts = self.deploy_contract_and_accounts(n_devs)
+        env = self.load_scenario('gnt_devs')
+        contract, dev_keys, dev_accounts = self.c, env['dev_keys'], env['dev_accounts']
+        allocation = artifacts.GNT_ALLOCATION.at(self.state, contract.lockedAllocation())
         factory = contract.golemFactory()
 
         # ---------------
@@ -937,8 +1108,11 @@ class GNTCrowdfundingTest(unittest.TestCase):
         self.state.block.timestamp += 1 * 10 ** 8
 
         balance_sum = 0
+        snapshot = self.state.snapshot()
 
+        gas_before = self.state.block.gas_used
         allocation.unlock(sender=tester.k9)
+        gas_unlock = self.state.block.gas_used - gas_before
         with self.assertRaises(TransactionFailed):
             allocation.unlock(sender=tester.k9)
 
@@ -948,7 +1122,9 @@ class GNTCrowdfundingTest(unittest.TestCase):
             assert _expected - err <= _value <= _expected + err
 
         for i in xrange(n_devs):
+            gas_before = self.state.block.gas_used
             allocation.unlock(sender=dev_keys[i])
+            gas_unlock += self.state.block.gas_used - gas_before
             balance = contract.balanceOf(dev_accounts[i])
             expected = dev_shares[i] * tokens_devs / 10000
 
@@ -963,6 +1139,27 @@ class GNTCrowdfundingTest(unittest.TestCase):
         assert contract.balanceOf(factory) == tokens_ca
         assert contract.balanceOf(allocation.address) == tokens_left
 
+        # ---------------
+        #  BATCH UNLOCK
+        # ---------------
+        holders = [factory] + dev_accounts
+        balances = [contract.balanceOf(h) for h in holders]
+        self.state.revert(snapshot)
+
+        gas_before = self.state.block.gas_used
+        allocation.unlockBatch(holders, sender=tester.k0)
+        gas_batch = self.state.block.gas_used - gas_before
+
+        assert [contract.balanceOf(h) for h in holders] == balances
+        assert contract.balanceOf(allocation.address) == tokens_left
+        assert gas_batch < gas_unlock
+
+        # allocations are unlocked only once
+        with self.assertRaises(TransactionFailed):
+            allocation.unlockBatch([dev_accounts[0]], sender=tester.k0)
+        with self.assertRaises(TransactionFailed):
+            allocation.unlock(sender=tester.k9)
+
     # assumes post funding period
     def _finalize_funding(self, addr, expected_supply):
         assert self.c.totalSupply() == expected_supply
@@ -985,7 +1182,7 @@ class GNTCrowdfundingTest(unittest.TestCase):
             assert listener.event('Refund',
                                   _from=tester.a1.encode('hex'),
                                   _value=value)
-            assert not listener.events  # no more events
+            assert not listener.pending()  # no more events
 
         refund = self.state.block.get_balance(tester.a1) - b
         assert refund > value * 0.9999999999999999
@@ -1125,7 +1322,123 @@ class GNTContractHelperTest(unittest.TestCase):
         gnt_helper = ContractHelper(GNT_CONTRACT_PATH, regex=IMPORT_ALLOC_REGEX)
         gnt_helper.sub([alloc_helper.source])
 
+        init, gnt_abi = compile_contract(gnt_helper.source, 'GolemNetworkToken', artifacts.CONTRACTS_DIR)
         state = tester.state()
-        contract = state.abi_contract(gnt_helper.source, language='solidity', sender=tester.k0)
+        contract = tester.ABIContract(state, artifacts.translator(gnt_abi), state.evm(init, sender=tester.k0))
 
         assert contract
+
+
+class GNTTemplateTest(unittest.TestCase):
+
+    def test_slots(self):
+        template = templates.load(ALLOC_CONTRACT_PATH, ALLOC_SLOTS)
+        assert template.defaults['import_token'] == ['import "./Token.sol";']
+        assert template.defaults['dev_address'][:3] == ['0xde00', '0xde01', '0xde02']
+        assert len(template.defaults['dev_address']) == len(DEV_SHARES)
+        assert [int(s) for s in template.defaults['dev_share']] == DEV_SHARES
+        # parsed once
+        assert templates.load(ALLOC_CONTRACT_PATH, ALLOC_SLOTS) is template
+
+    def test_render(self):
+        template = templates.load(ALLOC_CONTRACT_PATH, ALLOC_SLOTS)
+        with open(ALLOC_CONTRACT_PATH) as f:
+            assert template.render() == f.read().rstrip()
+
+        source = template.render(dev_address=['0xad00', '0xad01'], dev_share=['2000'])
+        assert 'allocations[0xad00] = 2000;' in source
+        assert 'allocations[0xad01] =  730;' in source
+        assert 'allocations[0xde02] =  730;' in source
+
+    def test_same_as_helper(self):
+        dev_addresses = ['0xad00', '0xad01', '0xad02']
+
+        alloc_helper = ContractHelper(ALLOC_CONTRACT_PATH)
+        alloc_helper.sub([''], regex=IMPORT_TOKEN_REGEX)
+        alloc_helper.sub(dev_addresses)
+        gnt_helper = ContractHelper(GNT_CONTRACT_PATH, regex=IMPORT_ALLOC_REGEX)
+        gnt_helper.sub([alloc_helper.source])
+
+        source = gnt_source(dev_addresses)
+        assert source == gnt_helper.source
+        assert templates.digest(source) == templates.digest(gnt_helper.source)
+        assert templates.digest(source) != templates.digest(gnt_source(dev_addresses[:2]))
+
+
+class GNTCompileCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.import_dir = artifacts.CONTRACTS_DIR
+        self.source = open(GNT_CONTRACT_PATH).read()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_cache_hit(self):
+        init, gnt_abi = compile_contract(self.source, 'GolemNetworkToken', self.import_dir, self.cache_dir)
+        assert init
+        assert len(os.listdir(self.cache_dir)) == 1
+
+        # cache hit must not run the compiler
+        _compile = solc_cache._compile
+        solc_cache._compile = None
+        try:
+            cached = compile_contract(self.source, 'GolemNetworkToken', self.import_dir, self.cache_dir)
+        finally:
+            solc_cache._compile = _compile
+        assert cached == (init, gnt_abi)
+
+    def test_abi_list(self):
+        # newer solc versions emit the ABI as a list instead of a JSON string
+        path = os.path.join(self.cache_dir,
+                            solc_cache.cache_key(self.source, 'GolemNetworkToken', self.import_dir) + '.json')
+        abi = [{'type': 'function', 'name': 'finalize', 'inputs': [], 'outputs': [], 'constant': False}]
+        solc_cache._store(path, {'bin': '6060', 'abi': abi})
+        init, gnt_abi = compile_contract(self.source, 'GolemNetworkToken', self.import_dir, self.cache_dir)
+        assert init == '\x60\x60'
+        assert json.loads(gnt_abi) == abi
+
+    def test_solc_version_memoized(self):
+        calls = []
+        check_output = solc_cache.subprocess.check_output
+        versions = dict(solc_cache._solc_versions)
+        solc_cache._solc_versions.clear()
+
+        def counted(*args, **kwargs):
+            calls.append(args)
+            return check_output(*args, **kwargs)
+
+        solc_cache.subprocess.check_output = counted
+        try:
+            for _ in range(3):
+                solc_cache.cache_key(self.source, 'GolemNetworkToken', self.import_dir)
+        finally:
+            solc_cache.subprocess.check_output = check_output
+            solc_cache._solc_versions.update(versions)
+        assert len(calls) == 1
+
+    def test_cache_key(self):
+        key = solc_cache.cache_key(self.source, 'GolemNetworkToken', self.import_dir)
+        assert key == solc_cache.cache_key(self.source, 'GolemNetworkToken', self.import_dir)
+        assert key != solc_cache.cache_key(self.source + '\n', 'GolemNetworkToken', self.import_dir)
+        assert key != solc_cache.cache_key(self.source, 'MigrationAgent', self.import_dir)
+
+
+class ArtifactsTest(unittest.TestCase):
+
+    def test_lazy_load(self):
+        artifact = artifacts.Artifact('NoSuchContract')
+        # nothing is read until the contract is used
+        with self.assertRaises(IOError):
+            artifact.init
+
+    def test_translator_memoized(self):
+        assert artifacts.GNT.translator is artifacts.GNT.translator
+        assert artifacts.translator(artifacts.GNT.abi) is artifacts.GNT.translator
+
+        state = tester.state()
+        gnt = artifacts.deploy_gnt(state, tester.a0, tester.a0, 1, 2)
+        assert gnt.translator is artifacts.GNT.translator
+        assert artifacts.GNT.at(state, gnt.address).translator is gnt.translator
+        assert decode_hex(gnt.golemFactory()) == tester.a0
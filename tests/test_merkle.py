@@ -0,0 +1,116 @@
+import unittest
+
+from ethereum import tester
+from ethereum.tester import TransactionFailed
+from ethereum.utils import sha3
+from rlp.utils import decode_hex
+
+import allocations
+import artifacts
+import fixtures
+import merkle
+from scenarios import DEV_SHARES
+
+tester.serpent = True  # tester tries to load serpent module, prevent that.
+
+
+def holders(n):
+    return [sha3('holder' + str(i))[:20] for i in range(n)]
+
+
+class AllocationTreeTest(unittest.TestCase):
+
+    def test_proofs(self):
+        for n in [1, 2, 3, 5, 8, 24, 33]:
+            tree = merkle.AllocationTree(zip(holders(n), range(1, n + 1)))
+            assert tree.total == n * (n + 1) / 2
+            for h, a in tree.allocations:
+                assert tree.allocation(h) == a
+                proof = tree.proof(h)
+                assert len(proof) <= len(tree.levels) - 1
+                assert merkle.verify(tree.root, h, a, proof)
+                assert not merkle.verify(tree.root, h, a + 1, proof)
+
+    def test_single_leaf(self):
+        tree = merkle.AllocationTree([(tester.a0, 100)])
+        assert tree.root == merkle.leaf(tester.a0, 100)
+        assert tree.proof(tester.a0) == []
+
+    def test_leaf(self):
+        # sha3(address, uint256) of Solidity, tightly packed
+        assert merkle.leaf(tester.a0, 1) == sha3(tester.a0 + '\x00' * 31 + '\x01')
+        assert merkle.leaf(tester.a0.encode('hex'), 1) == merkle.leaf(tester.a0, 1)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            merkle.AllocationTree([])
+        with self.assertRaises(ValueError):
+            merkle.AllocationTree([(tester.a0, 1), (tester.a0, 2)])
+
+    def test_other_holder(self):
+        tree = merkle.AllocationTree(zip(holders(10), [7] * 10))
+        h = holders(10)
+        assert not merkle.verify(tree.root, h[0], 7, tree.proof(h[1]))
+
+
+class GNTMerkleAllocationTest(unittest.TestCase):
+
+    def setUp(self):
+        # the same allocations as GNTAllocation in the gnt_devs scenario
+        self.state, env = fixtures.load('gnt_unlocked')
+        self.gnt = artifacts.GNT.at(self.state, env['gnt'])
+        self.dev_keys = env['dev_keys']
+        self.dev_accounts = env['dev_accounts']
+        self.tree = merkle.AllocationTree(zip([tester.a9] + self.dev_accounts,
+                                              [allocations.FACTORY_SHARE] + DEV_SHARES))
+
+        self.allocation = artifacts.deploy_merkle_allocation(self.state, env['gnt'], self.tree.root,
+                                                             self.tree.total)
+        # as many tokens as locked in GNTAllocation
+        self.locked = self.gnt.balanceOf(decode_hex(self.gnt.lockedAllocation()))
+        for k in tester.keys[4:9]:
+            self.gnt.transfer(self.allocation.address, self.locked / 5, sender=k)
+        self.locked = self.gnt.balanceOf(self.allocation.address)
+
+    def unlock(self, holder_key, holder, allocation=None, proof=None):
+        if allocation is None:
+            allocation = self.tree.allocation(holder)
+        if proof is None:
+            proof = self.tree.proof(holder)
+        self.allocation.unlock(allocation, proof, sender=holder_key)
+
+    def test_locked(self):
+        with self.assertRaises(TransactionFailed):
+            self.unlock(tester.k9, tester.a9)
+
+    def test_unlock(self):
+        self.state.block.timestamp += 10 ** 8
+
+        self.unlock(tester.k9, tester.a9)
+        assert self.gnt.balanceOf(tester.a9) == self.locked * allocations.FACTORY_SHARE / 30000
+        for key, account, share in zip(self.dev_keys, self.dev_accounts, DEV_SHARES):
+            self.unlock(key, account)
+            assert self.gnt.balanceOf(account) == self.locked * share / 30000
+
+        # rounding leaves at most one token unit per holder
+        assert self.gnt.balanceOf(self.allocation.address) <= len(DEV_SHARES) + 1
+
+        with self.assertRaises(TransactionFailed):
+            self.unlock(self.dev_keys[0], self.dev_accounts[0])
+
+    def test_invalid_proof(self):
+        self.state.block.timestamp += 10 ** 8
+        key, account = self.dev_keys[1], self.dev_accounts[1]
+
+        with self.assertRaises(TransactionFailed):
+            self.unlock(key, account, allocation=DEV_SHARES[0])
+        with self.assertRaises(TransactionFailed):
+            self.unlock(key, account, proof=self.tree.proof(self.dev_accounts[2]))
+        with self.assertRaises(TransactionFailed):
+            self.unlock(key, account, proof=self.tree.proof(account)[:-1])
+        # not a holder
+        with self.assertRaises(TransactionFailed):
+            self.unlock(tester.k0, tester.a0, allocation=DEV_SHARES[1], proof=self.tree.proof(account))
+
+        self.unlock(key, account)
+        assert self.gnt.balanceOf(account) == self.locked * DEV_SHARES[1] / 30000
@@ -0,0 +1,205 @@
+"""
+Property-based tests of GolemNetworkToken against the reference model
+(model.py).
+
+ModelMachine runs random sequences of operations on the model alone and
+checks the token invariants, it is fast enough for thousands of sequences.
+DifferentialMachine drives the model and the EVM with the same sequences and
+compares the outcome of every operation, balances and totalSupply.
+"""
+from ethereum import tester
+from ethereum.tester import TransactionFailed
+from ethereum.utils import denoms
+from hypothesis import settings, strategies as st
+from hypothesis.stateful import RuleBasedStateMachine, invariant, precondition, rule
+from rlp.utils import decode_hex
+
+import artifacts
+import fixtures
+from accounts import FACTORY, FACTORY_KEY
+from model import GNTModel, Throw, TOKEN_CREATION_CAP, TOKEN_CREATION_RATE
+
+tester.serpent = True  # tester tries to load serpent module, prevent that.
+
+FUNDING_START_BLOCK = 1
+FUNDING_END_BLOCK = 4
+
+# tester accounts 0 - 8, account 9 deploys the contracts
+accounts = st.integers(0, 8)
+ether_values = st.one_of(st.integers(0, 1000), st.integers(0, 400000).map(lambda v: v * denoms.ether))
+token_values = st.one_of(st.integers(0, 1000), st.integers(0, 400000 * denoms.ether * TOKEN_CREATION_RATE))
+
+
+@fixtures.scenario('gnt_model')
+def gnt_model_scenario(state, env):
+    gnt = artifacts.deploy_gnt(state, FACTORY, FACTORY, FUNDING_START_BLOCK, FUNDING_END_BLOCK)
+    env['gnt'] = gnt.address
+    env['allocation'] = decode_hex(gnt.lockedAllocation())
+
+
+class ModelMachine(RuleBasedStateMachine):
+
+    def __init__(self):
+        super(ModelMachine, self).__init__()
+        self.block_number = 0
+        self.model = GNTModel(FACTORY, FACTORY, FUNDING_START_BLOCK, FUNDING_END_BLOCK)
+        self.supply = None  # total supply after finalization
+
+    def run(self, op, *args):
+        try:
+            op(*args)
+        except Throw:
+            pass
+
+    @rule(n=st.integers(1, 3))
+    def mine(self, n):
+        self.block_number += n
+
+    @rule(i=accounts, value=ether_values)
+    def create(self, i, value):
+        self.run(self.model.create, i, value, self.block_number)
+
+    @rule()
+    def finalize(self):
+        created = self.model.total_supply()
+        self.run(self.model.finalize, self.block_number)
+        if self.model.finalized() and self.supply is None:
+            self.supply = self.model.total_supply()
+            assert self.supply == created + created * 18 // 82
+
+    @rule(i=accounts)
+    def refund(self, i):
+        self.run(self.model.refund, i, self.block_number)
+
+    @rule(i=accounts, j=accounts, value=token_values)
+    def transfer(self, i, j, value):
+        self.run(self.model.transfer, i, j, value)
+
+    @rule(i=accounts, transfers=st.lists(st.tuples(accounts, token_values), max_size=4))
+    def batch_transfer(self, i, transfers):
+        self.run(self.model.batch_transfer, i, [t[0] for t in transfers], [t[1] for t in transfers])
+
+    @rule()
+    def set_migration_agent(self):
+        self.run(self.model.set_migration_agent, FACTORY, 'agent')
+
+    @rule(i=accounts, value=token_values)
+    def migrate(self, i, value):
+        self.run(self.model.migrate, i, value)
+
+    @rule(i=accounts, migrations=st.lists(st.tuples(accounts, token_values), max_size=4))
+    def migrate_batch(self, i, migrations):
+        self.run(self.model.migrate_batch, i, [m[0] for m in migrations], [m[1] for m in migrations])
+
+    @invariant()
+    def balances_sum_to_total_supply(self):
+        assert sum(self.model.balances.values()) == self.model.total_supply()
+
+    @invariant()
+    def supply_is_conserved(self):
+        if self.model.funding_mode:
+            assert self.model.total_supply() <= TOKEN_CREATION_CAP
+            assert self.model.eth * TOKEN_CREATION_RATE == self.model.total_supply()
+        else:
+            assert self.model.eth == 0
+            assert self.model.total_supply() + self.model.total_migrated == self.supply
+            assert sum(self.model.migrated.values()) == self.model.total_migrated
+
+
+class DifferentialMachine(RuleBasedStateMachine):
+
+    def __init__(self):
+        super(DifferentialMachine, self).__init__()
+        self.state, env = fixtures.load('gnt_model')
+        self.gnt = artifacts.GNT.at(self.state, env['gnt'])
+        self.allocation = env['allocation']
+        self.model = GNTModel(FACTORY, FACTORY, FUNDING_START_BLOCK, FUNDING_END_BLOCK, self.allocation)
+        self.target = None
+
+    def run(self, model_op, evm_op):
+        """
+        Apply an operation to the model and to the EVM. Both have to throw or
+        both have to return the same result.
+        """
+        try:
+            expected = model_op()
+        except Throw:
+            try:
+                evm_op()
+            except TransactionFailed:
+                return
+            raise AssertionError("the contract accepted an operation the model rejects")
+        result = evm_op()
+        if expected is not None and isinstance(result, bool):
+            assert result == expected
+
+    @rule(n=st.integers(1, 3))
+    def mine(self, n):
+        self.state.mine(n)
+
+    @rule(i=accounts, value=ether_values)
+    def create(self, i, value):
+        self.run(lambda: self.model.create(tester.accounts[i], value, self.state.block.number),
+                 lambda: self.state.send(tester.keys[i], self.gnt.address, value))
+
+    @rule(i=accounts)
+    def finalize(self, i):
+        self.run(lambda: self.model.finalize(self.state.block.number),
+                 lambda: self.gnt.finalize(sender=tester.keys[i]))
+
+    @rule(i=accounts)
+    def refund(self, i):
+        self.run(lambda: self.model.refund(tester.accounts[i], self.state.block.number),
+                 lambda: self.gnt.refund(sender=tester.keys[i]))
+
+    @rule(i=accounts, j=accounts, value=token_values)
+    def transfer(self, i, j, value):
+        self.run(lambda: self.model.transfer(tester.accounts[i], tester.accounts[j], value),
+                 lambda: self.gnt.transfer(tester.accounts[j], value, sender=tester.keys[i]))
+
+    @rule(i=accounts, transfers=st.lists(st.tuples(accounts, token_values), max_size=4))
+    def batch_transfer(self, i, transfers):
+        recipients = [tester.accounts[t[0]] for t in transfers]
+        values = [t[1] for t in transfers]
+        self.run(lambda: self.model.batch_transfer(tester.accounts[i], recipients, values),
+                 lambda: self.gnt.batchTransfer(recipients, values, sender=tester.keys[i]))
+
+    @precondition(lambda self: self.model.finalized() and self.target is None)
+    @rule()
+    def set_migration_agent(self):
+        migration = artifacts.deploy_migration_agent(self.state, self.gnt.address)
+        self.target = artifacts.deploy_target_token(self.state, migration.address)
+        migration.setTargetToken(self.target.address, sender=tester.k9)
+        self.run(lambda: self.model.set_migration_agent(FACTORY, migration.address),
+                 lambda: self.gnt.setMigrationAgent(migration.address, sender=FACTORY_KEY))
+
+    @rule(i=accounts, value=token_values)
+    def migrate(self, i, value):
+        self.run(lambda: self.model.migrate(tester.accounts[i], value),
+                 lambda: self.gnt.migrate(value, sender=tester.keys[i]))
+
+    @rule(i=accounts, migrations=st.lists(st.tuples(accounts, token_values), max_size=4))
+    def migrate_batch(self, i, migrations):
+        recipients = [tester.accounts[m[0]] for m in migrations]
+        values = [m[1] for m in migrations]
+        self.run(lambda: self.model.migrate_batch(tester.accounts[i], recipients, values),
+                 lambda: self.gnt.migrateBatch(recipients, values, sender=tester.keys[i]))
+
+    @invariant()
+    def same_state(self):
+        assert self.gnt.totalSupply() == self.model.total_supply()
+        assert self.gnt.finalized() == self.model.finalized()
+        assert self.gnt.fundingActive() == self.model.funding_active(self.state.block.number)
+        assert self.state.block.get_balance(self.gnt.address) == self.model.eth
+        assert self.gnt.balanceOf(self.allocation) == self.model.balance_of(self.allocation)
+        for a in tester.accounts[:9]:
+            assert self.gnt.balanceOf(a) == self.model.balance_of(a)
+            if self.target:
+                assert self.target.balanceOf(a) == self.model.migrated.get(a, 0)
+
+
+ModelTest = ModelMachine.TestCase
+ModelTest.settings = settings(max_examples=500, stateful_step_count=50, deadline=None)
+
+DifferentialTest = DifferentialMachine.TestCase
+DifferentialTest.settings = settings(max_examples=30, stateful_step_count=30, deadline=None)
@@ -0,0 +1,109 @@
+import unittest
+
+from ethereum import tester, vm
+from ethereum.tester import TransactionFailed
+from ethereum.utils import denoms
+from rlp.utils import decode_hex
+
+import artifacts
+import fixtures
+import profiler
+from artifacts import GNT
+from accounts import FACTORY_KEY
+
+tester.serpent = True  # tester tries to load serpent module, prevent that.
+
+TOKENS = 1000 * denoms.ether
+
+
+def frames(transaction):
+    stack = list(transaction.frames)
+    while stack:
+        frame = stack.pop()
+        stack.extend(frame.calls)
+        yield frame
+
+
+class ProfilerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.state, env = fixtures.load('gnt_finalized')
+        self.gnt = GNT.at(self.state, env['gnt'])
+        self.migration = artifacts.deploy_migration_agent(self.state, self.gnt.address)
+        self.target = artifacts.deploy_target_token(self.state, self.migration.address)
+        self.gnt.setMigrationAgent(self.migration.address, sender=FACTORY_KEY)
+        self.migration.setTargetToken(self.target.address, sender=tester.k9)
+
+    def migrate(self, p):
+        with p:
+            gas_before = self.state.block.gas_used
+            self.gnt.migrate(TOKENS, sender=tester.k4)
+            gas = self.state.block.gas_used - gas_before
+        assert len(p.transactions) == 1
+        transaction = p.transactions[0]
+        assert transaction.success
+        assert transaction.gas == gas
+        return transaction
+
+    def test_migrate(self):
+        execute = vm.vm_execute
+        p = profiler.Profiler()
+        transaction = self.migrate(p)
+        assert vm.vm_execute is execute
+
+        assert transaction.label == 'GolemNetworkToken.migrate'
+        gnt = transaction.frames[0]
+        assert [c.label for c in gnt.calls] == ['MigrationAgent.migrateFrom']
+        agent = gnt.calls[0]
+        assert 'GNTTargetToken.createToken' in [c.label for c in agent.calls]
+        assert gnt.gas < transaction.gas
+        assert agent.gas < gnt.gas
+        assert agent.time < gnt.time
+
+        for frame in frames(transaction):
+            assert sum(c['gas'] for c in frame.opcodes.values()) == frame.self_gas
+        opcodes = transaction.opcodes
+        assert opcodes['SSTORE']['gas'] >= 2 * 5000
+        assert opcodes['CALL']['count'] >= 2
+        assert opcodes['LOG']['count'] >= 1
+        assert sum(c['gas'] for c in opcodes.values()) == gnt.gas
+
+        folded = [l.rsplit(' ', 1) for l in p.folded()]
+        assert ['GolemNetworkToken.migrate;SSTORE', str(gnt.opcodes['SSTORE']['gas'])] in folded
+        assert sum(int(gas) for _, gas in folded) == gnt.gas
+
+        data = p.to_dict()['transactions'][0]
+        assert data['evm_gas'] == gnt.gas
+        assert data['frames'][0]['calls'][0]['label'] == 'MigrationAgent.migrateFrom'
+
+    def test_frames_only(self):
+        log_vm_op = vm.log_vm_op
+        transaction = self.migrate(profiler.Profiler(opcodes=False))
+        assert vm.log_vm_op is log_vm_op
+        assert all(not frame.opcodes for frame in frames(transaction))
+        assert transaction.frames[0].calls[0].label == 'MigrationAgent.migrateFrom'
+
+    def test_failed(self):
+        tokens = self.gnt.balanceOf(tester.a4) + 1
+        with profiler.Profiler() as p:
+            with self.assertRaises(TransactionFailed):
+                self.gnt.migrate(tokens, sender=tester.k4)
+        transaction = p.transactions[0]
+        assert not transaction.success
+        assert transaction.gas == tester.gas_limit
+
+    def test_names(self):
+        p = profiler.Profiler()
+        p.name(tester.a8, 'Recipient')
+        with p:
+            self.state.send(tester.k0, tester.a8, 1)
+            self.state.send(tester.k0, tester.a7, 1)
+        assert [t.label for t in p.transactions] == ['Recipient', '0x' + tester.a7.encode('hex')]
+
+    def test_identify(self):
+        allocation = decode_hex(self.gnt.lockedAllocation())
+        for artifact, address in [(GNT, self.gnt.address), (artifacts.GNT_ALLOCATION, allocation),
+                                  (artifacts.MIGRATION_AGENT, self.migration.address)]:
+            assert artifacts.identify(self.state.block.get_code(address)) is artifact
+        assert artifacts.identify(GNT.init + '\x00' * 64, init=True) is GNT
+        assert artifacts.identify('\x60\x00') is None
@@ -1,78 +1,35 @@
-import os
 import unittest
 
-from ethereum import abi
 from ethereum import tester
 from ethereum.tester import TransactionFailed
 from ethereum.utils import denoms
-from rlp.utils_py2 import decode_hex
-
-from test_gnt import ContractHelper, deploy_gnt
-
-GNT_CONTRACT_PATH = os.path.join('contracts', 'Token.sol')
-ALLOC_CONTRACT_PATH = os.path.join('contracts', 'GNTAllocation.sol')
-
-IMPORT_TOKEN_REGEX = '(import "\.\/Token\.sol";).*'
-IMPORT_ALLOC_REGEX = '(import "\.\/GNTAllocation\.sol";).*'
-DEV_ADDR_REGEX = "\s*allocations\[([a-zA-Z0-9]+)\].*"
-
-PROXY_INIT = decode_hex(open('tests/ProxyAccount.bin', 'r').read().rstrip())
-PROXY_ABI = open('tests/ProxyAccount.abi', 'r').read()
-
-PROXY_FACTORY_INIT = decode_hex(open('tests/ProxyFactoryAccount.bin', 'r').read().rstrip())
-PROXY_FACTORY_ABI = open('tests/ProxyFactoryAccount.abi', 'r').read()
-
-MIGRATION_INIT = decode_hex(open('tests/MigrationAgent.bin', 'r').read().rstrip())
-MIGRATION_ABI = open('tests/MigrationAgent.abi', 'r').read()
-
-TARGET_INIT = decode_hex(open('tests/GNTTargetToken.bin', 'r').read().rstrip())
-TARGET_ABI = open('tests/GNTTargetToken.abi', 'r').read()
 
+import artifacts
+import fixtures
+from scenarios import deploy_contract
 
 class GNTCrowdfundingTest(unittest.TestCase):
 
     def setUp(self):
-        self.state = tester.state()
+        self.state, env = fixtures.load('proxied_gnt')
 
-        available_after = self.state.block.timestamp + 1000
+        self.pd0, self.addr_pd0 = artifacts.PROXY_ACCOUNT.at(self.state, env['pd0']), env['pd0']
+        self.pd1, self.addr_pd1 = artifacts.PROXY_ACCOUNT.at(self.state, env['pd1']), env['pd1']
+        self.pd2, self.addr_pd2 = artifacts.PROXY_ACCOUNT.at(self.state, env['pd2']), env['pd2']
 
-        self.pd0, self.addr_pd0, _ = self.__deploy_proxy(available_after, creator_idx=0)
-        self.pd1, self.addr_pd1, _ = self.__deploy_proxy(available_after, creator_idx=1)
-        self.pd2, self.addr_pd2, _ = self.__deploy_proxy(available_after, creator_idx=2)
+        self.pf, self.founder = artifacts.PROXY_FACTORY_ACCOUNT.at(self.state, env['pf']), env['pf']
 
-        self.pf, self.founder, _ = self.__deploy_factory_proxy(available_after)
+        self.contract, self.c_addr = artifacts.GNT.at(self.state, env['gnt']), env['gnt']
 
-        dev_addresses = [ContractHelper.dev_address(a) for a in [
-            self.addr_pd0,
-            self.addr_pd1,
-            self.addr_pd2
-        ]]
-
-        self.contract, self.c_addr, _ = deploy_gnt(self.state, self.founder, dev_addresses, 2, 2)
-
-        self.creation_min = self.contract.tokenCreationMin()
-        self.creation_rate = self.contract.tokenCreationRate()
+        self.creation_min = env['creation_min']
+        self.creation_rate = env['creation_rate']
         self.transfer_value = denoms.ether * self.creation_rate
         self.eth_part = int(self.creation_min / (3 * self.creation_rate)) + 1 * denoms.ether
 
         self.founder_key = tester.keys[9]
 
-    def __deploy_proxy(self, available_after, creator_idx=9):
-        return self.__deploy_contract(PROXY_INIT, PROXY_ABI, creator_idx, available_after)
-
-    def __deploy_factory_proxy(self, available_after, creator_idx=9):
-        return self.__deploy_contract(PROXY_FACTORY_INIT, PROXY_FACTORY_ABI, creator_idx, available_after)
-
-    def __deploy_contract(self, _bin, _abi, creator_idx, *args):
-        gas_before = self.state.block.gas_used
-
-        t = abi.ContractTranslator(_abi)
-        args = t.encode_constructor_arguments(args)
-        addr = self.state.evm(_bin + args,
-                              sender=tester.keys[creator_idx])
-        contract = tester.ABIContract(self.state, _abi, addr)
-
-        return contract, addr, self.state.block.gas_used - gas_before
+    def __deploy_contract(self, artifact, creator_idx, *args):
+        return deploy_contract(self.state, artifact, creator_idx, *args)
 
     def test_transfer(self):
 
@@ -315,8 +272,8 @@ class GNTCrowdfundingTest(unittest.TestCase):
         # ---------------
         #    IN NORMAL
         # ---------------
-        migration, m_addr, _ = self.__deploy_contract(MIGRATION_INIT, MIGRATION_ABI, 9, self.c_addr)
-        target, t_addr, _ = self.__deploy_contract(TARGET_INIT, TARGET_ABI, 9, m_addr)
+        migration, m_addr, _ = self.__deploy_contract(artifacts.MIGRATION_AGENT, 9, self.c_addr)
+        target, t_addr, _ = self.__deploy_contract(artifacts.TARGET_TOKEN, 9, m_addr)
 
         # extra_tokens = self.contract.totalSupply() - total_tokens
         # approx_min_tokens = int(extra_tokens / 30.)
@@ -0,0 +1,118 @@
+import random
+import sys
+import unittest
+from StringIO import StringIO
+
+from ethereum import tester
+
+from model import TOKEN_CREATION_CAP, TOKEN_CREATION_RATE
+from simulation import DISTRIBUTIONS, TX_GAS_LIMIT, block_counts, blocks_until, contribution_amounts, \
+    migration_transactions, pack, percentile, simulate_crowdfunding, simulate_migration, simulate_packing
+
+
+class SimulationTest(unittest.TestCase):
+
+    def test_contribution_amounts(self):
+        total = TOKEN_CREATION_CAP // TOKEN_CREATION_RATE
+        for distribution in DISTRIBUTIONS:
+            amounts = contribution_amounts(random.Random(0), 100, distribution, total)
+            assert len(amounts) == 100
+            assert all(a > 0 for a in amounts)
+            assert sum(amounts) == total
+
+    def test_percentile(self):
+        values = range(1, 101)
+        assert percentile(values, 50) == 50
+        assert percentile(values, 99) == 99
+        assert percentile(values, 100) == 100
+        assert percentile([], 50) == 0
+
+    def test_crowdfunding(self):
+        report = simulate_crowdfunding(n_accounts=30, funding_blocks=3, seed=1)
+        assert report['failed'] == 0
+        assert report['contributions'] == 30
+        assert report['cap_reached']
+        assert report['finalized']
+        assert report['transfer_events'] == report['contributions'] + 1
+        assert report['blocks'] >= 3
+        assert report['tx_gas']['max'] <= report['block_gas']['max']
+        assert report['total_supply'] == TOKEN_CREATION_CAP
+
+    def test_no_output(self):
+        # the report is the only output of the simulator (e.g. --json)
+        stdout, sys.stdout = sys.stdout, StringIO()
+        try:
+            simulate_crowdfunding(n_accounts=5, funding_blocks=1, seed=1)
+            simulate_packing(n_accounts=5, operations=['unlock'])
+        finally:
+            output, sys.stdout = sys.stdout.getvalue(), stdout
+        assert output == ''
+
+    def test_migration_transactions(self):
+        tokens = [1000, 2000, 3000, 4000]
+        txs = migration_transactions(random.Random(0), ['a', 'b', 'c', 'd'], tokens, 0.5)
+        assert len(txs) == 6
+        assert sum(v for _, v in txs) == sum(tokens)
+        for k, t in zip(['a', 'b', 'c', 'd'], tokens):
+            assert sum(v for key, v in txs if key == k) == t
+        # the second parts after all first migrations
+        assert len(set(k for k, _ in txs[:4])) == 4
+
+    def test_blocks_until(self):
+        progress = [10, 50, 90, 100]
+        assert blocks_until(progress, 100, 0.5) == 2
+        assert blocks_until(progress, 100, 0.95) == 4
+        assert blocks_until(progress, 200, 1) is None
+
+    def test_migration(self):
+        block_gas_limit = 500000
+        report = simulate_migration(n_accounts=30, partial=0.5, block_gas_limit=block_gas_limit, seed=1)
+        assert report['failed'] == 0
+        assert report['partial'] == 15
+        assert report['migrations'] == 45
+        assert report['total_migrated'] == report['target_supply'] == TOKEN_CREATION_CAP
+        assert report['blocks'] == report['blocks_until']['100%']
+        assert report['blocks_until']['50%'] <= report['blocks_until']['90%']
+        assert report['block_gas']['max'] <= block_gas_limit
+        assert report['migrations_per_block']['max'] <= block_gas_limit // report['tx_gas']['min']
+        assert report['migrations_per_block']['total'] == report['migrations']
+        # a new block is started only if the next migration may not fit
+        assert report['block_gas']['p50'] > block_gas_limit - TX_GAS_LIMIT - report['tx_gas']['max']
+        assert report['completion_time'] == report['blocks'] * 15
+
+        counting = simulate_migration(n_accounts=30, partial=0.5, agent='counting', seed=1)
+        assert counting['failed'] == 0
+        assert counting['total_migrated'] == TOKEN_CREATION_CAP
+
+    def test_pack(self):
+        state = tester.state()
+        txs = [lambda k=k: state.send(k, tester.a0, 1) for k in tester.keys[1:]] * 3
+
+        # 21000 gas transactions, a block of 100000 includes them while 50000 is left
+        blocks_gas, applied = pack(state, txs, 100000, 50000)
+        assert block_counts(blocks_gas, applied) == [3] * 9
+        assert blocks_gas == [3 * 21000] * 9
+        assert [block for block, _ in applied] == [i // 3 for i in range(27)]
+        assert all(gas == 21000 for _, gas in applied)
+
+        with self.assertRaises(ValueError):
+            pack(state, txs, 100000, 300000)
+
+    def test_packing(self):
+        block_gas_limit = 1000000
+        report = simulate_packing(n_accounts=40, block_gas_limit=block_gas_limit, seed=1)
+        assert sorted(report) == ['contribution', 'refund', 'unlock']
+        for op in ['contribution', 'refund']:
+            assert report[op]['transactions'] == 40
+        assert report['unlock']['transactions'] == 41
+        for op, r in report.items():
+            assert r['failed'] == 0
+            assert r['per_block']['total'] == r['transactions']
+            assert r['per_block']['max'] <= r['per_block_bound']
+            # every block holds at least as many transactions as fit with their gas limits
+            assert r['per_block']['max'] >= block_gas_limit // TX_GAS_LIMIT
+            assert r['block_gas']['max'] <= block_gas_limit
+            assert r['clear_time'] == r['blocks'] * 15
+
+        report = simulate_packing(n_accounts=10, operations=['refund'], seed=1)
+        assert sorted(report) == ['refund']
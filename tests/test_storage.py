@@ -0,0 +1,140 @@
+import json
+import os
+import unittest
+
+from ethereum import tester
+from ethereum.utils import denoms
+from rlp.utils import decode_hex
+
+import fixtures
+import profiler
+from artifacts import GNT, GNT_ALLOCATION, TESTS_DIR
+from gasbench import BenchmarkMixin, GasBenchmark
+from accounts import FACTORY
+
+tester.serpent = True  # tester tries to load serpent module, prevent that.
+
+# Storage accesses are compared with their baseline like gas (see gasbench.py),
+# the benchmarks are skipped until the baseline is stored.
+BASELINE_PATH = os.environ.get('GNT_STORAGE_BASELINE', os.path.join(TESTS_DIR, 'storage_baseline.json'))
+UPDATE = os.environ.get('GNT_STORAGE_UPDATE') == '1'
+# If set, path of a file the storage reports of all entry points are written to.
+REPORT_PATH = os.environ.get('GNT_STORAGE_REPORT')
+
+# Numbers of the storage report compared with the baseline.
+COUNTS = ('reads', 'writes', 'cold_slots', 'set_slots') + profiler.WRITES
+
+CONTRIBUTION = 20000 * denoms.ether
+TOKENS = 1000 * denoms.ether
+NEW_HOLDER = '\x42' * 20
+
+
+class StorageAccessTest(BenchmarkMixin, unittest.TestCase):
+    """
+    Storage slots read and written by the entry points of GNT and
+    GNTAllocation, a change of their numbers shows up as a regression.
+    """
+    regressions_title = 'storage access regressions'
+    baseline_target = 'make storage-baseline'
+
+    @classmethod
+    def benchmark(cls):
+        return GasBenchmark(BASELINE_PATH, tolerance=0, unit='accesses', update=UPDATE, results_path=None)
+
+    @classmethod
+    def setUpClass(cls):
+        super(StorageAccessTest, cls).setUpClass()
+        cls.reports = {}
+
+    @classmethod
+    def tearDownClass(cls):
+        super(StorageAccessTest, cls).tearDownClass()
+        if REPORT_PATH:
+            with open(REPORT_PATH, 'w') as f:
+                json.dump(cls.reports, f, indent=1, sort_keys=True)
+
+    def access(self, name, f, *args, **kwargs):
+        with profiler.Profiler() as p:
+            f(*args, **kwargs)
+        report = p.transactions[-1].storage_report()
+        self.reports[name] = report
+        for count in COUNTS:
+            self.record('{}.{}'.format(name, count), report[count])
+        return report
+
+    def test_funding(self):
+        state, env = fixtures.load('gnt')
+        state.mine(1)
+
+        first = self.access('GolemNetworkToken.create.first', state.send, tester.k0, env['gnt'], CONTRIBUTION)
+        new_holder = self.access('GolemNetworkToken.create.new_holder', state.send, tester.k1, env['gnt'],
+                                 CONTRIBUTION)
+        same_holder = self.access('GolemNetworkToken.create.same_holder', state.send, tester.k1, env['gnt'],
+                                  CONTRIBUTION)
+        # the balance of a new holder and the first total of tokens
+        assert first['zero_to_nonzero'] == 2
+        assert new_holder['zero_to_nonzero'] == 1
+        assert same_holder['zero_to_nonzero'] == 0
+        assert 'GolemNetworkToken' in first['slots']
+
+        self.assert_no_regressions()
+
+    def test_finalize(self):
+        state, env = fixtures.load('gnt_funding')
+        state.mine(2)
+        gnt = GNT.at(state, env['gnt'])
+
+        self.access('GolemNetworkToken.finalize', gnt.finalize)
+        self.assert_no_regressions()
+
+    def test_refund(self):
+        state = tester.state()
+        gnt = GNT.deploy(state, (FACTORY, FACTORY, 0, 0))
+        # minimum not reached
+        state.send(tester.k0, gnt.address, CONTRIBUTION)
+        state.send(tester.k1, gnt.address, CONTRIBUTION)
+        state.mine(1)
+
+        report = self.access('GolemNetworkToken.refund', gnt.refund, sender=tester.k0)
+        assert report['nonzero_to_zero'] >= 1
+        self.assert_no_regressions()
+
+    def test_transfer(self):
+        state, env = fixtures.load('gnt_finalized')
+        gnt = GNT.at(state, env['gnt'])
+
+        new_holder = self.access('GolemNetworkToken.transfer.new_holder', gnt.transfer, NEW_HOLDER, TOKENS,
+                                 sender=tester.k0)
+        existing_holder = self.access('GolemNetworkToken.transfer.existing_holder', gnt.transfer, tester.a2,
+                                      TOKENS, sender=tester.k1)
+        assert new_holder['writes'] == existing_holder['writes'] == 2
+        assert new_holder['zero_to_nonzero'] == 1
+        assert existing_holder['zero_to_nonzero'] == 0
+
+        # the balances are mapping entries named by their keys
+        slots = new_holder['slots']['GolemNetworkToken']
+        assert any(s.endswith('[0x{}]'.format(NEW_HOLDER.encode('hex'))) for s in slots)
+
+        self.assert_no_regressions()
+
+    def test_migrate(self):
+        state, env = fixtures.load('gnt_migration')
+        gnt = GNT.at(state, env['gnt'])
+
+        self.access('GolemNetworkToken.migrate.first', gnt.migrate, TOKENS, sender=tester.k4)
+        report = self.access('GolemNetworkToken.migrate', gnt.migrate, TOKENS, sender=tester.k5)
+        assert set(report['slots']) == {'GolemNetworkToken', 'MigrationAgent', 'GNTTargetToken'}
+
+        self.assert_no_regressions()
+
+    def test_unlock(self):
+        state, env = fixtures.load('gnt_unlocked')
+        allocation = GNT_ALLOCATION.at(state, decode_hex(env['allocation']))
+
+        self.access('GNTAllocation.unlock.first', allocation.unlock, sender=tester.k9)
+        report = self.access('GNTAllocation.unlock', allocation.unlock, sender=env['dev_keys'][0])
+        # the allocation is cleared, the developer's balance is new
+        assert report['nonzero_to_zero'] == 1
+        assert report['zero_to_nonzero'] == 1
+
+        self.assert_no_regressions()
@@ -1,17 +1,24 @@
 import unittest
 
-from ethereum import abi
 from ethereum import tester
-from ethereum.keys import decode_hex
-from ethereum.utils import denoms
+from ethereum.tester import TransactionFailed
+from ethereum.utils import denoms, sha3
 
-GNT_INIT = decode_hex(open('tests/GolemNetworkToken.bin', 'r').read().rstrip())
-GNT_ABI = open('tests/GolemNetworkToken.abi', 'r').read()
+import artifacts
+from gasbench import WALLET_BASELINE_PATH, BenchmarkMixin, GasBenchmark
+from accounts import create_accounts
+from scenarios import WALLET_DAY_LIMIT
 
-WALLET_INIT = decode_hex(open('tests/Wallet.bin', 'r').read().rstrip())
-WALLET_ABI = open('tests/Wallet.abi', 'r').read()
+# Numbers of owners of the wallets in the gas benchmarks.
+WALLET_OWNERS = [3, 10, 50]
+# Numbers of unconfirmed operations left when the pending operations are cleared.
+OUTSTANDING_OPERATIONS = [0, 10, 100]
+# Numbers of transactions in the batches of executeBatch.
+BATCH_SIZES = [1, 5, 20]
 
-WALLET_DAY_LIMIT = 1000 * denoms.ether
+
+def new_addresses(n, prefix):
+    return [sha3(prefix + str(i))[:20] for i in range(n)]
 
 
 class GolemNetworkTokenWalletTest(unittest.TestCase):
@@ -24,18 +31,12 @@ class GolemNetworkTokenWalletTest(unittest.TestCase):
         if migration_master is None:
             migration_master = founder
 
-        t = abi.ContractTranslator(GNT_ABI)
-        args = t.encode_constructor_arguments((founder, migration_master, start, end))
-        addr = self.state.evm(GNT_INIT + args,
-                              sender=tester.keys[creator_idx])
-        return tester.ABIContract(self.state, GNT_ABI, addr), t
+        contract = artifacts.deploy_gnt(self.state, founder, migration_master, start, end,
+                                        sender=tester.keys[creator_idx])
+        return contract, contract.translator
 
     def __deploy_wallet(self, owner_key, owners, required=1, daylimit=WALLET_DAY_LIMIT):
-        t = abi.ContractTranslator(WALLET_ABI)
-        args = t.encode_constructor_arguments((owners, required, daylimit))
-        addr = self.state.evm(WALLET_INIT + args,
-                              sender=owner_key)
-        return tester.ABIContract(self.state, WALLET_ABI, addr)
+        return artifacts.deploy_wallet(self.state, owners, required, daylimit, sender=owner_key)
 
     def deploy_wallet(self, n_wallet_owners, required=1, creator_idx=0):
         _range = range(creator_idx, n_wallet_owners)
@@ -99,3 +100,238 @@ class GolemNetworkTokenWalletTest(unittest.TestCase):
 
         assert contract.balanceOf(wallet.address) == 0
         assert self.state.block.get_balance(wallet.address) == wallet_balance_init
+
+    def test_clear_pending(self):
+        wallet = artifacts.deploy_wallet(self.state, [tester.a1, tester.a2], 2, WALLET_DAY_LIMIT)
+        self.state.send(tester.k9, wallet.address, 10 * WALLET_DAY_LIMIT)
+        value = 2 * WALLET_DAY_LIMIT
+        balance = self.state.block.get_balance(tester.a8)
+
+        op = wallet.execute(tester.a8, value, '', sender=tester.k0)
+        assert wallet.hasConfirmed(op, tester.a0)
+
+        # changing the requirement clears all pending operations
+        wallet.changeRequirement(2, sender=tester.k1)
+        wallet.changeRequirement(2, sender=tester.k2)
+        assert not wallet.hasConfirmed(op, tester.a0)
+
+        # confirmations of a cleared transaction don't execute it
+        wallet.confirm(op, sender=tester.k1)
+        assert wallet.hasConfirmed(op, tester.a1)
+        wallet.confirm(op, sender=tester.k2)
+        assert self.state.block.get_balance(tester.a8) == balance
+
+        # the same transaction submitted again is a new one
+        assert wallet.execute(tester.a8, value, '', sender=tester.k0) == op
+        wallet.confirm(op, sender=tester.k1)
+        assert self.state.block.get_balance(tester.a8) == balance + value
+
+    def test_execute_batch(self):
+        wallet = artifacts.deploy_wallet(self.state, [tester.a1, tester.a2], 2, WALLET_DAY_LIMIT)
+        self.state.send(tester.k9, wallet.address, 10 * WALLET_DAY_LIMIT)
+        recipients = new_addresses(3, 'recipient')
+
+        # below the daily limit the whole batch is executed at once
+        values = [1 * denoms.ether, 2 * denoms.ether, 3 * denoms.ether]
+        wallet.executeBatch(recipients, values, '', [0, 0, 0], sender=tester.k0)
+        assert [self.state.block.get_balance(a) for a in recipients] == values
+        assert wallet.m_spentToday() == sum(values)
+
+        # above it, the batch needs the confirmations once
+        op = wallet.executeBatch(recipients, [WALLET_DAY_LIMIT] * 3, '', [0, 0, 0], sender=tester.k0)
+        assert [self.state.block.get_balance(a) for a in recipients] == values
+        wallet.confirm(op, sender=tester.k1)
+        assert [self.state.block.get_balance(a) for a in recipients] == [v + WALLET_DAY_LIMIT for v in values]
+
+    def test_execute_batch_invalid(self):
+        wallet = artifacts.deploy_wallet(self.state, [tester.a1, tester.a2], 2, WALLET_DAY_LIMIT)
+        recipients = new_addresses(2, 'recipient')
+        with self.assertRaises(TransactionFailed):
+            wallet.executeBatch([], [], '', [], sender=tester.k0)
+        with self.assertRaises(TransactionFailed):
+            wallet.executeBatch(recipients, [1], '', [0, 0], sender=tester.k0)
+        with self.assertRaises(TransactionFailed):
+            wallet.executeBatch(recipients, [1, 2], '', [0], sender=tester.k0)
+        # the data lengths don't add up to the length of the data
+        with self.assertRaises(TransactionFailed):
+            wallet.executeBatch(recipients, [1, 2], '\x01\x02', [1, 0], sender=tester.k0)
+        with self.assertRaises(TransactionFailed):
+            wallet.executeBatch(recipients, [1, 2], '\x01\x02', [2 ** 256 - 1, 3], sender=tester.k0)
+        with self.assertRaises(TransactionFailed):
+            wallet.executeBatch(recipients, [1, 2 ** 256 - 1], '', [0, 0], sender=tester.k0)
+
+    def test_refund_batch(self):
+        contract, translator = self.deploy_contract(2, 2)
+        wallet = artifacts.deploy_wallet(self.state, [tester.a1, tester.a2], 2, WALLET_DAY_LIMIT)
+        to_send = 10 * denoms.ether
+        self.state.send(tester.keys[9], wallet.address, to_send)
+        wallet_balance_init = self.state.block.get_balance(wallet.address)
+
+        # ---------------
+        #     FUNDING
+        # ---------------
+        self.state.mine(2)
+
+        values = [4 * denoms.ether, 5 * denoms.ether]
+        wallet.executeBatch([contract.address] * 2, values, '', [0, 0], sender=tester.k0)
+        assert contract.balanceOf(wallet.address) == sum(values) * contract.tokenCreationRate()
+        assert self.state.block.get_balance(wallet.address) == wallet_balance_init - sum(values)
+
+        # ---------------
+        #  POST FUNDING
+        # ---------------
+        self.state.mine(1)
+
+        # the refund and a payment in one batch
+        refund = translator.encode_function_call('refund', [])
+        payment = 1 * denoms.ether
+        wallet.executeBatch([contract.address, tester.a8], [0, payment], refund, [len(refund), 0],
+                            sender=tester.k0)
+
+        assert contract.balanceOf(wallet.address) == 0
+        assert self.state.block.get_balance(wallet.address) == wallet_balance_init - payment
+
+    def test_remove_owner(self):
+        owners = [tester.a1, tester.a2, tester.a3]
+        wallet = artifacts.deploy_wallet(self.state, owners, 2, WALLET_DAY_LIMIT)
+        self.state.send(tester.k9, wallet.address, 10 * WALLET_DAY_LIMIT)
+        assert wallet.m_numOwners() == 4
+
+        wallet.removeOwner(tester.a1, sender=tester.k0)
+        wallet.removeOwner(tester.a1, sender=tester.k2)
+        assert wallet.m_numOwners() == 3
+        assert not wallet.isOwner(tester.a1)
+        assert all(wallet.isOwner(a) for a in [tester.a0, tester.a2, tester.a3])
+
+        # the last owner took the slot of the removed one
+        balance = self.state.block.get_balance(tester.a8)
+        op = wallet.execute(tester.a8, 2 * WALLET_DAY_LIMIT, '', sender=tester.k3)
+        assert not wallet.hasConfirmed(op, tester.a2)
+        wallet.confirm(op, sender=tester.k2)
+        assert self.state.block.get_balance(tester.a8) == balance + 2 * WALLET_DAY_LIMIT
+
+        wallet.removeOwner(tester.a2, sender=tester.k0)
+        wallet.removeOwner(tester.a2, sender=tester.k3)
+        assert wallet.m_numOwners() == 2
+        assert not wallet.isOwner(tester.a2)
+
+        wallet.addOwner(tester.a4, sender=tester.k0)
+        wallet.addOwner(tester.a4, sender=tester.k3)
+        assert wallet.m_numOwners() == 3
+        assert wallet.isOwner(tester.a4)
+
+
+class WalletGasTest(BenchmarkMixin, unittest.TestCase):
+    """
+    Gas of the confirmation path of wallets with many owners and many
+    outstanding operations and of batches compared with single transactions,
+    recorded with the gas benchmarks in their own baseline (see gasbench.py),
+    skipped until it is stored.
+    """
+
+    @classmethod
+    def benchmark(cls):
+        return GasBenchmark(WALLET_BASELINE_PATH)
+
+    def deploy_wallet(self, n_owners, required=3):
+        keys, accounts = create_accounts(self.state, [10 ** 24] * (n_owners - 1), 'owner')
+        # the constructor stores every owner, more than the default gas limit for many owners
+        wallet = artifacts.WALLET.deploy(self.state, (accounts, required, WALLET_DAY_LIMIT), sender=tester.k0,
+                                         gas=self.state.block.gas_limit - self.state.block.gas_used)
+        self.state.send(tester.k9, wallet.address, 10 * WALLET_DAY_LIMIT)
+        return wallet, [tester.k0] + keys
+
+    def test_owners(self):
+        confirm_gas = []
+        for n in WALLET_OWNERS:
+            wallet, keys = self.deploy_wallet(n)
+            prefix = 'Wallet.owners_{}.'.format(n)
+            # confirmed by the first and the last owners, the bits of highest indices
+            balance = self.state.block.get_balance(tester.a8)
+            op = self.gas(prefix + 'execute', wallet.execute, tester.a8, 2 * WALLET_DAY_LIMIT, '',
+                          sender=keys[0])
+            _, gas = self.measure(wallet.confirm, op, sender=keys[-1])
+            self.record(prefix + 'confirm', gas)
+            confirm_gas.append(gas)
+            self.gas(prefix + 'confirm.execute', wallet.confirm, op, sender=keys[-2])
+            assert self.state.block.get_balance(tester.a8) == balance + 2 * WALLET_DAY_LIMIT
+            self.state = tester.state()
+
+        # a confirmation doesn't depend on the number of owners
+        assert max(confirm_gas) - min(confirm_gas) < 1000
+
+        self.assert_no_regressions()
+
+    def test_outstanding_operations(self):
+        clear_gas = []
+        for n in OUTSTANDING_OPERATIONS:
+            wallet, keys = self.deploy_wallet(10)
+            ops = [wallet.execute(tester.a8, 2 * WALLET_DAY_LIMIT + i, '', sender=keys[0])
+                   for i in range(n)]
+            prefix = 'Wallet.outstanding_{}.'.format(n)
+            self.gas(prefix + 'changeRequirement', wallet.changeRequirement, 2, sender=keys[0])
+            self.gas(prefix + 'changeRequirement.confirm', wallet.changeRequirement, 2, sender=keys[1])
+            _, gas = self.measure(wallet.changeRequirement, 2, sender=keys[2])
+            self.record(prefix + 'changeRequirement.execute', gas)
+            clear_gas.append(gas)
+            assert wallet.m_required() == 2
+            assert not any(wallet.hasConfirmed(op, tester.a0) for op in ops)
+            self.state = tester.state()
+
+        # clearing the pending operations doesn't depend on their number
+        assert max(clear_gas) - min(clear_gas) < 1000
+
+        self.assert_no_regressions()
+
+    def test_batch(self):
+        for n in BATCH_SIZES:
+            wallet, keys = self.deploy_wallet(3, required=2)
+            self.state.send(tester.k9, wallet.address, 2 * n * WALLET_DAY_LIMIT)
+            value = WALLET_DAY_LIMIT + 1
+
+            # above the daily limit every single transaction needs its confirmation
+            single = 0
+            for a in new_addresses(n, 'single'):
+                op, gas = self.measure(wallet.execute, a, value, '', sender=keys[0])
+                _, confirm_gas = self.measure(wallet.confirm, op, sender=keys[1])
+                single += gas + confirm_gas
+
+            recipients = new_addresses(n, 'batch')
+            op, batch = self.measure(wallet.executeBatch, recipients, [value] * n, '', [0] * n, sender=keys[0])
+            self.record('Wallet.batch_{}.executeBatch'.format(n), batch)
+            _, confirm_gas = self.measure(wallet.confirm, op, sender=keys[1])
+            self.record('Wallet.batch_{}.confirm'.format(n), confirm_gas)
+            batch += confirm_gas
+            self.record('Wallet.batch_{}.single'.format(n), single)
+            assert all(self.state.block.get_balance(a) == value for a in recipients)
+            if n > 1:
+                assert batch < single
+            self.state = tester.state()
+
+        self.assert_no_regressions()
+
+    def test_batch_contributions(self):
+        for n in BATCH_SIZES:
+            single_wallet, single_keys = self.deploy_wallet(3)
+            batch_wallet, batch_keys = self.deploy_wallet(3)
+            single_gnt = artifacts.deploy_gnt(self.state, tester.a9, tester.a9, 1, 100)
+            batch_gnt = artifacts.deploy_gnt(self.state, tester.a9, tester.a9, 1, 100)
+            self.state.mine(1)
+            value = 10 * denoms.ether
+
+            # contributions to GNT below the daily limit
+            single = 0
+            for _ in range(n):
+                _, gas = self.measure(single_wallet.execute, single_gnt.address, value, '', sender=single_keys[0])
+                single += gas
+            _, batch = self.measure(batch_wallet.executeBatch, [batch_gnt.address] * n, [value] * n, '', [0] * n,
+                                    sender=batch_keys[0])
+            self.record('Wallet.batch_{}.contributions'.format(n), batch)
+            self.record('Wallet.batch_{}.single_contributions'.format(n), single)
+            assert batch_gnt.balanceOf(batch_wallet.address) == single_gnt.balanceOf(single_wallet.address)
+            assert batch_gnt.balanceOf(batch_wallet.address) == n * value * batch_gnt.tokenCreationRate()
+            if n > 1:
+                assert batch < single
+            self.state = tester.state()
+
+        self.assert_no_regressions()